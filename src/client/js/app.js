@@ -146,6 +146,25 @@ global.target = target;
 let turns_enabled = false;  // Is the game-mode turns-enabled or live?
 let particles = []; //List of particles to render
 let currentPlayer = '';
+// Lookup tables from the sprite/sound codes in per-tick updates to their names. The server sends them in gameSetup
+// as soon as the socket connects, before it can join a room.
+let spriteNames = {};
+let soundNames = {0: ''};
+
+function decodeSprite(code){
+    return spriteNames[code] || '';
+}
+
+function decodeSound(code){
+    return soundNames[code] || '';
+}
+
+// Replace the sprite and sound codes of an updated object with their names.
+function decodeObject(object){
+    object.sprite = decodeSprite(object.sprite);
+    object.sound = decodeSound(object.sound);
+    return object;
+}
 
 window.canvas = new Canvas();
 window.chat = new ChatClient();
@@ -333,7 +352,12 @@ function setupSocket(socket) {
     socket.emit('request_rooms');
 
     // Handle ping.
-    socket.on('pongcheck', function () {
+    socket.on('pongcheck', function (data, ack) {
+        if (data && data.probe) {
+            // Round trip time probe from the server, which adapts our update rate to it. Just acknowledge it.
+            ack();
+            return;
+        }
         let latency = Date.now() - global.startPingTime;
         debug('Latency: ' + latency + 'ms');
         window.chat.addSystemLine('Ping: ' + latency + 'ms');
@@ -399,6 +423,8 @@ function setupSocket(socket) {
     socket.on('gameSetup', function(data) {
         global.gameWidth = data.gameWidth;
         global.gameHeight = data.gameHeight;
+        spriteNames = data.sprites || spriteNames;
+        soundNames = data.sounds || soundNames;
         resize();
     });
 
@@ -441,6 +467,7 @@ function setupSocket(socket) {
 
     socket.on('update', function(data){
         //console.log('updating', data)
+        data.sprite = decodeSprite(data.sprite);
         if (data.sprite === 'SpriteType.PLANET_SPRITE'){
             //console.log(data)
             let planet;
@@ -466,11 +493,11 @@ function setupSocket(socket) {
     })
 
     socket.on('update-bullets', function(bulletList){
-        bullets = bulletList
+        bullets = bulletList.map(decodeObject);
     });
     socket.on('update-tanks', function(tankList){
         //console.log('Receiving tank updates', Date.now())
-        users = tankList.filter((t)=>{return typeof(t.sprite) != 'undefined'});
+        users = tankList.filter((t)=>{return typeof(t.sprite) != 'undefined'}).map(decodeObject);
         for (let i = 0; i < users.length; i++) {
             if (users[i].id === socket.id) {
                 //console.log('found player')
@@ -495,7 +522,7 @@ function setupSocket(socket) {
                     player.bullet_counts = users[i].bullet_counts;
                     health_inventory_changes = true;
                 }
-                player.bullet_sprites = users[i].bullet_sprites;
+                player.bullet_sprites = users[i].bullet_sprites.map(decodeSprite);
                 if( health_inventory_changes){
                     drawHPBar(player.health);
                     drawInventory();
@@ -506,7 +533,7 @@ function setupSocket(socket) {
     });
 
     socket.on('update-explosions', function(explosionsList){
-        explosions = explosionsList
+        explosions = explosionsList.map(decodeObject);
     })
     // Handle movement.
     socket.on('-serverTellPlayerMove', function (data) {
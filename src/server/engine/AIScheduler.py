@@ -0,0 +1,96 @@
+"""
+Fair sharing of the server's AI compute between the rooms.
+
+Planning a shot costs an AI tank a few hundred phantom shots, so when the AI tanks of many rooms plan at once, running
+their searches to the end would stall the event loop for all of them. Instead, every tick of the move loop grants the
+rooms whose AI tanks are thinking an equal share of ai_tick_budget seconds, and each room steps its AimSearch only
+while both its share and the tick's budget have some time left. The searches are anytime algorithms, so a room can
+pick a search up on the next tick where it left it, and a tank that thought for ai_think_ticks settles for the best aim
+found so far: under load, the AI shoots less accurately rather than later.
+
+A step of a search can take longer than what is left of a share. The excess is carried over as a debt that the room
+pays off on the next ticks, so over time every thinking room gets the same compute, however coarse its steps are, and
+the rooms that are in debt leave the budget of a tick to the others.
+"""
+from time import perf_counter
+from typing import Dict, Hashable, Set
+
+from .AimOptimizer import AimSearch
+from .Config import ai_tick_budget
+
+
+class AIScheduler:
+    def __init__(self, budget: float):
+        """
+        :param budget: float seconds of AI compute per tick, shared by every room that is thinking
+        """
+        self.budget = budget
+        self._allowances: Dict[Hashable, float] = {}  # Seconds each thinking room may still spend this tick
+        self._thinking: Set[Hashable] = set()  # Rooms that ran a search since the last tick
+        self._left: float = 0  # Seconds of this tick's budget that no room spent yet
+        self.ticks: int = 0
+        self.seconds: float = 0  # Spent on searches
+        self.searches: int = 0  # Finished
+        self.searches_cut_short: int = 0  # Finished before they were done, because they ran out of time
+        self.simulations: int = 0  # Phantom shots fired by the finished searches
+
+    def begin_tick(self) -> None:
+        """
+        Grant every room that is thinking its share of this tick's budget. Rooms that stopped thinking are dropped.
+        :return: None
+        """
+        self.ticks += 1
+        share = self.budget / max(len(self._thinking), 1)
+        # Unused time is not saved up, but debts are kept until they are paid off
+        self._allowances = {room: min(self._allowances.get(room, 0) + share, share) for room in self._thinking}
+        self._thinking = set()
+        self._left = self.budget
+
+    def run(self, room: Hashable, search: AimSearch, minimum_steps: int = 0) -> None:
+        """
+        Step a search for as long as both the room and the tick have time left. A room that starts thinking gets its
+        first share on the next tick.
+        :param room: Hashable that identifies the room, e.g. its ObjectManager
+        :param search: AimSearch to step
+        :param minimum_steps: int number of steps to take even if the room is out of time
+        :return: None
+        """
+        self._thinking.add(room)
+        steps = 0
+        while not search.done and (steps < minimum_steps or self._allowances.get(room, 0) > 0 and self._left > 0):
+            start = perf_counter()
+            search.step()
+            elapsed = perf_counter() - start
+            self._allowances[room] = self._allowances.get(room, 0) - elapsed
+            self._left -= elapsed
+            self.seconds += elapsed
+            steps += 1
+
+    def finish(self, search: AimSearch) -> None:
+        """
+        Count a search that is no longer run.
+        :param search: AimSearch whose best aim is used
+        :return: None
+        """
+        self.searches += 1
+        self.searches_cut_short += not search.done
+        self.simulations += search.simulations
+
+    @property
+    def thinking(self) -> int:
+        """
+        :return: int number of rooms that ran a search since the last tick
+        """
+        return len(self._thinking)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        :return: Dictionary of the scheduler's metrics, for monitoring
+        """
+        return {'budget': self.budget, 'rooms_thinking': self.thinking, 'ticks': self.ticks,
+                'seconds_per_tick': self.seconds / self.ticks if self.ticks else 0, 'searches': self.searches,
+                'searches_cut_short': self.searches_cut_short,
+                'simulations_per_search': self.simulations / self.searches if self.searches else 0}
+
+
+ai_scheduler = AIScheduler(ai_tick_budget)  # Shared by every room in the process
@@ -0,0 +1,265 @@
+"""
+Aiming for the AI tanks, as a search over the turret angle and the power of a shot for the one whose phantom shot comes
+closest to an enemy (see engine.scoring).
+
+Random search spends most of its phantom shots far away from anything good. AimSearch instead fires a coarse grid over
+the whole range of angles and powers, and then refines the best few grid points with a compass search: each of them
+tries a step in both directions of the angle and of the power, moves to the best of those that land closer, and halves
+its steps when none of them do. Once a point is refined all the way, the next best grid point takes its place. Every
+step of the search fires one batch of phantom shots, which the physics kernels fly together: a round of the compass
+search, or a chunk of the grid of the same size. best always holds the best aim found so far, so a search can be
+stepped a little at a time and stopped whenever its time is up (see engine.AIScheduler). A search can also be warm
+started from a known good aim (see engine.ShotCache), which is refined before any grid is fired, and stop as soon as an
+aim is good enough.
+
+Usage, from src/server, to compare it with random search on the shipped levels:
+    python -m engine.AimOptimizer
+"""
+import argparse
+import glob
+from dataclasses import dataclass
+from random import Random
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Takes ndarrays of turret angles and powers, and returns the score of the phantom shot of each one. Lower is better.
+Evaluate = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# Turret angles that shoot away from the planet, up to 15 degrees below the horizon on either side.
+# ObjectManager.fire_gun shoots along -view_vector, so an angle of 270 points straight up.
+ANGLE_RANGE: Tuple[float, float] = (165, 375)
+POWER_RANGE: Tuple[float, float] = (50, 1000)
+
+
+@dataclass
+class Aim:
+    angle: float  # Degrees, relative to the tank
+    power: float
+    distance: float  # Score of its phantom shot, i.e. how far it missed an enemy by
+
+
+@dataclass
+class _Seed:
+    """A point that the compass search is refining."""
+    aim: Aim
+    angle_step: float
+    power_step: float
+
+
+class AimSearch:
+    def __init__(self, evaluate: Evaluate, budget: int, initial: Optional[Tuple[float, float]] = None,
+                 warm_start: Optional[Tuple[float, float]] = None, good_enough: Optional[float] = None,
+                 angle_range: Tuple[float, float] = ANGLE_RANGE, power_range: Tuple[float, float] = POWER_RANGE,
+                 grid: Tuple[int, int] = (8, 4), seeds: int = 4, min_angle_step: float = .5,
+                 min_power_step: float = 5):
+        """
+        :param evaluate: Evaluate function that fires a batch of phantom shots
+        :param budget: int maximum number of phantom shots to fire
+        :param initial: (angle, power) of the previous aim, which is tried along with the grid
+        :param warm_start: (angle, power) of a known good aim. It is refined with fine steps first, and the grid is only
+        fired if that does not find a good enough aim.
+        :param good_enough: float score at which the search stops early. None searches until the budget is spent.
+        :param angle_range: (lowest, highest) turret angle to search
+        :param power_range: (lowest, highest) power to search
+        :param grid: (angles, powers) number of cells of the coarse grid
+        :param seeds: int number of grid points to refine at a time
+        :param min_angle_step: float angle step below which a point is not refined any further. The tanks only turn
+        their turrets to within a degree anyway.
+        :param min_power_step: float power step below which a point is not refined any further
+        """
+        self.evaluate = evaluate
+        self.budget = budget
+        self.angle_range = angle_range
+        self.power_range = power_range
+        self.min_angle_step = min_angle_step
+        self.min_power_step = min_power_step
+        self.seed_count = seeds
+        self.good_enough = good_enough
+        self.simulations: int = 0  # Phantom shots fired so far
+        self.best: Optional[Aim] = None
+
+        # Centers of the grid cells
+        angle_cell = (angle_range[1] - angle_range[0]) / grid[0]
+        power_cell = (power_range[1] - power_range[0]) / grid[1]
+        angles, powers = np.meshgrid(angle_range[0] + angle_cell * (np.arange(grid[0]) + .5),
+                                     power_range[0] + power_cell * (np.arange(grid[1]) + .5))
+        self._grid = (np.append(angles.ravel(), initial[0]) if initial else angles.ravel(),
+                      np.append(powers.ravel(), initial[1]) if initial else powers.ravel())
+        self._initial_steps = (angle_cell / 2, power_cell / 2)
+        self._warm_start = warm_start
+        self._grid_aims: List[Aim] = []  # Of the grid points fired so far
+        self._grid_fired = False
+        self._seeds: List[_Seed] = []
+        self._next_seeds: List[Aim] = []  # Grid points that are yet to be refined, closest first
+
+    def _fire(self, angles: np.ndarray, powers: np.ndarray) -> List[Aim]:
+        """
+        Fire a batch of phantom shots, as far as the budget allows.
+        :param angles: ndarray of turret angles
+        :param powers: ndarray of powers
+        :return: List of the Aims that were fired, in order
+        """
+        count = max(0, min(angles.size, self.budget - self.simulations))
+        angles, powers = angles[:count], powers[:count]
+        distances = self.evaluate(angles, powers) if count else []
+        self.simulations += count
+        aims = [Aim(float(angle), float(power), float(distance))
+                for angle, power, distance in zip(angles, powers, distances)]
+        for aim in aims:
+            if self.best is None or aim.distance < self.best.distance:
+                self.best = aim
+        return aims
+
+    def step(self) -> None:
+        """
+        Fire the next batch of phantom shots: the warm start or the grid first, a chunk at a time, then one round of the
+        compass search.
+        :return: None
+        """
+        if self.done:
+            return
+        if self._warm_start is not None:
+            aims = self._fire(np.array([self._warm_start[0]]), np.array([self._warm_start[1]]))
+            # It should be close already, so start a few halvings in
+            self._seeds = [_Seed(aim, 8 * self.min_angle_step, 8 * self.min_power_step) for aim in aims]
+            self._warm_start = None
+            return
+        if not self._seeds:
+            # A chunk is as big as a round of the compass search, so that no step takes much longer than another
+            fired, chunk = len(self._grid_aims), 4 * self.seed_count
+            self._grid_aims += self._fire(self._grid[0][fired:fired + chunk], self._grid[1][fired:fired + chunk])
+            if len(self._grid_aims) < self._grid[0].size and self.simulations < self.budget:
+                return
+            aims = sorted(self._grid_aims, key=lambda aim: aim.distance)
+            self._seeds = [_Seed(aim, *self._initial_steps) for aim in aims[:self.seed_count]]
+            self._next_seeds = aims[self.seed_count:]
+            self._grid_fired = True
+            return
+
+        # Step each seed in both directions of the angle and of the power
+        candidates = []
+        for seed in self._seeds:
+            aim = seed.aim
+            for angle, power in ((aim.angle - seed.angle_step, aim.power), (aim.angle + seed.angle_step, aim.power),
+                                 (aim.angle, aim.power - seed.power_step), (aim.angle, aim.power + seed.power_step)):
+                candidates.append((float(np.clip(angle, *self.angle_range)), float(np.clip(power, *self.power_range))))
+        aims = self._fire(np.array([angle for angle, _ in candidates]), np.array([power for _, power in candidates]))
+
+        refining = []
+        for i, seed in enumerate(self._seeds):
+            tried = aims[4 * i:4 * i + 4]
+            closest = min(tried, key=lambda aim: aim.distance, default=None)
+            if closest is not None and closest.distance < seed.aim.distance:
+                seed.aim = closest
+            elif len(tried) == 4:  # Nothing closer within the steps, so look closer by
+                seed.angle_step /= 2
+                seed.power_step /= 2
+            if seed.angle_step >= self.min_angle_step or seed.power_step >= self.min_power_step:
+                refining.append(seed)
+            elif self._next_seeds:
+                refining.append(_Seed(self._next_seeds.pop(0), *self._initial_steps))
+        self._seeds = refining
+
+    @property
+    def done(self) -> bool:
+        return (self.simulations >= self.budget
+                or self.good_enough is not None and self.best is not None and self.best.distance <= self.good_enough
+                or self._grid_fired and not self._seeds)
+
+    def run(self) -> Aim:
+        """
+        Search until the budget is spent, an aim is good enough or every grid point is refined all the way.
+        :return: the best Aim found
+        """
+        while not self.done:
+            self.step()
+        return self.best
+
+
+def random_search(evaluate: Evaluate, budget: int, rng: Random, angle_range: Tuple[float, float] = ANGLE_RANGE,
+                  power_range: Tuple[float, float] = POWER_RANGE) -> Aim:
+    """
+    Fire phantom shots at uniformly random aims, like the monte carlo mode of ObjectManager.adjust_aim.
+    :param evaluate: Evaluate function that fires a batch of phantom shots
+    :param budget: int number of phantom shots to fire
+    :param rng: Random to draw the aims from
+    :param angle_range: (lowest, highest) turret angle to search
+    :param power_range: (lowest, highest) power to search
+    :return: the best Aim found
+    """
+    angles = np.array([rng.uniform(*angle_range) for _ in range(budget)])
+    powers = np.array([rng.uniform(*power_range) for _ in range(budget)])
+    distances = evaluate(angles, powers)
+    best = int(np.argmin(distances))
+    return Aim(float(angles[best]), float(powers[best]), float(distances[best]))
+
+
+def benchmark(level_paths: List[str], targets: int, random_budgets: List[int], search_budgets: List[int],
+              hit_distance: float = 45) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Aim the AI tank of each level at player tanks placed at random on the other planets, with random search and with
+    AimSearch.
+    :param level_paths: List of level file paths
+    :param targets: int number of targets per level
+    :param random_budgets: List of the numbers of phantom shots to give random search
+    :param search_budgets: List of the numbers of phantom shots to give AimSearch
+    :param hit_distance: float miss distance that still counts as a hit, i.e. a tank's collision radius plus a
+    bullet's
+    :return: Dictionary where the key names the method and the value is (median miss distance, fraction of hits,
+    mean phantom shots)
+    """
+    from .ObjectManager import ObjectManager  # The ObjectManager aims with this module, so only import it when needed
+
+    rng = Random(0)  # Places the targets
+    search_rng = Random(1)  # Kept apart, so that every method aims at the same targets
+    results = {f'random, {budget} shots': [] for budget in random_budgets}
+    results.update({f'AimSearch, budget {budget}': [] for budget in search_budgets})
+    for path in level_paths:
+        object_manager = ObjectManager(file_path=path, seed=0)
+        shooters = [tank for tank in object_manager.tanks.values() if not tank.is_player_character]
+        if not shooters:
+            continue
+        shooter = shooters[0]
+        planets = [planet for planet in object_manager.planets.values() if planet is not shooter.home_planet]
+        for _ in range(targets):
+            # The target stands on another planet, if there is one
+            target_longitude = rng.uniform(0, 360)
+            if planets:
+                target_planet = rng.choice(planets)
+            else:
+                target_planet = shooter.home_planet
+                target_longitude = shooter.longitude + rng.uniform(90, 270)
+            object_manager.create_tank(target_longitude, target_planet, sid='target', is_player=True)
+
+            def evaluate(angles: np.ndarray, powers: np.ndarray) -> np.ndarray:
+                return object_manager.score_phantom_shots(shooter, shooter.longitude, angles, powers)
+
+            for budget in random_budgets:
+                aim = random_search(evaluate, budget, search_rng)
+                results[f'random, {budget} shots'].append((aim.distance, budget))
+            for budget in search_budgets:
+                search = AimSearch(evaluate, budget)
+                aim = search.run()
+                results[f'AimSearch, budget {budget}'].append((aim.distance, search.simulations))
+            del object_manager.tanks['target']
+    return {name: (float(np.median([distance for distance, _ in runs])),
+                   float(np.mean([distance <= hit_distance for distance, _ in runs])),
+                   float(np.mean([shots for _, shots in runs])))
+            for name, runs in results.items() if runs}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare AimSearch with random search on the shipped levels.')
+    parser.add_argument('--levels', default='./levels/*/*.txt', help='glob of the level files to aim on')
+    parser.add_argument('--targets', type=int, default=5, help='number of targets per level')
+    args = parser.parse_args()
+    results = benchmark(sorted(glob.glob(args.levels)), args.targets, random_budgets=[30, 100, 300, 1000],
+                        search_budgets=[50, 100, 200])
+    print(f'{"method":<24}{"median miss distance":>24}{"hits":>8}{"phantom shots":>16}')
+    for name, (distance, hits, shots) in results.items():
+        print(f'{name:<24}{distance:>24.1f}{hits:>8.0%}{shots:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,25 @@
-from datetime import datetime
 from math import atan2
 from typing import Any, Dict
 
 from socketio import AsyncServer
 
 from .Object import Object
-from .SoundType import SoundType
-from .SpriteType import SpriteType
+from .SimulationClock import SimulationClock
+from .SoundType import SoundType, sound_codes
+from .SpriteType import SpriteType, sprite_codes
 from .vector import Vector
 
 
 class BulletObject(Object):
-    def __init__(self, position: Vector, sprite_type: SpriteType = None, trail_color: str = ''):
+    __slots__ = ('is_phantom', 'owner', 'ticks_to_live', 'age', 'damage', 'destroys_terrain', 'generates_terrain',
+                 'explosion_radius', 'explosion_sprite', 'explosion_sound', 'shoot_sound', 'bounces', 'times_shot',
+                 'bounce_limit', 'teleporter', 'creates_wormholes', 'accelerator', 'splitter', 'splitter_ticks',
+                 'splitter_counter', 'clock')
+
+    def __init__(self, position: Vector, sprite_type: SpriteType = None, trail_color: str = '',
+                 clock: SimulationClock = None):
         super().__init__(position, sprite_type)
+        self.clock: SimulationClock = clock or SimulationClock()  # Converts the lifetimes below into ticks
         self.hue: str = trail_color
         self.is_phantom: bool = False
         self.owner = None
@@ -20,8 +27,9 @@ class BulletObject(Object):
 
         # Kills itself after this many seconds. -1 means it lives until it collides with something
         # Normally 30 seconds. Some bullets may defer. 5 seconds is too short for game play, but good for testing.
+        # The lifetime is counted in ticks the bullet has moved, so phantom bullets age just like real ones.
         self.time_to_live: float = 30
-        self.time_created: float = datetime.now().timestamp()
+        self.age: int = 0  # Ticks this bullet has been moved for
 
         # Reactions stuff
         self.damage: int = 10
@@ -98,12 +106,30 @@ class BulletObject(Object):
             self.damage = 12.5
             self.explosion_radius = 120
 
+    @property
+    def time_to_live(self) -> float:
+        """Lifetime in simulated seconds. -1 means it lives until it collides with something."""
+        return -1 if self.ticks_to_live == -1 else self.ticks_to_live * self.clock.seconds_per_tick
+
+    @time_to_live.setter
+    def time_to_live(self, seconds: float) -> None:
+        self.ticks_to_live = -1 if seconds == -1 else self.clock.to_ticks(seconds)
+
+    @property
+    def splitter_time(self) -> float:
+        """Simulated seconds after which a splitter bullet splits. 0 means it never splits."""
+        return self.splitter_ticks * self.clock.seconds_per_tick
+
+    @splitter_time.setter
+    def splitter_time(self, seconds: float) -> None:
+        self.splitter_ticks = self.clock.to_ticks(seconds)
+
     def move(self):
-        # print(self.time_created, datetime.now().timestamp())
-        if datetime.now().timestamp() - self.time_created >= self.time_to_live != -1:
+        if self.age >= self.ticks_to_live != -1:
             self.kill()
             return
 
+        self.age += 1
         Object.move(self)
         self.roll = atan2(self.velocity.y, self.velocity.x)
         if not self.is_phantom:
@@ -121,12 +147,12 @@ class BulletObject(Object):
 
     def get_json(self) -> Dict[str, Any]:
         return {'id': self.id,
-                'sprite': str(self.sprite_type),
+                'sprite': sprite_codes[self.sprite_type],
                 'roll': self.roll,
                 'x': self.position.x,
                 'y': self.position.y,
                 'hue': self.hue,
-                'sound': str(self.sound_type_to_play)}
+                'sound': sound_codes[self.sound_type_to_play]}
 
     @property
     def sound_type_to_play(self) -> SoundType:
@@ -1,6 +1,6 @@
 import json
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional
 
 
 @dataclass
@@ -30,6 +30,7 @@ class Config:
     minMassLoss: int
     mergeTimer: int
     sqlinfo: Dict
+    socketSerializer: str = 'auto'  # 'auto', 'orjson', 'json' or 'msgpack'. See engine.serializer.server_options
 
     def __getitem__(self, item):
         return self.__getattribute__(item)
@@ -41,3 +42,54 @@ with open('../../config.json') as f:
 
 turns_enabled: bool = True  # Set False for debug
 gravity_constant: float = 500000  # Gravity Constant in Newton's Law of Universal Gravitation
+
+# Area of interest management
+interest_management: bool = True  # Only send bullets and explosions near each client's viewport
+interest_margin: float = 500  # Distance beyond the edge of a client's viewport within which objects are still sent
+interest_reduced_rate: int = 4  # Every this many updates, everything is sent to everyone regardless of viewport
+
+# Adaptive network update rate
+adaptive_update_rate: bool = True  # Send fewer state updates to clients with a slow connection
+adaptive_rtt_target: float = .1  # Clients with a round trip time (seconds) up to this get every update
+adaptive_max_interval: int = 8  # Slow clients get at least every this many updates
+adaptive_max_pending_probes: int = 2  # Clients with more unacknowledged probes get no updates until they catch up
+adaptive_probe_timeout: float = 5  # Seconds after which an unacknowledged probe is given up on
+
+# Room lifecycle
+room_idle_tick_divisor: int = 15  # Idle rooms are moved and updated this many times less often than active ones
+room_hibernate_after: float = 60  # Seconds a room can sit without connected players before it hibernates
+room_hibernation_path: str = ''  # Directory to write hibernating rooms to. Empty keeps them in memory.
+room_delete_after: float = 3600  # Seconds a room can hibernate before it is deleted, along with its file on disk
+
+# Rooms with only AI tanks left
+ai_only_policy: str = 'fast_forward'  # 'fast_forward', 'resolve', 'pause' or 'idle'. See Room.update_state
+ai_only_ticks_per_step: int = 20  # Ticks an AI-only room is moved per tick of the move loop while fast forwarding
+ai_only_tick_limit: int = 36000  # Fast forwarded ticks after which an AI-only game is abandoned
+
+# Crash recovery
+snapshot_path: str = ''  # Directory to save rooms to, so that they survive a restart. Empty disables snapshots.
+snapshot_full_every: int = 30  # Every this many saves (one per second) is a full snapshot; the rest are terrain deltas
+
+# Physics
+physics_backend: str = 'auto'  # 'auto', 'numba', 'numpy' or 'python'. See engine.kernels
+
+# AI aiming
+# 'optimizer' or 'monte_carlo'. See ObjectManager.adjust_aim. The optimizer makes the AI much harder than it used to be:
+# it hits about three times in four, where monte_carlo tries 1000 * accuracy_multiplier random aims, i.e. only one at
+# the default difficulty.
+ai_aim_mode: str = 'optimizer'
+ai_accuracy_multiplier: float = .001  # Difficulty of the AI tanks. Scales how many aims either mode tries.
+ai_aim_simulations: int = 200  # Phantom shots the optimizer may fire per aim at ai_accuracy_multiplier. See AimSearch
+ai_phantom_moves: int = 400  # Moves a phantom shot flies at most before it counts as landed
+ai_self_damage_penalty: float = 4  # Added to a phantom shot's score per unit its explosion would reach into the shooter
+ai_aim_hit_distance: float = 45  # Score at which the optimizer stops looking for a better aim. 45 is a direct hit.
+ai_shot_cache_size: int = 4096  # AI shot solutions shared by every room. 0 disables the cache. See engine.ShotCache
+ai_shot_cache_bucket: float = 50  # Size of the buckets that shooter and target positions are rounded to
+ai_scheduled: bool = True  # Whether AI tanks of the server's rooms plan over several ticks. See engine.AIScheduler
+ai_tick_budget: float = .008  # Seconds of AI planning per tick of the move loop, shared by the rooms that are thinking
+ai_think_ticks: int = 120  # Ticks an AI tank may think for before it settles for the best aim found so far
+
+# Deterministic replay
+simulation_seed: Optional[int] = None  # Seed for every room's random number generator. None picks one per room.
+replay_recording_path: str = ''  # Directory to record the inputs of every room to. Empty disables recording.
+replay_digest_every: int = 60  # Ticks between the state digests in a recording, which a replay is checked against
@@ -0,0 +1,67 @@
+"""
+Finds the clients whose heartbeats stopped, without scanning every connected client.
+
+Each tracked client has exactly one entry in a min-heap, keyed on the time by which it has to have sent another
+heartbeat. Heartbeats only update the client's last heartbeat time; the heap entry is left alone and lazily pushed back
+when it comes up during a sweep. A sweep therefore only looks at the entries that came due, i.e. it runs in
+O(expired + rescheduled) instead of O(clients), no matter how often the clients send heartbeats.
+"""
+import heapq
+from typing import Dict, List, Tuple
+
+from .util import Sid
+
+
+class HeartbeatSweeper:
+    def __init__(self, timeout: float):
+        """
+        :param timeout: float seconds without a heartbeat after which a client counts as gone
+        """
+        self.timeout = timeout
+        self.last_heartbeats: Dict[Sid, float] = {}  # Key is sid, value is time.monotonic() of its last heartbeat
+        self._deadlines: List[Tuple[float, Sid]] = []
+        self.reaped: int = 0  # Total number of clients that timed out
+
+    def beat(self, sid: Sid, now: float) -> None:
+        """
+        Record a heartbeat. Clients are only tracked from their first heartbeat on.
+        :param sid: socket-id of the client
+        :param now: float time.monotonic() of the heartbeat
+        :return: None
+        """
+        if sid not in self.last_heartbeats:
+            heapq.heappush(self._deadlines, (now + self.timeout, sid))
+        self.last_heartbeats[sid] = now
+
+    def forget(self, sid: Sid) -> None:
+        """
+        Stop tracking a client, i.e. after it disconnected. Its heap entry is dropped when it comes up.
+        :param sid: socket-id of the client
+        :return: None
+        """
+        self.last_heartbeats.pop(sid, None)
+
+    def sweep(self, now: float) -> List[Sid]:
+        """
+        Find the clients that have not sent a heartbeat within the timeout. They are no longer tracked afterwards.
+        :param now: float current time.monotonic()
+        :return: List of the socket-ids that timed out
+        """
+        expired = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, sid = heapq.heappop(self._deadlines)
+            last_heartbeat = self.last_heartbeats.get(sid)
+            if last_heartbeat is None:
+                continue  # Forgotten
+            deadline = last_heartbeat + self.timeout
+            if deadline > now:
+                heapq.heappush(self._deadlines, (deadline, sid))
+            else:
+                del self.last_heartbeats[sid]
+                expired.append(sid)
+        self.reaped += len(expired)
+        return expired
+
+    @property
+    def tracked(self) -> int:
+        return len(self.last_heartbeats)
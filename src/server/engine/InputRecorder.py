@@ -0,0 +1,144 @@
+"""
+Recording of the inputs that drive a room, so that the room can be replayed deterministically (see engine.Replay).
+
+A recording is a JSON lines file. The first line is a header with everything needed to rebuild the room (level file,
+RNG seed, turn mode and physics backend). Every other line is either an input, i.e. a call of an ObjectManager method
+decorated with @recorded, or a digest of the room state. Both are tagged with the tick of the room's SimulationClock
+they happened on.
+"""
+import functools
+import hashlib
+import json
+import os
+import struct
+from inspect import iscoroutinefunction
+from typing import Any, Callable, Dict, List
+
+from .vector import Vector
+
+_double = struct.Struct('<d')
+
+
+def encode_argument(value: Any) -> Any:
+    """
+    Turn an input argument into something JSON can hold.
+    :param value: argument of an input method
+    :return: JSON compatible equivalent of value
+    """
+    if isinstance(value, Vector):
+        return {'__vector__': [value.x, value.y]}
+    return value
+
+
+def decode_argument(value: Any) -> Any:
+    """
+    Inverse of encode_argument.
+    :param value: JSON value from a recording
+    :return: the original argument
+    """
+    if isinstance(value, dict) and '__vector__' in value:
+        return Vector(*value['__vector__'])
+    return value
+
+
+def state_digest(object_manager) -> str:
+    """
+    Hash everything that the simulation depends on. Floats are hashed by their exact bits, so two rooms only have the
+    same digest if they are bit-identical. Object ids and cosmetic properties like colors are left out.
+    :param object_manager: ObjectManager to hash
+    :return: str hex digest
+    """
+    digest = hashlib.sha256()
+
+    def add_floats(*values: float) -> None:
+        for value in values:
+            digest.update(_double.pack(value))
+
+    add_floats(object_manager.clock.tick)
+    for planet in object_manager.planets.values():
+        digest.update(planet.altitudes.astype('<i8').tobytes())
+    for sid, tank in object_manager.tanks.items():
+        digest.update(sid.encode())
+        digest.update(tank.current_state.name.encode())
+        add_floats(tank.position.x, tank.position.y, tank.longitude, tank.angle, tank.power, tank.health_points,
+                   tank.currentFuel, tank.selected_bullet, tank.dead)
+    for bullet in object_manager.bullets + object_manager.pending_bullets:
+        digest.update(bullet.sprite_type.name.encode())
+        add_floats(bullet.position.x, bullet.position.y, bullet.velocity.x, bullet.velocity.y, bullet.dead)
+    for wormhole in object_manager.wormholes:
+        add_floats(wormhole.position.x, wormhole.position.y)
+    digest.update(str(object_manager.current_player_sid).encode())
+    add_floats(object_manager.total_turns, object_manager.game_started, object_manager.current_player_fired_gun)
+    return digest.hexdigest()
+
+
+class InputRecorder:
+    def __init__(self, path: str, header: Dict, digest_every: int = 60):
+        """
+        Start a new recording. An existing recording is never overwritten: if the path is taken, e.g. by another room
+        with the same seed that was created in the same second, a counter is added to the file name.
+        :param path: str path of the file to write the recording to
+        :param header: Dictionary describing how to rebuild the room
+        :param digest_every: int number of ticks between state digests
+        """
+        self.digest_every = digest_every
+        root, extension = os.path.splitext(path)
+        attempt = 0
+        while True:
+            self.path = path if not attempt else f'{root}-{attempt}{extension}'
+            try:
+                self.file = open(self.path, 'x')
+                break
+            except FileExistsError:
+                attempt += 1
+        self._write(header)
+
+    def _write(self, line: Dict) -> None:
+        self.file.write(json.dumps(line) + '\n')
+
+    def record(self, tick: int, name: str, args: List) -> None:
+        """
+        Log an input.
+        :param tick: int tick that the input arrived on
+        :param name: str name of the ObjectManager method
+        :param args: List of the arguments it was called with
+        :return: None
+        """
+        self._write({'tick': tick, 'input': name, 'args': [encode_argument(arg) for arg in args]})
+
+    def on_tick(self, object_manager) -> None:
+        """
+        Called by the ObjectManager at the beginning of every tick, before it moves anything.
+        :param object_manager: ObjectManager being recorded
+        :return: None
+        """
+        tick = object_manager.clock.tick
+        if tick % self.digest_every == 0:
+            self._write({'tick': tick, 'digest': state_digest(object_manager)})
+            self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def recorded(method: Callable) -> Callable:
+    """
+    Decorator for the ObjectManager methods that are inputs to the simulation. Each call is logged to the room's
+    recorder, if it has one, before the method runs. Since an input can disturb a world at rest, it also makes the room
+    simulate its next tick again. Arguments have to be positional.
+    """
+    if iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args):
+            if self.recorder is not None:
+                self.recorder.record(self.clock.tick, method.__name__, args)
+            self.quiescent = False
+            return await method(self, *args)
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            if self.recorder is not None:
+                self.recorder.record(self.clock.tick, method.__name__, args)
+            self.quiescent = False
+            return method(self, *args)
+    return wrapper
@@ -0,0 +1,137 @@
+"""
+Tracks the connection quality of each client, so that slow clients can be sent fewer state updates instead of backing
+up the server's write buffers.
+
+The round trip time is measured by the existing pongcheck event: the server sends a probe and the client acknowledges
+it. python-socketio does not expose the depth of a client's send queue, so the number of probes that have not been
+acknowledged yet stands in for it. Acknowledgements queue up behind everything else sent to the client, so they fall
+behind as soon as the client stops keeping up.
+"""
+from dataclasses import dataclass, field
+from math import ceil
+from time import monotonic
+from typing import Any, Dict, Optional, Iterable
+
+from socketio import AsyncServer
+
+from .Config import adaptive_rtt_target, adaptive_max_interval, adaptive_max_pending_probes, adaptive_probe_timeout
+from .util import Sid
+
+
+@dataclass
+class ClientLink:
+    sid: Sid
+    rtt: Optional[float] = None  # Smoothed round trip time in seconds. None until the first probe is acknowledged.
+    pending_probes: Dict[int, float] = field(default_factory=dict)  # Key is probe id, value is when it was sent
+    next_probe_id: int = 0
+    update_interval: int = 1  # Send every this many state updates
+    frames_skipped: int = 0  # State updates that were not sent to the client
+
+    def record_rtt(self, sample: float, smoothing: float = .2) -> None:
+        """
+        Fold a round trip time measurement into the exponentially weighted moving average, and pick the update interval
+        that goes with it.
+        :param sample: float round trip time in seconds
+        :param smoothing: float weight of the new sample
+        :return: None
+        """
+        self.rtt = sample if self.rtt is None else (1 - smoothing) * self.rtt + smoothing * sample
+        self.update_interval = min(adaptive_max_interval, max(1, ceil(self.rtt / adaptive_rtt_target)))
+
+    def expire_probes(self, now: float) -> None:
+        """
+        Give up on probes that were never acknowledged. They count as a round trip of adaptive_probe_timeout.
+        :param now: float current time.monotonic()
+        :return: None
+        """
+        for probe_id, sent in list(self.pending_probes.items()):
+            if now - sent >= adaptive_probe_timeout:
+                del self.pending_probes[probe_id]
+                self.record_rtt(adaptive_probe_timeout)
+
+    @property
+    def backed_up(self) -> bool:
+        return len(self.pending_probes) > adaptive_max_pending_probes
+
+
+class NetworkMonitor:
+    """
+    Measures each client's round trip time and decides which state updates are sent to it.
+
+    State updates (tanks and bullets) always describe the whole current state, so a skipped update is simply superseded
+    by the next one the client does get. Slow clients get every update_interval-th update, and clients that are backed
+    up get nothing until they catch up, at which point they receive the latest state (skip-to-latest).
+    """
+
+    def __init__(self, socket_io_server: AsyncServer):
+        self.sio = socket_io_server
+        self.links: Dict[Sid, ClientLink] = {}
+        self.frames_skipped: int = 0  # Total over every client, including the ones that are gone
+
+    def get_link(self, sid: Sid) -> ClientLink:
+        if sid not in self.links:
+            self.links[sid] = ClientLink(sid)
+        return self.links[sid]
+
+    def forget(self, sid: Sid) -> None:
+        """
+        Stop tracking a client, i.e. after it disconnected.
+        :param sid: socket-id of the client
+        :return: None
+        """
+        self.links.pop(sid, None)
+
+    async def probe(self, sid: Sid) -> None:
+        """
+        Send a round trip time probe to a client. The round trip is recorded when the client acknowledges it.
+        :param sid: socket-id of the client
+        :return: None
+        """
+        link = self.get_link(sid)
+        now = monotonic()
+        link.expire_probes(now)
+        probe_id = link.next_probe_id
+        link.next_probe_id += 1
+        link.pending_probes[probe_id] = now
+
+        def acknowledged(*args):
+            sent = link.pending_probes.pop(probe_id, None)
+            if sent is not None:
+                link.record_rtt(monotonic() - sent)
+
+        await self.sio.emit('pongcheck', {'probe': True}, room=sid, callback=acknowledged)
+
+    async def probe_all(self, sids: Iterable[Sid]) -> None:
+        """
+        Probe several clients.
+        :param sids: socket-ids of the clients
+        :return: None
+        """
+        for sid in sids:
+            await self.probe(sid)
+
+    def should_send(self, sid: Sid, frame: int) -> bool:
+        """
+        Check whether a client should get the state update with the given number.
+        :param sid: socket-id of the client
+        :param frame: int number of the state update
+        :return: True if the update should be sent to the client
+        """
+        link = self.links.get(sid)
+        if link is None:
+            return True  # Not measured yet
+        if link.backed_up or frame % link.update_interval:
+            link.frames_skipped += 1
+            self.frames_skipped += 1
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Dictionary of the monitor's metrics, for monitoring, with the round trip time (in seconds), update
+        interval and skipped state updates of each client
+        """
+        return {'frames_skipped': self.frames_skipped,
+                'clients_backed_up': sum(link.backed_up for link in self.links.values()),
+                'clients': {sid: {'rtt': link.rtt, 'update_interval': link.update_interval,
+                                  'frames_skipped': link.frames_skipped} for sid, link in self.links.items()}}
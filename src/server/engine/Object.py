@@ -5,12 +5,17 @@ from typing import Union
 from socketio import AsyncServer
 
 from .SoundType import SoundType
-from .SpriteType import SpriteType
+from .SpriteType import SpriteType, sprite_names, sprite_codes
 from .vector import Vector, Sphere
 from .util import colors
 
 
 class Object:
+    __slots__ = ('id', 'sprite_type', 'position', 'old_position', 'mass', 'rotation_speed', 'roll', 'velocity',
+                 'acceleration', 'affected_by_gravity', 'old_energy', 'collision_radius', 'gun_timer', 'smoke_timer',
+                 'hue', 'dead', 'strafe_left', 'strafe_right', 'is_bullet', 'changes_queue', '_need_to_emit_sound',
+                 'sound_type_to_emit', '_collision_sphere')
+
     def __init__(self, position: Vector, sprite_type: SpriteType = None):
         """
 
@@ -34,9 +39,10 @@ class Object:
         # debugging physics precision.
         self.old_energy: float = -1
         self.collision_radius: float = 0
-        # self._collision_sphere: Sphere = Sphere(self.position, self.collision_radius)
+        # Bounding volume that is kept for the lifetime of the object and updated in place, rather than reallocated.
+        self._collision_sphere: Sphere = Sphere(self.position, self.collision_radius)
 
-        self.gun_timer: float = 0
+        self.gun_timer: int = 0  # Tick of the room's SimulationClock that the gun was last fired on
         self.smoke_timer: float = 0
         self.hue = choice(colors)
         # self.smoke_color
@@ -58,7 +64,15 @@ class Object:
 
     @property
     def collision_sphere(self) -> Sphere:
-        return Sphere(self.position, self.collision_radius)
+        """
+        The bounding sphere of this object. The same Sphere is returned every time, synced in place with the current
+        position and collision radius, so hold on to it only as long as the object does not move.
+        :return: Sphere bounding this object
+        """
+        sphere = self._collision_sphere
+        sphere.center = self.position
+        sphere.radius = self.collision_radius
+        return sphere
 
     @property
     def speed(self):
@@ -80,9 +94,9 @@ class Object:
 
         # Improved accuracy could probably be found in doing a Runge Kutta integration, but that's way more work than
         # I want to commit today.
-        self.velocity += self.acceleration * dt
-        self.position += self.velocity * dt
-        self.collision_sphere.center = self.position
+        self.velocity = self.velocity.add_scaled(self.acceleration, dt)
+        self.position = self.position.add_scaled(self.velocity, dt)
+        self._collision_sphere.center = self.position
 
     def collision_response(self):
         self.old_position = self.position
@@ -118,7 +132,7 @@ class Object:
         """
         await server.emit('initial',
                           {'id': self.id,
-                           'sprite': str(self.sprite_type),
+                           'sprite': sprite_names[self.sprite_type],
                            'hue': self.hue,
                            'x': self.position.x,
                            'y': self.position.y}, *args, **kwargs)
@@ -139,7 +153,7 @@ class Object:
         if len(self.changes_queue):
             await server.emit('update',
                               {'id': self.id,
-                               'sprite': str(self.sprite_type),
+                               'sprite': sprite_codes[self.sprite_type],
                                'update': self.changes_queue}, *args, **kwargs)
         self.changes_queue = []
 
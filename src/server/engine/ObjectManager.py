@@ -1,19 +1,33 @@
-from datetime import datetime
+from dataclasses import dataclass
 from itertools import product
 from math import pi, cos, sin, atan2, sqrt
-from random import random, randint, choice
-from typing import List, Dict, Optional, Callable
+from random import Random, randrange, choice
+from time import strftime
+from typing import List, Dict, Optional, Callable, Iterable
 
+import numpy as np
 from socketio import AsyncServer
 
-from . import Common
+from . import Common, kernels, scoring
+from .AIScheduler import ai_scheduler
+from .AimOptimizer import AimSearch, ANGLE_RANGE, POWER_RANGE
 from .BulletObject import BulletObject
-from .Config import gravity_constant, turns_enabled
+from .Config import gravity_constant, turns_enabled, interest_management, interest_margin, interest_reduced_rate, \
+    adaptive_update_rate, ai_only_tick_limit, simulation_seed, replay_recording_path, replay_digest_every, \
+    ai_aim_mode, ai_aim_simulations, ai_accuracy_multiplier, ai_phantom_moves, ai_self_damage_penalty, \
+    ai_aim_hit_distance, ai_shot_cache_bucket, ai_think_ticks
+from .InputRecorder import InputRecorder, recorded
+from .NetworkMonitor import NetworkMonitor
 from .PlanetObject import PlanetObject
 from .PlayerInfo import PlayerInfo
-from .SpriteType import SpriteType
+from .ShotCache import ShotKey, shot_cache
+from .SimulationClock import SimulationClock
+from .SoundType import sound_codes
+from .SpriteType import SpriteType, sprite_codes
 from .TankObject import TankObject, TankState
 from .WormholeObject import WormholeObject
+from .geometry import circles_intersect_batch
+from .util import colors
 from .vector import Vector, Sphere, UnitVector
 
 
@@ -31,14 +45,67 @@ def only_if_current_player(func: Callable) -> Callable:
     return wrapper
 
 
+@dataclass
+class TankSpawn:
+    """Starting placement of a tank that was described by a level file."""
+    sid: str
+    longitude: float
+    planet_id: int
+    color: str
+    is_player: bool
+
+
+@dataclass
+class LevelSnapshot:
+    """
+    The initial state of a level, cached after the level file is loaded so that the level can be replayed in place
+    without re-reading the file or regenerating the planet terrain.
+    """
+    file_path: str
+    altitudes: Dict[int, np.ndarray]  # Key is the planet id, value is a copy of its initial altitudes
+    tank_spawns: List[TankSpawn]
+
+
+@dataclass
+class Explosion:
+    """An explosion that happened during a tick. They are all resolved together at the end of the collision phase."""
+    sphere: Sphere
+    damage: float
+    planet: Optional[PlanetObject]  # Planet whose terrain was hit, if any
+    destroys_terrain: bool
+    generates_terrain: bool
+
+
+@dataclass
+class AimPlan:
+    """The next shot of an AI tank, while it is being planned over several ticks (see ObjectManager.plan_aim)."""
+    search: AimSearch
+    longitude: float  # Where the tank will shoot from
+    key: Optional[ShotKey]  # Of the shot in the ShotCache, if the room uses it
+    deadline: int  # Tick of the room's clock on which the tank settles for the best aim found so far
+
+
 class ObjectManager:
-    def __init__(self, sio: Optional[AsyncServer] = None, file_path: str = ''):
+    def __init__(self, sio: Optional[AsyncServer] = None, file_path: str = '', seed: Optional[int] = None,
+                 ai_scheduled: bool = False):
+        """
+        :param sio: AsyncServer to send events from
+        :param file_path: path to the level file
+        :param seed: int seed of the room's random number generator. Defaults to simulation_seed, or a random seed if
+        that is None. Either way, the seed is kept in self.seed so that the room can be replayed.
+        :param ai_scheduled: True to plan the shots of AI tanks over several ticks, sharing the server's AI compute with
+        the other rooms through ai_scheduler, whose ticks the caller has to begin. False plans each shot all at once.
+        """
         self.explosions = []
+        self.pending_explosions: List[Explosion] = []  # Explosions of this tick that still have to be resolved
         self.users = []
         self.sockets = {}
         self.planets: Dict[str, PlanetObject] = {}
         self.tanks: Dict[str, TankObject] = {}
         self.bullets: List[BulletObject] = []
+        # Bullets created since the last tick boundary. They join self.bullets all at once in spawn_pending_bullets, so
+        # that self.bullets never changes while it is being iterated, and new bullets don't move on the tick they spawn.
+        self.pending_bullets: List[BulletObject] = []
         self.wormholes: List[WormholeObject] = []
 
         self.sio: Optional[AsyncServer] = sio
@@ -47,20 +114,60 @@ class ObjectManager:
         self.softening_parameter: float = 0
         self.dt: float = .001  # Time step for physics calculations
 
+        # All randomness and timing in the simulation comes from these, so that a room can be replayed exactly
+        self.seed: int = seed if seed is not None else simulation_seed if simulation_seed is not None \
+            else randrange(2 ** 32)
+        self.rng: Random = Random(self.seed)
+        self.clock: SimulationClock = SimulationClock()
+        self.recorder: Optional[InputRecorder] = None  # Records the inputs of this room when replay recording is on
+        self.ai_scheduled: bool = ai_scheduled
+
         self.level_name: str = ''
         self.world_size = Vector(0, 0)
+        self.updates_sent: int = 0  # Number of network updates sent, used to send culled objects at a reduced rate
+        self.ticks_simulated: int = 0  # Ticks of the started game that were simulated
+        self.ticks_skipped: int = 0  # Ticks of the started game that were skipped because the world was at rest
         self.game_started: bool = False
+        self.level_snapshot: Optional[LevelSnapshot] = None  # Initial state of the level, used to reset in place
         self.file_path: str = file_path or './levels/Stage 1/I Was Here First!.txt'
         if self.file_path:
             self.load_level_file(self.file_path)
 
         # Turn Manager Functionality
         self.turns_enabled = turns_enabled
+        self._reset_turn_state()
+
+        if replay_recording_path:
+            self.recorder = InputRecorder(f'{replay_recording_path}/{strftime("%Y%m%d-%H%M%S")}-{self.seed}.jsonl',
+                                          {'seed': self.seed, 'file_path': self.file_path,
+                                           'turns_enabled': self.turns_enabled,
+                                           'physics_backend': kernels.backend.name},
+                                          digest_every=replay_digest_every)
+
+    def __getstate__(self) -> Dict:
+        """
+        Pickle everything but the socket server, which has to be handed back to a revived ObjectManager, the replay
+        recorder, whose recording would not match the revived room anyway, and the AI's plans, which the thinking tanks
+        start over.
+        """
+        state = self.__dict__.copy()
+        state['sio'] = None
+        state['recorder'] = None
+        state['aim_plans'] = {}
+        return state
+
+    def _reset_turn_state(self) -> None:
+        """Put the turn manager back into its state before the game started."""
+        self.game_started = False
         self.current_player_sid: Optional[str] = None  # The current turn (# tank that input is controlling)
         self.current_tank: Optional[TankObject] = None  # The current tank whose turn it is
         self.total_turns: int = 0  # Total turns taken
         self.num_human_players: int = 0  # Number of human players
         self.current_player_fired_gun: bool = False  # Keep track if the current player has fired their gun
+        self.ticks_fast_forwarded: int = 0  # Ticks simulated while only AI tanks were left
+        self.abandoned: bool = False  # Only AI tanks were left and the game was given up on
+        self.quiescent: bool = False  # Nothing would change by moving, until the next input
+        self.aim_plans: Dict[str, AimPlan] = {}  # Shots that AI tanks are planning, by the sid of the tank
 
     def create_planet(self, position: Vector, mass: float = 0, radius: int = 500) -> PlanetObject:
         """
@@ -70,7 +177,7 @@ class ObjectManager:
         :param radius: int radius of planet
         :return: the planet object
         """
-        planet = PlanetObject(position, radius)
+        planet = PlanetObject(position, radius, rng=self.rng)
         if mass:
             planet.mass = mass
         self.planets[planet.id] = planet
@@ -87,7 +194,7 @@ class ObjectManager:
         :param sid: string representing the
         :return:
         """
-        tank = TankObject(longitude=longitude, planet=home_planet, color=color)
+        tank = TankObject(longitude=longitude, planet=home_planet, color=color, clock=self.clock, rng=self.rng)
         tank.is_player_character = is_player
         if sid not in [user.id for user in self.users]:
             self.users.append(PlayerInfo(sid, 0, 0, 0, 'ai', 0, Vector(0, 0), sid))
@@ -103,52 +210,72 @@ class ObjectManager:
         :param trail_color:
         :return:
         """
-        bullet = BulletObject(position, bullet_sprite)
+        bullet = BulletObject(position, bullet_sprite, clock=self.clock)
         bullet.hue = trail_color
-        self.bullets.append(bullet)
+        self.pending_bullets.append(bullet)
         return bullet
 
-    def create_phantom_bullet(self, bullet, position, velocity, owner) -> float:
+    def spawn_pending_bullets(self) -> None:
         """
+        Add the bullets created since the last tick boundary to the game.
+        :return: None
+        """
+        if self.pending_bullets:
+            self.bullets.extend(self.pending_bullets)
+            self.pending_bullets.clear()
 
-        :param bullet:
-        :param position:
-        :param velocity:
-        :param owner:
-        :return:
+    @property
+    def bullets_in_flight(self) -> int:
+        """
+        :return: int number of bullets in the game, including the ones that are yet to be spawned
+        """
+        return len(self.bullets) + len(self.pending_bullets)
+
+    def score_phantom_shots(self, tank: TankObject, longitude: float, angles: np.ndarray,
+                            powers: np.ndarray) -> np.ndarray:
+        """
+        Fire a batch of phantom shots, the way fire_gun would fire them if the tank stood at longitude, fly them until
+        they land, and score them (see engine.scoring).
+        :param tank: TankObject that shoots
+        :param longitude: float longitude the tank shoots from
+        :param angles: ndarray of the turret angles of the shots, in degrees
+        :param powers: ndarray of the powers of the shots
+        :return: ndarray of the score of each shot, i.e. how close it comes to an enemy tank. Lower is better.
+        """
+        position = tank.position_at_longitude(longitude)
+        phantom_bullet = BulletObject(position, tank.bullet_types[tank.selected_bullet % len(tank.bullet_types)],
+                                      clock=self.clock)
+        roll = pi + (angles + longitude) * pi / 180
+        start_x, start_y = np.full(angles.size, position.x), np.full(angles.size, position.y)
+        # fire_gun shoots along -view_vector
+        flight = kernels.fly(start_x, start_y, powers * np.sin(roll), -powers * np.cos(roll),
+                             phantom_bullet.collision_radius, self.planet_field(),
+                             .1,  # Time step of Object.move
+                             ai_phantom_moves, (self.world_size.x, self.world_size.y))
+        enemy_x, enemy_y = self.enemy_positions(tank)
+        return scoring.score_shots(flight, start_x, start_y, enemy_x, enemy_y,
+                                   reach=phantom_bullet.explosion_radius + tank.collision_radius,
+                                   penalty=ai_self_damage_penalty)
+
+    def enemy_positions(self, tank: TankObject) -> (np.ndarray, np.ndarray):
+        """
+        :param tank: TankObject whose enemies to find
+        :return: ndarrays of the x and y coordinates of every living tank other than tank
+        """
+        enemies = [enemy.position for enemy in self.tanks.values() if enemy is not tank and not enemy.dead]
+        return np.array([position.x for position in enemies]), np.array([position.y for position in enemies])
+
+    def move_bullet(self, bullet, gravity: Vector):
+        """
+        :param bullet: BulletObject to move
+        :param gravity: Vector of the acceleration of the planets at the bullet's position, see calculate_gravity
         """
-        phantom_bullet = BulletObject(position, bullet)
-        phantom_bullet.velocity = velocity
-        phantom_bullet.owner = owner
-        datetime.now().timestamp()
-        dt = self.dt
-        # Force it to the next place if it's not dead without waiting for the physics engine to catch up
-        for _ in range(1000):
-            if not phantom_bullet.dead:
-                phantom_bullet.acceleration = self.calculate_gravity(phantom_bullet.position)
-                phantom_bullet.velocity += phantom_bullet.acceleration * dt
-                phantom_bullet.position += phantom_bullet.velocity * dt
-                # phantom_bullet.move()
-                # Check for planet collisions
-                for _, planet in self.planets.items():
-                    if planet.intersects(phantom_bullet.collision_sphere):
-                        phantom_bullet.dead = True
-                    # TODO: Deal with world edge
-                    # TODO: Implement Wormholes
-        final_pos = phantom_bullet.position
-        # TODO: De-incentivize suicide shots by figuring out how to maximize how far away it is from the player
-        self_distance = abs(owner.position - final_pos)
-        if self_distance > 50:
-            self_distance = 1
-        return self.get_nearest_tank_location(final_pos, owner)
-
-    def move_bullet(self, bullet):
         old_position: Vector = bullet.position
         if self.at_world_edge(old_position):
             bullet.kill()
 
         if bullet.splitter:
-            if datetime.now().timestamp() - bullet.time_created >= bullet.splitter_time != 0:
+            if bullet.age >= bullet.splitter_ticks != 0:
                 rads: float = 20.0 * pi / 180  # Convert degrees to radians
                 for i in range(bullet.splitter_counter):
                     new_bullet = self.create_bullet(bullet_sprite=bullet.sprite_type,
@@ -168,7 +295,7 @@ class ObjectManager:
                     new_bullet.velocity *= 1.25
                 bullet.kill()
 
-        bullet.acceleration = self.calculate_gravity(old_position)
+        bullet.acceleration = gravity
         if bullet.accelerator:
             bullet.acceleration += bullet.velocity
         # print('Bullet position:', bullet.position, abs(bullet.position))
@@ -180,11 +307,11 @@ class ObjectManager:
         if currently_my_turn:
             tank.think()
             if tank.current_state == TankState.FireWait:
-                self.fire_gun_sid(sid)
+                self._fire_gun_sid(sid)
                 tank.current_state = TankState.PostFire
             elif tank.current_state == TankState.Think:
-                self.adjust_aim(tank)
-                tank.current_state = TankState.Move
+                if self.plan_aim(sid, tank):
+                    tank.current_state = TankState.Move
             elif tank.current_state == TankState.PostFire:
                 if tank.is_player_character:
                     tank.current_state = TankState.Manual
@@ -197,31 +324,74 @@ class ObjectManager:
         Move all of the objects and perform collision detection and response
         :return:
         """
+        self.clock.advance()
+        if self.recorder is not None:
+            self.recorder.on_tick(self)
         if not self.game_started:
             return
-        for bullet in self.bullets:
-            self.move_bullet(bullet)
+        if self.quiescent:
+            self.ticks_skipped += 1
+            return
+        self.ticks_simulated += 1
+        self.spawn_pending_bullets()  # Fired by players since the last tick
+        for bullet, gravity in zip(self.bullets, self.calculate_gravity([bullet.position for bullet in self.bullets])):
+            self.move_bullet(bullet, gravity)
+        # Whether the turn move of the tank whose turn it is changed nothing. Its gun is only aimed in the turn move, so
+        # the first one after strafing or getting the turn still has an effect.
+        current_tank_settled = not self.turns_enabled
         if self.turns_enabled:
-            if not len(self.bullets):
-                self.move_tank(self.current_player_sid, self.current_tank)
-            if self.current_player_fired_gun and not len(self.bullets):
+            if not self.bullets_in_flight:
+                tank = self.current_tank
+                position, roll = tank.position, tank.roll
+                self.move_tank(self.current_player_sid, tank)
+                current_tank_settled = tank.position == position and tank.roll == roll
+            if self.current_player_fired_gun and not self.bullets_in_flight:
                 self.current_player_fired_gun = False
                 await self.next_turn()
+                current_tank_settled = False
         for sid, tank in self.tanks.items():
-            self.move_tank(sid, tank, currently_my_turn=False)
+            if not tank.asleep:
+                self.move_tank(sid, tank, currently_my_turn=False)
 
         self.collision_phase()
         await self.cull_dead_objects(server)
+        self.spawn_pending_bullets()  # Split, bounced and fired during this tick
+        self.quiescent = current_tank_settled and self.is_at_rest
 
-    def calculate_gravity(self, position) -> Vector:
-        acceleration: Vector = Vector(0, 0)
-        for _, planet in self.planets.items():
-            difference: Vector = planet.position - position
-            mag = abs(difference)
-            unit = difference / mag
+    @property
+    def is_at_rest(self) -> bool:
+        """
+        Whether moving the world would not change anything, i.e. there are no bullets in flight, every tank is asleep
+        and the tank whose turn it is waits for its player. Only an input can disturb such a world.
+        :return: True if the world is at rest
+        """
+        if self.bullets_in_flight or self.pending_explosions or self.current_player_fired_gun:
+            return False
+        if self.turns_enabled:
+            tank = self.current_tank
+            if tank is None or tank.current_state != TankState.Manual or tank.power_speed:
+                return False
+        return all(tank.asleep for tank in self.tanks.values())
 
-            acceleration += gravity_constant * planet.mass / mag ** 2 * unit
-        return acceleration
+    def calculate_gravity(self, positions: List[Vector]) -> List[Vector]:
+        """
+        Gravitational acceleration of the planets at several positions at once, e.g. of every bullet in flight.
+        :param positions: List of Vectors
+        :return: List of the acceleration Vectors at each of the positions
+        """
+        if not positions:
+            return []
+        acceleration_x, acceleration_y = kernels.gravity(np.array([position.x for position in positions]),
+                                                         np.array([position.y for position in positions]),
+                                                         kernels.PlanetField.from_planets(self.planets.values(),
+                                                                                          terrain=False))
+        return [Vector(x, y) for x, y in zip(acceleration_x.tolist(), acceleration_y.tolist())]
+
+    def planet_field(self) -> kernels.PlanetField:
+        """
+        :return: PlanetField of the current planets, for the physics kernels
+        """
+        return kernels.PlanetField.from_planets(self.planets.values())
 
     def at_world_edge(self, old_position) -> bool:
         return (old_position.x < 0 or old_position.x > self.world_size.x or
@@ -234,29 +404,74 @@ class ObjectManager:
         # for user in self.users:
         #     await user.emit_initial(self.tanks, sio, *args, **kwargs)
 
-    async def send_updates(self, sio: AsyncServer, *args, **kwargs):
+    def discard_updates(self) -> None:
+        """
+        Drop the changes since the last update without sending them, e.g. while nobody is watching the room.
+        :return: None
+        """
+        for planet in self.planets.values():
+            planet.changes_queue = []
+        self.explosions = []
+
+    async def send_updates(self, sio: AsyncServer, *args, network_monitor: Optional[NetworkMonitor] = None,
+                           **kwargs):
+        """
+        Send the changes since the last update to the clients in this room.
+        :param sio: AsyncServer to send the updates from
+        :param network_monitor: NetworkMonitor that decides which clients are due for a state update. If None, every
+        client gets every update.
+        :return: None
+        """
+        # Planet changes are deltas, so they are always sent to everyone.
         for planet in self.planets.values():
             await planet.emit_changes(sio, *args, **kwargs)
 
         # It creates rendering issues (graphical stuttering) when we send the tanks one at a time.
         # Avoid this by sending all in one msg.
-        await sio.emit('update-tanks',
-                       [users.get_changes(self.tanks) for users in self.users],
-                       *args, **kwargs)
+        tanks = [users.get_changes(self.tanks) for users in self.users]
         # for user in self.users:
         #     await user.emit_changes(self.tanks, sio, *args, **kwargs)
 
         # It creates rendering issues (graphical stuttering) when we send the bullets one at a time.
         # Avoid this by sending all in one msg.
-        await sio.emit('update-bullets',
-                       [bullet.get_json() for bullet in self.bullets],
-                       *args, **kwargs)
+        bullets = [bullet.get_json() for bullet in self.bullets]
         # for bullet in self.bullets:
         #   await bullet.emit_changes(sio)
-
-        # Send explosions
-        await sio.emit('update-explosions', self.explosions)
-        self.explosions = []
+        explosions, self.explosions = self.explosions, []
+        self.updates_sent += 1
+
+        # AI tanks have nobody to send to. A player can be listed twice (see create_tank), so go by socket.
+        viewers = {user.id: user for user in self.users if user.id in self.sockets}
+        # Tanks and bullets are sent as whole states, so clients on a slow connection can skip some.
+        due = {user_id for user_id in viewers if network_monitor is None or not adaptive_update_rate
+               or network_monitor.should_send(self.sockets[user_id], self.updates_sent)}
+        focus = self.camera_focus()
+        cull = interest_management and focus is not None and self.updates_sent % interest_reduced_rate != 0
+
+        if not cull and len(due) == len(viewers):
+            await sio.emit('update-tanks', tanks, *args, **kwargs)
+            await sio.emit('update-bullets', bullets, *args, **kwargs)
+            await sio.emit('update-explosions', explosions, *args, **kwargs)
+            return
+        if not cull:
+            await sio.emit('update-explosions', explosions, *args, **kwargs)
+
+        # Area of interest culling: each client only gets the bullets and explosions near its viewport.
+        for user in viewers.values():
+            client_kwargs = {**kwargs, 'room': self.sockets[user.id]}
+            if user.id in due:
+                own_tank = self.tanks.get(user.id)
+                await sio.emit('update-tanks', tanks, *args, **client_kwargs)
+                await sio.emit('update-bullets',
+                               [json for json, bullet in zip(bullets, self.bullets)
+                                if not cull or bullet.owner is own_tank
+                                or self._in_viewport(bullet.position, focus, user)],
+                               *args, **client_kwargs)
+            if cull:
+                await sio.emit('update-explosions',
+                               [explosion for explosion in explosions
+                                if self._in_viewport(Vector(explosion['x'], explosion['y']), focus, user)],
+                               *args, **client_kwargs)
 
         # for u in self.users:
         #     # center the view if x/y is undefined, this will happen for spectators
@@ -282,20 +497,64 @@ class ObjectManager:
         #     sid = self.sockets[u.id]
         #     await sio.emit('serverTellPlayerMove', [user_transmit, [], [], []], room=sid)
 
+    def camera_focus(self) -> Optional[Vector]:
+        """
+        The point that the clients center their camera on, mirroring the client: the first bullet in flight in
+        turn-based games, otherwise the tank whose turn it is.
+        :return: Vector of the camera center, or None if there is nothing to follow
+        """
+        if self.turns_enabled and self.bullets:
+            return self.bullets[0].position
+        if self.current_tank is not None:
+            return self.current_tank.position
+        return None
+
+    @staticmethod
+    def _in_viewport(position: Vector, focus: Vector, user: PlayerInfo) -> bool:
+        """
+        Check whether a position is close enough to a client's viewport for the client to need it. The client rotates
+        its view around the screen center, so the viewport is treated as the circle around its diagonal.
+        :param position: Vector position of the object
+        :param focus: Vector center of the client's camera
+        :param user: PlayerInfo of the client, holding its screen size. A screen size of zero disables culling.
+        :return: True if the object should be sent to the client.
+        """
+        if not user.screenWidth or not user.screenHeight:
+            return True
+        radius = sqrt(user.screenWidth ** 2 + user.screenHeight ** 2) / 2 + interest_margin
+        return (position.x - focus.x) ** 2 + (position.y - focus.y) ** 2 <= radius ** 2
+
+    def resize_viewport(self, sid: str, screen_width: int, screen_height: int) -> None:
+        """
+        Record the new screen size of a client, which determines what is sent to it.
+        :param sid: socket-id of the client
+        :param screen_width: int width of the client's screen in game units
+        :param screen_height: int height of the client's screen in game units
+        """
+        for user in self.users:
+            if user.id == sid:
+                user.screenWidth = screen_width
+                user.screenHeight = screen_height
+
+    @recorded
     async def strafe_right(self, sid):
         try:
             self.tanks[sid].strafe_right = True
+            self.tanks[sid].wake()
             await self.calculate_current_player_trajectory(self.sio)
         except KeyError:  # Dead player trying to move. Avoid crash
             pass
 
+    @recorded
     async def strafe_left(self, sid):
         try:
             self.tanks[sid].strafe_left = True
+            self.tanks[sid].wake()
             await self.calculate_current_player_trajectory(self.sio)
         except KeyError:  # Dead player trying to move. Avoid crash
             pass
 
+    @recorded
     def remove_player(self, sid):
         try:
             del self.tanks[sid]
@@ -309,6 +568,7 @@ class ObjectManager:
         except IndexError:
             pass
 
+    @recorded
     async def angle_left(self, sid):
         try:
             self.tanks[sid].rotation_speed = -1
@@ -316,6 +576,7 @@ class ObjectManager:
         except KeyError:
             pass
 
+    @recorded
     async def angle_right(self, sid):
         try:
             self.tanks[sid].rotation_speed = 1
@@ -361,38 +622,19 @@ class ObjectManager:
         while not owner.bullet_counts[owner.selected_bullet]:
             owner.next_bullet_type()
 
-        owner.gun_timer = datetime.now().timestamp()
+        owner.gun_timer = self.clock.tick
 
         # TODO: Gunfire particle effect on client side
 
-    def fire_phantom_gun(self, bullet: SpriteType, orientation: Vector, power: float, owner: TankObject,
-                         position: Vector = None) -> float:
+    @recorded
+    def fire_gun_sid(self, sid):
         """
-
-        :param bullet:
-        :param orientation:
-        :param power:
-        :param owner:
-        :param position:
-        :return:
+        Fire the gun of a player's tank, if it is their turn.
+        :param sid: socket-id of the player
         """
-        if position is None:  # In the default case, use the current position
-            position = owner.position
-        position = position + .5 * owner.collision_radius * orientation
-        power = owner.power
-
-        # to get better results, we should average this over a couple shots with adjusted angles/power.
-        # The physics simulations will mess us up quite frequently.
-        num_simulations: int = 3
-        running_distance_sum: float = 0
-        for i in range(num_simulations):
-            if i:
-                power /= 1.01
-                velocity = owner.velocity + power * orientation  # Power is the starting velocity
-                running_distance_sum += self.create_phantom_bullet(bullet, position, velocity, owner)
-        return running_distance_sum / num_simulations
+        self._fire_gun_sid(sid)
 
-    def fire_gun_sid(self, sid):
+    def _fire_gun_sid(self, sid):
         try:
             if (sid == self.current_player_sid and not self.current_player_fired_gun) or not self.turns_enabled:
                 tank = self.tanks[sid]
@@ -413,7 +655,9 @@ class ObjectManager:
         #                     wormhole.collision_sphere.radius + bullet.collision_sphere.radius) * bullet.velocity
 
         for bullet, tank in product(self.bullets, list(self.tanks.values())):
-            intersects = bullet.collision_sphere.intersects_circle_fast(tank.collision_sphere)
+            position = bullet.position
+            intersects = tank.collision_sphere.intersects_circle_fast_xyr(position.x, position.y,
+                                                                         bullet.collision_radius)
             # If the bullet intersects a tank
             # Additionally, we don't want the bullets to "misfire" i.e. explode before leaving the tank that
             # shot them.
@@ -421,29 +665,33 @@ class ObjectManager:
                 self._explode_bullet(bullet, tank=tank)
                 tank.take_damage(bullet.damage)
 
-        for bullet, planet in product(self.bullets, list(self.planets.values())):
-            if planet.intersects(bullet.collision_sphere):
-                self._explode_bullet(bullet, planet)
+        if self.bullets:
+            # Every bullet against the terrain of every planet at once
+            planets = list(self.planets.values())
+            bullets = list(self.bullets)
+            hits = kernels.collides(np.array([bullet.position.x for bullet in bullets]),
+                                    np.array([bullet.position.y for bullet in bullets]),
+                                    np.array([bullet.collision_radius for bullet in bullets]),
+                                    kernels.PlanetField.from_planets(planets))
+            for i, bullet in enumerate(bullets):
+                for p in np.flatnonzero(hits[:, i]):
+                    self._explode_bullet(bullet, planets[p])
+
+        self.resolve_explosions()
 
     def _explode_bullet(self, bullet: BulletObject, planet: PlanetObject = None, tank: TankObject = None):
         self.explosions.append({'x': bullet.position.x,
                                 'y': bullet.position.y,
-                                'sprite': str(bullet.explosion_sprite),
+                                'sprite': sprite_codes[bullet.explosion_sprite],
                                 'radius': bullet.explosion_radius,
-                                'sound': str(bullet.explosion_sound)})
-        self.damage_players_in_sphere(Sphere(bullet.position, bullet.explosion_radius), bullet.damage)
-        if bullet.destroys_terrain:
-            damage_sphere = Sphere(bullet.position, bullet.explosion_radius)
-            if tank and not planet:
-                planet = tank.home_planet
-            if planet:
-                planet.destroy_terrain(damage_sphere)
-        if bullet.generates_terrain:
-            damage_sphere = Sphere(bullet.position, bullet.explosion_radius)
-            if tank and not planet:
-                planet = tank.home_planet
-            if planet:
-                planet.generate_terrain(damage_sphere)
+                                'sound': sound_codes[bullet.explosion_sound]})
+        if tank and not planet:
+            planet = tank.home_planet
+        self.pending_explosions.append(Explosion(sphere=Sphere(bullet.position, bullet.explosion_radius),
+                                                 damage=bullet.damage,
+                                                 planet=planet,
+                                                 destroys_terrain=bullet.destroys_terrain,
+                                                 generates_terrain=bullet.generates_terrain))
         if bullet.bounce_limit > 0 and bullet.bounces < bullet.bounce_limit:
             self.bounce_bullet(planet, bullet)
         if bullet.teleporter:
@@ -487,15 +735,15 @@ class ObjectManager:
         new_bullet.bounces = bullet.bounces + 1
 
     async def cull_dead_objects(self, server: AsyncServer):
-        dead_bullets = [bullet for bullet in self.bullets if bullet.dead]
-        for bullet in dead_bullets:
-            self.bullets.remove(bullet)
+        if any(bullet.dead for bullet in self.bullets):
+            self.bullets[:] = [bullet for bullet in self.bullets if not bullet.dead]
 
         dead_tanks_sids = [sid for sid, tank in self.tanks.items() if tank.dead]
         for sid in dead_tanks_sids:
             self.tanks.pop(sid)
             await server.emit('RIP', room=sid)
 
+    @recorded
     async def power_up(self, sid):
         try:
             player = self.tanks[sid]
@@ -506,6 +754,7 @@ class ObjectManager:
             # Player is dead
             pass
 
+    @recorded
     async def power_down(self, sid):
         try:
             player = self.tanks[sid]
@@ -516,17 +765,67 @@ class ObjectManager:
             # Player is dead
             pass
 
-    def damage_players_in_sphere(self, sphere: Sphere, damage: int) -> None:
+    def resolve_explosions(self) -> None:
         """
-        Iterate over all the players and damage them if they are inside the explosion sphere
-        :param sphere: BoundingSphere representing the explosion
-        :param damage: how much to damage players.
-        :return:
+        Damage the tanks and the terrain with all of the explosions of this tick at once. Each tank takes the total
+        damage of the explosions it is caught in, and each planet gets all of its craters in a single terrain update.
+        :return: None
         """
-        for _, tank in self.tanks.items():
-            intersect = sphere.intersects_circle_fast(tank.collision_sphere)
-            if intersect:
-                tank.take_damage(damage)
+        if not self.pending_explosions:
+            return
+        explosions, self.pending_explosions = self.pending_explosions, []
+        self.damage_tanks_in_explosions(explosions)
+
+        craters: Dict[PlanetObject, List] = {}
+        for explosion in explosions:
+            if not (explosion.destroys_terrain or explosion.generates_terrain):
+                continue
+            crater = (explosion.sphere, explosion.destroys_terrain, explosion.generates_terrain)
+            for planet in self.planets.values():
+                # Explosions also dig into the terrain of a neighbouring planet that they reach
+                if planet is explosion.planet or planet.intersects(explosion.sphere):
+                    craters.setdefault(planet, []).append(crater)
+        for planet, planet_craters in craters.items():
+            changed_indices = planet.apply_craters(planet_craters)
+            if changed_indices.size:
+                self.wake_tanks_on(planet, changed_indices)
+
+    def wake_tanks_on(self, planet: PlanetObject, altitude_indices: Optional[np.ndarray] = None) -> None:
+        """
+        Wake the tanks resting on terrain that changed.
+        :param planet: PlanetObject whose terrain changed
+        :param altitude_indices: ndarray of the altitude indices that changed. Defaults to the whole planet.
+        :return: None
+        """
+        self.quiescent = False
+        for tank in self.tanks.values():
+            if tank.asleep and tank.home_planet is planet and (
+                    altitude_indices is None
+                    or planet.get_altitude_index_at_angle(tank.longitude) in altitude_indices):
+                tank.wake()
+
+    def damage_tanks_in_explosions(self, explosions: List[Explosion]) -> None:
+        """
+        Damage every tank whose boundary intersects the boundary of an explosion, all in one distance computation.
+        :param explosions: List of the explosions
+        :return: None
+        """
+        tanks = list(self.tanks.values())
+        if not tanks:
+            return
+        tank_x = np.array([tank.position.x for tank in tanks])
+        tank_y = np.array([tank.position.y for tank in tanks])
+        tank_radius = np.array([tank.collision_radius for tank in tanks])
+        explosion_x = np.array([[explosion.sphere.center.x] for explosion in explosions])
+        explosion_y = np.array([[explosion.sphere.center.y] for explosion in explosions])
+        explosion_radius = np.array([[explosion.sphere.radius] for explosion in explosions])
+        damages = np.array([explosion.damage for explosion in explosions])
+
+        # Rows are explosions and columns are tanks
+        caught = circles_intersect_batch(explosion_x, explosion_y, explosion_radius, tank_x, tank_y, tank_radius)
+        for tank, is_caught, damage in zip(tanks, caught.any(axis=0), damages @ caught):
+            if is_caught:
+                tank.take_damage(float(damage))
 
     def load_level_file(self, path: str):
         """
@@ -535,6 +834,7 @@ class ObjectManager:
         :return:
         """
         i = 0
+        tank_spawns: List[TankSpawn] = []
         with open(path, 'r') as file:
             lines = file.readlines()
             for line in lines:
@@ -552,66 +852,149 @@ class ObjectManager:
                 elif pieces[0] == 'TANK':
                     # Todo get planet number (which is pieces[2], since self.planets is a dict
                     if bool(int(pieces[4])):
-                        self.create_tank(float(pieces[1]), choice(list(self.planets.values())), sid=f'ai-{i}',
-                                         color=pieces[3],
-                                         is_player=False  # is_player=bool(int(pieces[4]))
-                                         )
+                        spawn = TankSpawn(sid=f'ai-{i}',
+                                          longitude=float(pieces[1]),
+                                          planet_id=self.rng.choice(list(self.planets.values())).id,
+                                          color=pieces[3],
+                                          is_player=False  # is_player=bool(int(pieces[4]))
+                                          )
+                        self._spawn_tank(spawn)
+                        tank_spawns.append(spawn)
                     i += 1
 
+        self.level_snapshot = LevelSnapshot(file_path=path,
+                                            altitudes={planet.id: planet.altitudes.copy()
+                                                       for planet in self.planets.values()},
+                                            tank_spawns=tank_spawns)
+
+    def _spawn_tank(self, spawn: TankSpawn) -> TankObject:
+        """
+        Create a tank from its level file description.
+        :param spawn: TankSpawn describing where the tank starts
+        :return: the tank object
+        """
+        return self.create_tank(spawn.longitude, self.planets[spawn.planet_id], sid=spawn.sid, color=spawn.color,
+                                is_player=spawn.is_player)
+
+    @recorded
     def next_bullet(self, sid):
         self.tanks[sid].selected_bullet = (self.tanks[sid].selected_bullet + 1) % len(self.tanks[sid].bullet_counts)
 
-    def random_aim_once(self, tank: TankObject, longitude):
-        # Randomize the aim parameters
-        test_angle = randint(-15, 195) % 360
-        test_longitude = longitude
-        test_power = float(randint(50, 1000))
-        test_roll = pi + (test_angle + test_longitude) * pi / 180
-        view = Vector(-sin(test_roll), cos(test_roll))  # Orientation of the phantom bullet.
-        new_distance = self.fire_phantom_gun(SpriteType.WATER_SPRITE, view, test_power, tank, tank.position)
-        return test_angle, test_power, test_roll, new_distance
+    def adjust_aim(self, tank: TankObject, monte_carlo: bool = ai_aim_mode == 'monte_carlo'):
+        """
+        Plan the whole next shot of an AI tank at once: it keeps roughly to its longitude, and looks for the turret
+        angle and power whose phantom shot comes closest to an enemy.
+        :param tank: TankObject of the AI whose turn it is
+        :param monte_carlo: True to try int(1000 * tank.accuracy_multiplier) random aims. False to run the AimSearch of
+        start_aim_search to the end, whose budget also scales with tank.accuracy_multiplier.
+        :return: None
+        """
+        if not monte_carlo:
+            plan = self.start_aim_search(tank)
+            plan.search.run()
+            self.finish_aim_search(tank, plan)
+            return
 
-    def adjust_aim(self, tank: TankObject, monte_carlo: bool = True):
+        test_longitude: float = tank.desired_longitude + self.rng.randint(-10, 10)
+
+        def evaluate(angles: np.ndarray, powers: np.ndarray) -> np.ndarray:
+            return self.score_phantom_shots(tank, test_longitude, angles, powers)
+
+        trials = [(self.rng.randint(*ANGLE_RANGE) % 360, float(self.rng.randint(*POWER_RANGE)))
+                  for _ in range(int(1000 * tank.accuracy_multiplier))]
+        # The current aim goes first, so we have something to compare to.
+        angles = np.array([tank.desired_angle] + [angle for angle, _ in trials], dtype=float)
+        powers = np.array([tank.desired_power] + [power for _, power in trials], dtype=float)
+        distances = evaluate(angles, powers)
+        previous_distance = distances[0]
+        for test_angle, test_power, new_distance in zip(angles[1:], powers[1:], distances[1:]):
+            if new_distance < previous_distance:
+                previous_distance = new_distance
+                deflection = 2.5 * (2 * self.rng.random() - 1)
+                tank.desired_angle = float(test_angle) + deflection
+                tank.desired_longitude = test_longitude
+                tank.desired_power = float(test_power)
+
+    def plan_aim(self, sid: str, tank: TankObject) -> bool:
+        """
+        Plan the next shot of an AI tank, as far as this tick allows. In rooms that are ai_scheduled, the AimSearch
+        runs for the room's share of ai_scheduler's budget on every tick, until it is done or the tank has thought
+        for ai_think_ticks. Other rooms, recorded rooms, whose replays have to plan on the same ticks, and the monte
+        carlo mode plan the whole shot at once with adjust_aim.
+        :param sid: str sid of the tank
+        :param tank: TankObject of the AI whose turn it is
+        :return: True once the shot is planned
         """
+        if not self.ai_scheduled or self.recorder is not None or ai_aim_mode == 'monte_carlo':
+            self.adjust_aim(tank)
+            return True
+        plan = self.aim_plans.get(sid)
+        if plan is None:
+            plan = self.aim_plans[sid] = self.start_aim_search(tank)
+        out_of_time = self.clock.tick >= plan.deadline
+        # A tank that is out of time still needs at least one aim to settle for
+        ai_scheduler.run(self, plan.search, minimum_steps=int(out_of_time and plan.search.best is None))
+        if not plan.search.done and not out_of_time:
+            return False
+        del self.aim_plans[sid]
+        ai_scheduler.finish(plan.search)
+        self.finish_aim_search(tank, plan)
+        return True
+
+    def start_aim_search(self, tank: TankObject) -> AimPlan:
+        """
+        Set up the AimSearch for the next shot of an AI tank: it keeps roughly to its longitude, and looks for the
+        turret angle and power whose phantom shot comes closest to an enemy. The search is warm started from the shared
+        ShotCache, except in rooms that are recorded, since a replay could not reproduce the cache. The search may fire
+        ai_aim_simulations phantom shots at the default difficulty, scaled by the tank's accuracy_multiplier like the
+        random aims of the monte carlo mode.
+        :param tank: TankObject of the AI whose turn it is
+        :return: AimPlan of the shot, whose search has not fired anything yet
+        """
+        test_longitude: float = tank.desired_longitude + self.rng.randint(-10, 10)
 
-        :param tank:
-        :param monte_carlo:
-        :return:
+        def evaluate(angles: np.ndarray, powers: np.ndarray) -> np.ndarray:
+            return self.score_phantom_shots(tank, test_longitude, angles, powers)
+
+        key = self.shot_key(tank) if self.recorder is None else None
+        cached = shot_cache.get(key) if key is not None else None
+        budget = max(1, round(ai_aim_simulations * tank.accuracy_multiplier / ai_accuracy_multiplier))
+        search = AimSearch(evaluate, budget, initial=(tank.desired_angle, tank.desired_power),
+                           warm_start=(cached.angle, cached.power) if cached else None,
+                           good_enough=ai_aim_hit_distance)
+        return AimPlan(search, test_longitude, key, self.clock.tick + ai_think_ticks)
+
+    def finish_aim_search(self, tank: TankObject, plan: AimPlan) -> None:
         """
-        test_angle: float = tank.desired_angle
-        test_longitude: float = tank.desired_longitude + randint(-10, 10)
-        test_power: float = tank.desired_power
-        # Set the roll so that it compensates for the inclination on the planet
-        test_roll: float = pi + (test_angle + test_longitude) * pi / 180
-        view: Vector = Vector(-sin(test_roll), cos(test_roll))  # Orientation of the phantom bullet.
-        previous_distance = self.fire_phantom_gun(SpriteType.WATER_SPRITE, view, test_power, tank,
-                                                  tank.position)  # Initial guess, so we have something to compare to.
-        if monte_carlo:
-            trials = [self.random_aim_once(tank, test_longitude) for _ in range(int(1000 * tank.accuracy_multiplier))]
-            for test_angle, test_power, test_roll, new_distance in trials:
-                if new_distance < previous_distance:
-                    previous_distance = new_distance
-                    deflection = 2.5 * (2 * random() - 1)
-                    tank.desired_angle = test_angle + deflection
-                    tank.desired_longitude = test_longitude
-                    tank.desired_power = test_power
-        else:
-            # Implement either gradient descent and/or particle swarm optimization
-            """"""
-            print()
-
-    def get_nearest_tank_location(self, position: Vector, origin: TankObject):
-        current_closest_length = -1
-        distance: float = 0
-        for _, tank in self.tanks.items():
-            if tank != origin and not tank.dead:
-                distance = abs(position - tank.position)
-                # distance /= 1 - exp(-abs(origin.position - tank.position)**2/250)
-
-        if current_closest_length == -1 or distance < current_closest_length:
-            current_closest_length = distance
-        # TODO: Wormholes and suicide shots
-        return current_closest_length
+        Aim an AI tank with the best aim its search found, give or take a little deflection.
+        :param tank: TankObject of the AI whose turn it is
+        :param plan: AimPlan of the shot, whose search found at least one aim
+        :return: None
+        """
+        aim = plan.search.best
+        if plan.key is not None:
+            shot_cache.put(plan.key, aim)
+        deflection = 2.5 * (2 * self.rng.random() - 1)
+        tank.desired_angle = aim.angle + deflection
+        tank.desired_longitude = plan.longitude
+        tank.desired_power = aim.power
+
+    def shot_key(self, tank: TankObject) -> ShotKey:
+        """
+        :param tank: TankObject that shoots. It is keyed on where it stands, not on the longitude it will shoot from,
+        which is drawn at random around it for every shot and would scatter its shots over several buckets.
+        :return: ShotKey of the shot at the enemies where they stand now, for the ShotCache
+        """
+        def bucket(position: Vector) -> (int, int):
+            return round(position.x / ai_shot_cache_bucket), round(position.y / ai_shot_cache_bucket)
+
+        enemies = tuple(sorted(bucket(enemy.position) for enemy in self.tanks.values()
+                               if enemy is not tank and not enemy.dead))
+        bullet = tank.bullet_types[tank.selected_bullet % len(tank.bullet_types)]
+        # The level file fixes the planets. The seed only changes the terrain, which craters change anyway, and where
+        # the tanks spawn, which the buckets already tell apart. A cached aim is only a warm start that the search fires
+        # and scores again, so one that the terrain has made stale costs a few phantom shots at most.
+        return self.file_path, bucket(tank.position), enemies, bullet.name
 
     def create_wormhole(self, wormhole_position: Vector, time_to_live: int, next_wormhole: WormholeObject = None):
         wormhole = WormholeObject(wormhole_position, time_to_live, next_wormhole)
@@ -619,35 +1002,54 @@ class ObjectManager:
         return wormhole
 
     def reset(self, file_path=''):
+        """
+        Reset the room to the start of a level. Replaying the level that is already loaded restores it in place from
+        the cached level snapshot, reusing the planets and their altitude arrays, and keeps the socket binding intact.
+        Loading a different level rebuilds everything from the level file.
+        :param file_path: path to the level file. Defaults to the currently loaded level.
+        """
         file_path = file_path or self.file_path
-        self.__init__(self.sio, file_path)
+        if self.level_snapshot is None or file_path != self.level_snapshot.file_path:
+            if self.recorder is not None:
+                self.recorder.close()  # The new level gets a recording of its own
+            self.__init__(self.sio, file_path, seed=self.seed, ai_scheduled=self.ai_scheduled)
+        else:
+            self.restore_level_snapshot()
 
-    async def calculate_trajectory(self, t: SpriteType, position: Vector, velocity: Vector, owner: TankObject):
-        # print('Calculating trajectory:', owner, position, velocity)
-        phantom_bullet = BulletObject(position, sprite_type=t)
-        phantom_bullet.owner = owner
-        phantom_bullet.is_phantom = True
-        phantom_bullet.velocity = velocity
-        positions = []
-        # Step it 200 times at once
-        for _ in range(200):
-            phantom_bullet.acceleration = self.calculate_gravity(phantom_bullet.position)
-            phantom_bullet.move()
-            # Check for collisions with planets
-            for planet in self.planets.values():
-                if planet.intersects(phantom_bullet.collision_sphere):
-                    phantom_bullet.dead = True
-                    break
-            if self.at_world_edge(phantom_bullet.position):
-                phantom_bullet.dead = True
-                break
-            if phantom_bullet.dead:
-                break
+    @recorded
+    def restore_level_snapshot(self) -> None:
+        """
+        Put every object back into its initial state from the cached level snapshot, without re-reading the level
+        file or regenerating the terrain.
+        """
+        self.explosions = []
+        self.users.clear()
+        self.sockets.clear()
+        self.tanks.clear()
+        self.bullets.clear()
+        self.pending_bullets.clear()
+        self.pending_explosions.clear()
+        self.wormholes.clear()
+
+        for planet_id, altitudes in self.level_snapshot.altitudes.items():
+            self.planets[planet_id].restore_terrain(altitudes)
+        for spawn in self.level_snapshot.tank_spawns:
+            self._spawn_tank(spawn)
 
-            positions.append((int(phantom_bullet.position.x), int(phantom_bullet.position.y)))
+        self._reset_turn_state()
 
-        del phantom_bullet
-        return positions
+    async def calculate_trajectory(self, t: SpriteType, position: Vector, velocity: Vector, owner: TankObject):
+        # print('Calculating trajectory:', owner, position, velocity)
+        phantom_bullet = BulletObject(position, sprite_type=t, clock=self.clock)
+        # Step it 200 times at once, or until it runs out of time to live
+        max_moves = 200 if phantom_bullet.ticks_to_live == -1 else min(200, phantom_bullet.ticks_to_live)
+        flight = kernels.fly(np.array([position.x]), np.array([position.y]), np.array([velocity.x]),
+                             np.array([velocity.y]), phantom_bullet.collision_radius, self.planet_field(),
+                             .1,  # Time step of Object.move
+                             max_moves, (self.world_size.x, self.world_size.y))
+        # The move that hit a planet or left the world is not part of the trajectory
+        length = int(flight.moves[0] - flight.hit[0])
+        return list(zip(flight.path_x[:length, 0].astype(int).tolist(), flight.path_y[:length, 0].astype(int).tolist()))
 
     async def calculate_current_player_trajectory(self, sio, *args, **kwargs):
         tank = self.current_tank
@@ -679,8 +1081,37 @@ class ObjectManager:
         If there are less than 2 (i.e. 1 or 0 live tanks), then the game is over.
         :return: None
         """
-        return self.game_started and self.num_tanks_alive < 2
+        return self.abandoned or (self.game_started and self.num_tanks_alive < 2)
 
+    @property
+    def is_ai_only(self) -> bool:
+        """
+        :return: True if the game has started and none of the tanks are controlled by a player anymore.
+        """
+        return self.game_started and not any(tank.is_player_character for tank in self.tanks.values())
+
+    @recorded
+    def abandon(self) -> None:
+        """Give up on the game, which ends it."""
+        self.abandoned = True
+
+    async def fast_forward(self, server: AsyncServer, ticks: int) -> None:
+        """
+        Move the game several ticks at once, as fast as possible. Used for rooms where only AI tanks are left. The game
+        is abandoned if it is still not over after ai_only_tick_limit fast forwarded ticks.
+        :param server: AsyncServer to send events from
+        :param ticks: int maximum number of ticks to move
+        :return: None
+        """
+        for _ in range(ticks):
+            if self.is_game_over:
+                return
+            await self.move(server)
+            self.ticks_fast_forwarded += 1
+        if self.ticks_fast_forwarded >= ai_only_tick_limit:
+            self.abandoned = True
+
+    @recorded
     def disconnect_player(self, sid: str) -> None:
         """
         Sets the tank with id equal to sid to be an AI tank. This is used when a player disconnected before the
@@ -694,6 +1125,7 @@ class ObjectManager:
         except KeyError:
             pass
 
+    @recorded
     def reconnect_player(self, sid: str):
         """
         Sets the tank with id equal to sid to be an player tank. This is used when a player disconnected before the
@@ -704,6 +1136,49 @@ class ObjectManager:
         self.tanks[sid].is_player_character = True
         self.tanks[sid].current_state = TankState.Manual
 
+    def find_player_sid(self, name: str, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Find the socket-id of the player with the given name that still has a tank in this game.
+        :param name: str name of the player
+        :param exclude: socket-ids to ignore, i.e. those of players that are still connected
+        :return: str socket-id of the player, or None if there is no such player
+        """
+        for user in self.users:
+            if user.type != 'ai' and user.name == name and user.id in self.tanks and user.id not in exclude:
+                return user.id
+        return None
+
+    @recorded
+    def spawn_player_tank(self, sid: str) -> TankObject:
+        """
+        Create the tank of a player that joined the game, at a random spot on a random planet.
+        :param sid: socket-id of the player
+        :return: the tank object
+        """
+        return self.create_tank(longitude=self.rng.random() * 360,
+                                home_planet=self.rng.choice(list(self.planets.values())),
+                                sid=sid,
+                                color=choice(colors),
+                                is_player=True)
+
+    @recorded
+    def rekey_player(self, old_sid: str, new_sid: str) -> None:
+        """
+        Hand a player's tank over to a new socket-id, i.e. when the player comes back on a new connection. The player's
+        old PlayerInfo is dropped, so the caller has to add the new one.
+        :param old_sid: socket-id the tank belonged to
+        :param new_sid: socket-id the tank belongs to from now on
+        """
+        # Rebuild the dict rather than moving the entry, since its order is the turn order.
+        self.tanks = {new_sid if sid == old_sid else sid: tank for sid, tank in self.tanks.items()}
+        self.sockets.pop(old_sid, None)
+        self.users[:] = [user for user in self.users if user.id != old_sid or user.type == 'ai']
+        for user in self.users:
+            if user.id == old_sid:
+                user.id = user.name = new_sid
+        if self.current_player_sid == old_sid:
+            self.current_player_sid = new_sid
+
     @property
     def num_players(self) -> int:
         return len(self.tanks)
@@ -717,6 +1192,7 @@ class ObjectManager:
         Gives turn to the next tank in the list, wrapping around when the end is reached.
         :return:
         """
+        self.aim_plans.clear()  # An AI tank that was still thinking missed its turn
         found_it: bool = False
         while not self.is_game_over:
             for sid, tank in self.tanks.items():
@@ -733,15 +1209,18 @@ class ObjectManager:
         :param tank_sid:
         :return:
         """
+        self.aim_plans.clear()
         self.current_player_sid, self.current_tank = tank_sid, self.tanks[tank_sid]
         await self.sio.emit('next-turn', {'current_player': self.current_player_sid})
         return self.current_tank
 
+    @recorded
     async def start_game(self) -> None:
         self.game_started = True
         self.current_player_sid, self.current_tank = list(self.tanks.items())[0]  # Pick the first player
         await self.sio.emit('next-turn', {'current_player': self.current_player_sid})
 
+    @recorded
     async def update_target(self, player_sid, target):
         if self.current_player_sid == player_sid:
             tank = self.tanks[player_sid]
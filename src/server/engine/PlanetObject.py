@@ -1,23 +1,17 @@
 from enum import Enum, auto
-from itertools import tee
 from math import atan2, pi, ceil, e as euler_number
-from random import randint
+from random import Random
+from typing import Optional, Iterable, Tuple
 
 import numpy as np
 from socketio import AsyncServer
 
 from .Object import Object
-from .SpriteType import SpriteType
+from .SpriteType import SpriteType, sprite_names
+from . import kernels
 from .vector import Vector, Sphere, UnitVector, AngleVector
 
 
-def pairwise(iterable):
-    """s -> (s0,s1), (s1,s2), (s2, s3), ..."""
-    a, b = tee(iterable)
-    next(b, None)
-    return zip(a, b)
-
-
 class PlanetGenerationAlgo(Enum):
     """Determines the noise algorithm used to generate planet terrain"""
     FractalNoise = auto()
@@ -31,13 +25,18 @@ class PlanetGenerationAlgoError(ValueError):
 
 
 class PlanetObject(Object):
-    def __init__(self, position: Vector, radius: int = 500, planetary_generation_method: PlanetGenerationAlgo = None):
+    __slots__ = ('number_of_altitudes', 'altitudes', 'sealevel_radius', 'maximum_altitude', 'minimum_altitude',
+                 'core_radius', 'planetary_generation_method', 'maximum_altitude_sphere', 'core_sphere')
+
+    def __init__(self, position: Vector, radius: int = 500, planetary_generation_method: PlanetGenerationAlgo = None,
+                 rng: Optional[Random] = None):
         """
         Generate the Planet Object.
         :param position: Vector representing the center of the planet in game space.
         :param radius: some integer representing the radius of the planet
         :param planetary_generation_method: PlanetGenerationAlgo representing how the planet terrain
         should be generated.
+        :param rng: Random number generator to generate the terrain with. Seeding it makes the terrain reproducible.
         """
         super().__init__(position, SpriteType.PLANET_SPRITE)
         self.number_of_altitudes = 360 * 2
@@ -47,21 +46,22 @@ class PlanetObject(Object):
         self.minimum_altitude = self.sealevel_radius
         self.core_radius = int(.3 * self.sealevel_radius)  # Core starts at 1/3 of the depth of the planet
         self.planetary_generation_method = planetary_generation_method or PlanetGenerationAlgo.PlanetaryNoise
-        self.generate_initial_terrain(self.planetary_generation_method)
+        self.generate_initial_terrain(self.planetary_generation_method, rng or Random())
         self.maximum_altitude_sphere: Sphere = Sphere(position, np.max(self.altitudes))
         self.core_sphere = Sphere(position, self.core_radius)
         self.mass = float(np.sum(self.altitudes))
 
-    def generate_initial_terrain(self, algorithm: PlanetGenerationAlgo) -> None:
+    def generate_initial_terrain(self, algorithm: PlanetGenerationAlgo, rng: Random) -> None:
         """
         Given an algorithm perform the planetary terrain generation using predefined parameters.
         :param algorithm: PlanetGenerationAlgo representing the algorithm to use.
+        :param rng: Random number generator for the noise algorithms
         :return:
         """
         if algorithm == PlanetGenerationAlgo.FractalNoise:
             return self.generate_noise_fractal_naive(num_iterations=1000, step_size=euler_number)
         elif algorithm == PlanetGenerationAlgo.PlanetaryNoise:
-            return self.generate_noise_planetary_method(num_iterations=2000, height_step=2, indices_to_move=0)
+            return self.generate_noise_planetary_method(rng, num_iterations=2000, height_step=2, indices_to_move=0)
         elif algorithm == PlanetGenerationAlgo.Circular:
             return self.generate_circular_terrain()
         elif algorithm == PlanetGenerationAlgo.Spiral:
@@ -87,10 +87,12 @@ class PlanetObject(Object):
         """
         pass
 
-    def generate_noise_planetary_method(self, num_iterations: int, height_step: int, indices_to_move: int = 0):
+    def generate_noise_planetary_method(self, rng: Random, num_iterations: int, height_step: int,
+                                        indices_to_move: int = 0):
         """
         Generate a planet terrain by grabbing a random portion of the planet (usually half of the planet), then
         increasing or decreasing its height by height_step.
+        :param rng: Random number generator to pick the chunks with
         :param num_iterations: int representing number of times to move part of the terrain
         :param height_step: int representing the number of height units to move selected terrain each iteration
         :param indices_to_move: int representing number of indices to move each iteration. Default is 0, which will
@@ -106,10 +108,10 @@ class PlanetObject(Object):
         # Initialize all heights as 0
         self.maximum_altitude = self.minimum_altitude = 0
         # Pick a random chunk of the planet and shift it up or down. Repeat num_iterations times
-        for up_down in np.random.randint(2, size=num_iterations):  # Should this chunk go up or down?
+        for up_down in np.random.default_rng(rng.getrandbits(64)).integers(2, size=num_iterations):  # Up or down?
             up_down = int(bool(up_down)) or -1  # If up_down is zero, turn it to negative one
             # Choose which chunk of the planet we will raise/lower. Pick a random angle, then choose indices until
-            random_index = randint(0, self.number_of_altitudes)
+            random_index = rng.randint(0, self.number_of_altitudes)
             indices = np.arange(random_index, random_index + indices_to_move, dtype=np.int32) % self.number_of_altitudes
             # Raise/lower the altitude there.
             self.altitudes[indices] += up_down * height_step
@@ -125,50 +127,94 @@ class PlanetObject(Object):
         self.maximum_altitude = np.max(self.altitudes)
         self.minimum_altitude = np.min(self.altitudes)
 
-    def destroy_terrain(self, object_boundary: Sphere):
+    def restore_terrain(self, altitudes: np.ndarray) -> None:
+        """
+        Overwrite the terrain in place with previously saved altitudes, reusing the existing altitude array. Every
+        altitude is queued as an update, replacing any that were pending, so that connected clients redraw the whole
+        restored terrain.
+        :param altitudes: ndarray with the same shape as self.altitudes
+        """
+        np.copyto(self.altitudes, altitudes, casting='unsafe')
+        self.maximum_altitude = np.max(self.altitudes)
+        self.minimum_altitude = np.min(self.altitudes)
+        self.maximum_altitude_sphere.radius = self.maximum_altitude
+        self.changes_queue = np.column_stack((np.arange(self.number_of_altitudes), self.altitudes)).tolist()
+
+    def apply_craters(self, craters: Iterable[Tuple[Sphere, bool, bool]]) -> np.ndarray:
+        """
+        Apply several explosions to the terrain at once, in order, and queue a single update with the altitudes that
+        changed.
+        :param craters: Iterable of (explosion boundary, destroys terrain, generates terrain) tuples. An explosion that
+        does both destroys the terrain first.
+        :return: ndarray of the altitude indices that changed
+        """
+        previous_altitudes = self.altitudes.copy()
+        for object_boundary, destroys_terrain, generates_terrain in craters:
+            if destroys_terrain:
+                self._destroy_terrain(object_boundary)
+            if generates_terrain:
+                self._generate_terrain(object_boundary)
+
+        changed = np.flatnonzero(self.altitudes != previous_altitudes)
+        if changed.size:
+            self.changes_queue.extend(np.column_stack((changed, self.altitudes[changed])).tolist())
+            self.maximum_altitude = np.max(self.altitudes)
+            self.minimum_altitude = np.min(self.altitudes)
+            self.maximum_altitude_sphere.radius = self.maximum_altitude
+        return changed
+
+    def _destroy_terrain(self, object_boundary: Sphere) -> None:
         """
         Destroy all terrain on the planet that intersects object_boundary.
         :param object_boundary: Sphere representing the boundary of the offending object (usually an explosion).
         """
-        exposed_indices, origin = self._exposed_indices(object_boundary)
-
-        for i in exposed_indices:
-            angle = 2 * pi * i / self.number_of_altitudes
-            direction = UnitVector(angle)
-            length = self.altitudes[i]
-
-            intersects, first_intersection, second_intersection = object_boundary.intersects_line(origin, direction)
-            if intersects:
-                f1: float = abs(first_intersection - self.position)  # length to first intersection
-                f2: float = abs(second_intersection - self.position)  # length to second intersection
-                if length >= f1:
-                    self.altitudes[i] = max(f1, length - f2)
-            self.altitudes[i] = max(self.altitudes[i], self.core_radius + 5)  # Don't want to expose the core
-            self.changes_queue.append([int(i), int(self.altitudes[i])])
+        exposed_indices, hits, first_distances, second_distances = self._ray_intersections(object_boundary)
+        lengths = self.altitudes[exposed_indices]
+        carved = np.where(hits & (lengths >= first_distances),
+                          np.maximum(first_distances, lengths - second_distances), lengths).astype(int)
+        self.altitudes[exposed_indices] = np.maximum(carved, self.core_radius + 5)  # Don't want to expose the core
 
-    def generate_terrain(self, object_boundary: Sphere):
+    def _generate_terrain(self, object_boundary: Sphere) -> None:
         """
         Generates terrain within the explosion radius, which immediately falls down to the planet's surface.
         :param object_boundary: Sphere representing the boundary of the offending object (usually an explosion).
         """
+        exposed_indices, hits, first_distances, second_distances = self._ray_intersections(object_boundary)
+        lengths = self.altitudes[exposed_indices]
+        # Dump either the rest of the circle (if bottom intersection is in planet)
+        # or the entirety of the way across the circle (if the entire ray is above the planet)
+        added = np.where(lengths >= first_distances, second_distances - lengths, second_distances - first_distances)
+        self.altitudes[exposed_indices] = np.where(hits, lengths + added, lengths).astype(int)
+
+    def _ray_intersections(self, object_boundary: Sphere) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+        """
+        Intersect object_boundary with the rays from the planet center through each of the exposed altitudes.
+        :param object_boundary: Sphere representing the offending object (usually an explosion).
+        :return: ndarray of the exposed indices, ndarray of whether each of their rays intersects object_boundary, and
+        ndarrays of the distances from the planet center to the first and second intersections (0 where there are none)
+        """
         exposed_indices, origin = self._exposed_indices(object_boundary)
-
-        for i in exposed_indices:
-            angle = 2 * pi * i / self.number_of_altitudes
-            direction = UnitVector(angle)
-            length = self.altitudes[i]
-
-            intersects, first_intersection, second_intersection = object_boundary.intersects_line(origin, direction)
-            if intersects:
-                f1: float = abs(first_intersection - self.position)  # length to first intersection
-                f2: float = abs(second_intersection - self.position)  # length to second intersection
-                # Dump either the rest of the circle (if bottom intersection is in planet)
-                # or the entirety of the way across the circle (if the entire ray is above the planet)
-                self.altitudes[i] += f2 - length if length >= f1 else f2 - f1
-            # self.altitudes[i] = max(self.altitudes[i], self.core_radius + 5)  # Don't want to expose the core
-            self.changes_queue.append([int(i), int(self.altitudes[i])])
+        angles = exposed_indices * (2 * pi / self.number_of_altitudes)
+        center_x = object_boundary.center.x - origin.x
+        center_y = object_boundary.center.y - origin.y
+        # Distance along each ray to the point closest to the center, and the squared half-chord from there
+        closest = center_x * np.cos(angles) + center_y * np.sin(angles)
+        half_chord_squared = object_boundary.radius ** 2 - (center_x ** 2 + center_y ** 2 - closest ** 2)
+        hits = half_chord_squared >= 0
+        half_chord = np.sqrt(np.where(hits, half_chord_squared, 0))
+        # The rays are full lines through the planet center, so the intersections are ordered by absolute distance
+        near, far = np.abs(closest - half_chord), np.abs(closest + half_chord)
+        return exposed_indices, hits, np.minimum(near, far), np.maximum(near, far)
 
     def get_altitude_at_angle(self, angle: float) -> int:
+        """
+        Obtain the altitude index underneath a longitude angle.
+        :param angle: float representing the angle in degrees of the planet
+        :return: int representing the altitude index underneath the given angle.
+        """
+        return self.altitudes[self.get_altitude_index_at_angle(angle)]
+
+    def get_altitude_index_at_angle(self, angle: float) -> int:
         """
         Obtain the altitude index underneath a longitude angle.
         :param angle: float representing the angle in degrees of the planet
@@ -178,8 +224,7 @@ class PlanetObject(Object):
         # num distances, then each step is 360deg/num
         degrees_per_altitude_change = 360.0 / self.number_of_altitudes
         # Avoids a weird error where sometimes the index is calculated as negative
-        altitude_index = int(angle / degrees_per_altitude_change) % self.number_of_altitudes
-        return self.altitudes[altitude_index]
+        return int(angle / degrees_per_altitude_change) % self.number_of_altitudes
 
     def get_altitude_under_point(self, point: Vector) -> int:
         """
@@ -235,14 +280,14 @@ class PlanetObject(Object):
         """
         await server.emit('initial',
                           {'id': self.id,
-                           'sprite': str(self.sprite_type),
+                           'sprite': sprite_names[self.sprite_type],
                            'hue': self.hue,
                            'x': self.position.x,
                            'y': self.position.y,
                            'core_radius': self.core_radius,
                            'number_of_altitudes': self.number_of_altitudes,
                            'sealevel_radius': self.sealevel_radius,
-                           'altitudes': [int(a) for a in list(self.altitudes)]
+                           'altitudes': self.altitudes.astype(int).tolist()
                            },
                           *args, **kwargs)
 
@@ -252,39 +297,20 @@ class PlanetObject(Object):
         :param object_boundary: Sphere representing the offending object (usually an explosion).
         :return: True if the sphere intersects the planet, otherwise false.
         """
-        # If the sphere is within the core, then we can quickly return True
-        intersects_core = self.core_sphere.intersects_circle_solid_fast(object_boundary)
-        if intersects_core:
-            return True
-        # If the sphere does not intersect the atmosphere, then we can quickly return False.
-        intersects_atmosphere = self.maximum_altitude_sphere.intersects_circle_solid_fast(object_boundary)
-        if intersects_atmosphere:
-            center = object_boundary.center
-            altitude_index = self.get_altitude_index_under_point(center)
-            # if abs(center-self.position) - object_boundary.radius < self.get_altitude_under_point(center):
-            #     return True
-
-            # Now, we need to check if it intersects the triangles below the point.
-            # A triangle has vertices of the planet center and the surface positions at two adjacent altitudes indices
-            # We check two triangles back and two triangles forward.
-
-            # vertices = [self.get_surface_vector_at_index((altitude_index + i) % self.number_of_altitudes) for i in
-            #             range(-2, 2)]
-
-            # for v0, v1 in pairwise(vertices):
-            for i in range(-2, 2):
-                current_index = (altitude_index + i) % self.number_of_altitudes
-                v0: Vector = self.get_surface_vector_at_index(current_index)
-                v1: Vector = self.get_surface_vector_at_index((current_index + 1) % self.number_of_altitudes)
-                # print('checking', self.position, v1, v0, object_boundary.center)
-                # First make sure none of the points are the same
-                # Things crash if the triangle is degenerate (i.e. two points are the same).
-                # Then check if the object intersects the triangle
-                # if (self.position != v0 != v1 != self.position
-                #         and object_boundary.intersects_triangle(self.position, v1, v0)):
-                if object_boundary.intersects_triangle(self.position, v1, v0):
-                    return True
-        return False
+        center = object_boundary.center
+        return self.intersects_xyr(center.x, center.y, object_boundary.radius)
+
+    def intersects_xyr(self, x: float, y: float, radius: float) -> bool:
+        """
+        Determine whether the circle centered at (x, y) intersects with the planet surface. Takes raw coordinates so
+        that hot loops do not allocate anything. See kernels.heightfield_hit.
+        :param x: float x-coordinate of the offending circle's center
+        :param y: float y-coordinate of the offending circle's center
+        :param radius: float radius of the offending circle
+        :return: True if the circle intersects the planet, otherwise false.
+        """
+        return kernels.heightfield_hit(x - self.position.x, y - self.position.y, radius, self.core_radius,
+                                       self.maximum_altitude_sphere.radius, self.altitudes)
 
     def _exposed_indices(self, object_boundary: Sphere) -> (np.ndarray, Vector):
         """
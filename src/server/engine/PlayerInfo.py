@@ -10,7 +10,7 @@ class PlayerInfo:
     h: int
     hue: int
     type: str
-    lastHeartbeat: float  # Unix timestamp
+    lastHeartbeat: float  # time.monotonic() of the last heartbeat
     target: Vector
     name: str = 'Unnamed'
     screenWidth: int = 0
@@ -0,0 +1,118 @@
+"""
+Headless replay of a room recording (see engine.InputRecorder). The room is re-simulated as fast as possible and its
+state digests are checked against the recorded ones, so any nondeterminism shows up as the first tick on which they
+differ. Since it runs without any networking, a replay also doubles as a benchmark of the simulation.
+
+Usage, from src/server:
+    python -m engine.Replay path/to/recording.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from dataclasses import dataclass
+from inspect import isawaitable
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from . import kernels
+from .InputRecorder import decode_argument, state_digest
+from .ObjectManager import ObjectManager
+
+
+class NullServer:
+    """Stands in for the socket server when a room is simulated headlessly. Every event is dropped."""
+
+    async def emit(self, *args, **kwargs) -> None:
+        pass
+
+
+class DigestChecker:
+    """Takes the place of the recorder during a replay, and compares the state digests instead of writing them."""
+
+    def __init__(self, expected: Dict[int, str]):
+        """
+        :param expected: Dictionary where the key is the tick and the value is the recorded digest
+        """
+        self.expected = expected
+        self.checked: int = 0
+        self.first_mismatch: Optional[int] = None  # Tick of the first digest that differed
+
+    def record(self, tick: int, name: str, args: List) -> None:
+        pass  # The inputs are coming from the recording in the first place
+
+    def on_tick(self, object_manager: ObjectManager) -> None:
+        tick = object_manager.clock.tick
+        if tick in self.expected:
+            self.checked += 1
+            if self.first_mismatch is None and state_digest(object_manager) != self.expected[tick]:
+                self.first_mismatch = tick
+
+
+@dataclass
+class ReplayResult:
+    ticks: int
+    seconds: float  # Wall clock time the simulation took
+    digest: str  # Digest of the final state
+    digests_checked: int
+    first_mismatch: Optional[int] = None  # Tick of the first digest that differed from the recording, if any
+
+
+async def replay(path: str) -> ReplayResult:
+    """
+    Re-simulate a recorded room. The inputs of each tick are applied right before the room is moved, in the order they
+    were recorded in, which is how they interleaved with the move loop on the server.
+    :param path: str path of the recording
+    :return: ReplayResult
+    """
+    with open(path) as f:
+        header = json.loads(f.readline())
+        lines = [json.loads(line) for line in f if line.strip()]
+    inputs = [line for line in lines if 'input' in line]
+    checker = DigestChecker({line['tick']: line['digest'] for line in lines if 'digest' in line})
+    last_tick = max((line['tick'] for line in lines), default=0)
+    kernels.use_backend(header.get('physics_backend', 'auto'))  # Backends are free to round differently
+
+    object_manager = ObjectManager(sio=NullServer(), file_path=header['file_path'], seed=header['seed'])
+    if object_manager.recorder is not None:  # Don't record the replay itself
+        object_manager.recorder.close()
+        os.remove(object_manager.recorder.path)
+    object_manager.recorder = checker
+    object_manager.turns_enabled = header['turns_enabled']
+
+    start = perf_counter()
+    i = 0
+    while True:
+        while i < len(inputs) and inputs[i]['tick'] == object_manager.clock.tick:
+            result = getattr(object_manager, inputs[i]['input'])(*map(decode_argument, inputs[i]['args']))
+            if isawaitable(result):
+                await result
+            i += 1
+        if object_manager.clock.tick >= last_tick:
+            break
+        await object_manager.move(object_manager.sio)
+
+    return ReplayResult(ticks=object_manager.clock.tick,
+                        seconds=perf_counter() - start,
+                        digest=state_digest(object_manager),
+                        digests_checked=checker.checked,
+                        first_mismatch=checker.first_mismatch)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay a room recording headlessly and check that it matches.')
+    parser.add_argument('recording', help='path to a recording written with replay_recording_path set')
+    result = asyncio.run(replay(parser.parse_args().recording))
+
+    print(f'{result.ticks} ticks in {result.seconds:.3f} s ({result.ticks / max(result.seconds, 1e-9):.0f} ticks/s)')
+    print(f'Final state digest: {result.digest}')
+    if result.first_mismatch is None:
+        print(f'OK: all {result.digests_checked} recorded digests match')
+    else:
+        print(f'MISMATCH: the state first differs from the recording on tick {result.first_mismatch}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,21 +5,33 @@ the RoomManager (which handles clients' interactions with Rooms and manages the
 
 import asyncio
 import functools
+import os
+import pickle
 from asyncio import Future
 from dataclasses import dataclass, field
 from datetime import datetime
-from random import random, choice
+from enum import Enum, auto
+from random import random
 from typing import Dict, Optional, List, Callable, Any, Awaitable
 
-from urllib.parse import parse_qs
+from time import monotonic
+from urllib.parse import parse_qs, quote
 
 from socketio import AsyncServer
 
+from .AIScheduler import ai_scheduler
+from .HeartbeatSweeper import HeartbeatSweeper
+from .NetworkMonitor import NetworkMonitor
 from .ObjectManager import ObjectManager
-from .Config import ConfigData
-from .util import validNick, Sid, colors
+from .ShotCache import shot_cache
+from .Snapshot import RoomSnapshotter
+from .Config import ConfigData, room_idle_tick_divisor, room_hibernate_after, room_hibernation_path, ai_only_policy, \
+    ai_only_ticks_per_step, snapshot_path, snapshot_full_every, ai_scheduled, room_delete_after
+from .util import validNick, Sid
 from .vector import Vector
 from .PlayerInfo import PlayerInfo
+from .SoundType import sound_dictionary
+from .SpriteType import sprite_dictionary
 
 # Type Alias
 RoomName = str  # RoomName is just a string representing some room name. Aliasing makes documentation clearer.
@@ -61,6 +73,14 @@ def pass_if_no_object_manager_error(function: Callable[[Any], Awaitable[None]])
     return wrapper
 
 
+class RoomState(Enum):
+    """Lifecycle states of a room, which determine how often it is ticked."""
+    Active = auto()  # Players are connected and the game is on. Ticked at the full rate.
+    Idle = auto()  # Waiting for the game to start or for players to come back. Ticked at a slow rate.
+    Hibernating = auto()  # Nobody has been connected for a while. Not ticked at all, and possibly written to disk.
+    FastForward = auto()  # Only AI tanks are left. Moved several ticks per tick until the game is over.
+
+
 @dataclass
 class Room:
     """
@@ -72,13 +92,108 @@ class Room:
     sio: AsyncServer  # The socketio server to send messages to
     object_manager: Optional[ObjectManager] = None  # ObjectManager object that will hold the game logic.
     connected_sids: Dict[Sid, bool] = field(default_factory=dict)  # Key is sid, value is if they are still connected
+    network_monitor: Optional[NetworkMonitor] = None  # Decides which clients are due for a state update
+    state: RoomState = RoomState.Active
+    idle_since: Optional[float] = None  # time.monotonic() when the last connected player left
+    hibernation_file: str = ''  # File the ObjectManager was written to while hibernating, if any
+    hibernating_since: Optional[float] = None  # time.monotonic() when the room went to sleep. None for the lobby.
+
+    @property
+    def has_connected_players(self) -> bool:
+        return any(self.connected_sids.values())
+
+    def is_due(self, tick: int) -> bool:
+        """
+        Check whether this room should be moved or updated on the given tick of the server loop.
+        :param tick: int number of the tick
+        :return: True if the room should be ticked
+        """
+        if self.state in (RoomState.Active, RoomState.FastForward):
+            return True
+        elif self.state == RoomState.Idle:
+            return tick % room_idle_tick_divisor == 0
+        return False
 
-    async def connect_player(self, sid: Sid, player: Dict):
+    def is_expired(self, now: float) -> bool:
+        """
+        Check whether this room has hibernated for so long without anyone coming back that it should be deleted.
+        :param now: float current time.monotonic()
+        :return: True if the room should be deleted
+        """
+        return self.state == RoomState.Hibernating and self.hibernating_since is not None \
+            and not self.has_connected_players and now - self.hibernating_since >= room_delete_after
+
+    def update_state(self, now: float) -> None:
+        """
+        Move this room along its lifecycle. Hibernating rooms stay asleep until a player wakes them.
+
+        A game that only AI tanks are left in is handled according to ai_only_policy: 'fast_forward' plays it out as
+        fast as possible, 'resolve' ends it right away, 'pause' hibernates it, and 'idle' treats it like any other room
+        without players.
+        :param now: float current time.monotonic()
+        :return: None
+        """
+        if self.state == RoomState.Hibernating:
+            return
+        if not self.object_manager:  # The lobby has nothing to simulate
+            self.state = RoomState.Hibernating
+        elif not self.has_connected_players and self.object_manager.is_ai_only and ai_only_policy != 'idle':
+            if ai_only_policy == 'fast_forward':
+                self.state = RoomState.FastForward
+            elif ai_only_policy == 'resolve':
+                self.object_manager.abandon()
+            elif ai_only_policy == 'pause':
+                self.hibernate()
+        elif self.has_connected_players:
+            self.idle_since = None
+            self.state = RoomState.Active if self.object_manager.game_started else RoomState.Idle
+        else:
+            if self.idle_since is None:
+                self.idle_since = now
+            if now - self.idle_since >= room_hibernate_after:
+                self.hibernate()
+            else:
+                self.state = RoomState.Idle
+
+    def hibernate(self) -> None:
+        """
+        Stop ticking this room. If room_hibernation_path is set, the ObjectManager is also written to disk and dropped
+        from memory until the room is woken.
+        :return: None
+        """
+        self.state = RoomState.Hibernating
+        self.hibernating_since = monotonic()
+        if room_hibernation_path and self.object_manager:
+            self.hibernation_file = os.path.join(room_hibernation_path, f'{quote(self.name, safe="")}.pickle')
+            with open(self.hibernation_file, 'wb') as f:
+                pickle.dump(self.object_manager, f)
+            self.object_manager = None
+            print(f'[INFO] Room {self.name} hibernated to {self.hibernation_file}')
+
+    def wake(self) -> None:
+        """
+        Bring this room back to the full tick rate, reading it back from disk if it was written there.
+        :return: None
+        """
+        if self.hibernation_file:
+            with open(self.hibernation_file, 'rb') as f:
+                self.object_manager = pickle.load(f)
+            self.object_manager.sio = self.sio
+            os.remove(self.hibernation_file)
+            self.hibernation_file = ''
+            print(f'[INFO] Room {self.name} woke up')
+        self.idle_since = None
+        self.hibernating_since = None
+        self.state = RoomState.Active
+
+    async def connect_player(self, sid: Sid, player: Dict) -> Optional[PlayerInfo]:
         """
         Mark a player as connected for the first time, including checking the username.
         :param sid: socket-id of the user client
         :param player: Dictionary containing player information from the client.
+        :return: the PlayerInfo of the player if they joined the game in this room, otherwise None
         """
+        self.wake()
         self.connected_sids[sid] = True
         if self.object_manager:
             await self.send_objects_initial(room=sid)
@@ -93,16 +208,20 @@ class Room:
                 await self.sio.emit('kick', 'Invalid username.')
                 await self.sio.disconnect(sid)
             else:
+                # A player that comes back (i.e. after a disconnect or a server restart) gets their old tank back.
+                reclaimed_sid = object_manager.find_player_sid(player.name, exclude=[
+                    connected_sid for connected_sid, connected in self.connected_sids.items() if connected])
                 async with self.sio.session(sid) as session:
                     print(f'[INFO] Player {player.name} connected to room {self.name}!')
                     sockets[player.id] = sid
                     session['currentPlayer'] = player
-                    session['currentPlayer'].lastHeartbeat = datetime.now().timestamp()
-                    object_manager.create_tank(longitude=random() * 360,
-                                               home_planet=choice(list(object_manager.planets.values())),
-                                               sid=sid,
-                                               color=choice(colors),
-                                               is_player=True)
+                    session['currentPlayer'].lastHeartbeat = monotonic()
+                    if reclaimed_sid is not None:
+                        object_manager.rekey_player(reclaimed_sid, sid)
+                        object_manager.reconnect_player(sid)
+                        print(f'[INFO] Player {player.name} reclaimed their tank in room {self.name}')
+                    else:
+                        object_manager.spawn_player_tank(sid)
 
                     users.append(session['currentPlayer'])
 
@@ -113,9 +232,11 @@ class Room:
                                          'gameHeight': 1024,  # c.gameHeight
                                          },
                                         room=sid)
-                    if len(object_manager.tanks) > 1:
+                    if reclaimed_sid is None and len(object_manager.tanks) > 1:
                         await object_manager.start_game()
                         print(f'Starting game in room {self.name}')
+                    return player
+        return None
 
     def disconnect_player(self, sid: Sid):
         """
@@ -132,6 +253,7 @@ class Room:
         Mark a player as connected after they had previously left a game.
         :param sid: socket-id of the user client
         """
+        self.wake()
         self.connected_sids[sid] = True
         if self.object_manager:
             self.object_manager.reconnect_player(sid)
@@ -150,6 +272,16 @@ class Room:
                 kwargs['room'] = self.name
             return await self.object_manager.send_objects_initial(self.sio, *args, **kwargs)
 
+    async def move(self) -> None:
+        """
+        Perform the movement step in this room, or several if it is fast forwarding.
+        :return: None
+        """
+        if self.state == RoomState.FastForward:
+            await self.object_manager.fast_forward(self.sio, ai_only_ticks_per_step)
+        else:
+            await self.object_manager.move(self.sio)
+
     async def send_updates(self, *args, **kwargs):
         """
         Send updates of each game state to each client.
@@ -159,10 +291,14 @@ class Room:
         kwargs that specify a socketio.emit command.
         :return:
         """
-        if self.object_manager:
+        if self.object_manager and self.state == RoomState.FastForward:
+            # Nobody is watching. Whoever joins later gets the whole state from send_objects_initial.
+            self.object_manager.discard_updates()
+        elif self.object_manager:
             if 'room' not in kwargs:
                 kwargs['room'] = self.name
-            return await self.object_manager.send_updates(self.sio, *args, **kwargs)
+            return await self.object_manager.send_updates(self.sio, *args, network_monitor=self.network_monitor,
+                                                          **kwargs)
 
 
 class RoomManager:
@@ -174,9 +310,35 @@ class RoomManager:
     """
 
     def __init__(self, socket_io_server: AsyncServer):
-        self.rooms: Dict[RoomName, Room] = {'default': Room('default', socket_io_server)}
+        self.network_monitor = NetworkMonitor(socket_io_server)
+        self.heartbeats = HeartbeatSweeper(ConfigData.maxHeartbeatInterval / 1000)  # The config is in milliseconds
+        self.rooms: Dict[RoomName, Room] = {'default': Room('default', socket_io_server,
+                                                            network_monitor=self.network_monitor)}
         self.connected_players: Dict[Sid, RoomName] = {}
+        # The same PlayerInfo objects as in the socket sessions, so that the heartbeats, which arrive at mouse-move rate,
+        # don't have to load and save a whole session each.
+        self.players: Dict[Sid, PlayerInfo] = {}
+        # Latest aiming target of each player since the last tick. Only the latest one is applied.
+        self.pending_targets: Dict[Sid, Vector] = {}
+        self.targets_coalesced: int = 0  # Total number of targets that were superseded before they were applied
         self.sio = socket_io_server
+        self.move_ticks: int = 0  # Ticks of the move loop, used to tick idle rooms at a slower rate
+        self.update_ticks: int = 0  # Ticks of the network update loop
+        self.snapshotter: Optional[RoomSnapshotter] = RoomSnapshotter(snapshot_path, snapshot_full_every) \
+            if snapshot_path else None
+
+    def restore_rooms(self) -> None:
+        """
+        Bring back the rooms that were saved before the server last stopped. Players reclaim their tanks by joining
+        with the same name.
+        :return: None
+        """
+        if not self.snapshotter:
+            return
+        for name, object_manager in self.snapshotter.load_all().items():
+            object_manager.sio = self.sio
+            self.rooms[name] = Room(name, self.sio, object_manager, network_monitor=self.network_monitor)
+            print(f'[INFO] Restored room {name}')
 
     def create_room(self, name: RoomName, level_path: str = '') -> None:
         """
@@ -187,22 +349,29 @@ class RoomManager:
         :return: None
         """
         if name not in self.rooms:
-            self.rooms[name] = Room(name, self.sio, ObjectManager(sio=self.sio, file_path=level_path))
+            self.rooms[name] = Room(name, self.sio,
+                                    ObjectManager(sio=self.sio, file_path=level_path, ai_scheduled=ai_scheduled),
+                                    network_monitor=self.network_monitor)
 
         else:
             raise RoomAlreadyExistsError(f'Room with name {name} already exists.')
 
     def restart_room(self, name: RoomName, level_path: str = '') -> None:
         """
-        Restart an already existent room.
+        Restart an already existent room. Replaying the room's current level resets its ObjectManager in place.
         :param name: RoomName representing the name of the room to be restarted
         :param level_path: file path to the level file
         :return None
         """
         try:
-            self.rooms[name].object_manager = ObjectManager(file_path=level_path)
+            room = self.rooms[name]
         except KeyError:
             raise RoomDoesNotExistError(f'Room with name {name} does not exist')
+        room.wake()
+        if room.object_manager:
+            room.object_manager.reset(level_path)
+        else:
+            room.object_manager = ObjectManager(sio=self.sio, file_path=level_path, ai_scheduled=ai_scheduled)
 
     async def delete_room(self, name: RoomName) -> None:
         """
@@ -221,6 +390,10 @@ class RoomManager:
             print(f'Deleting room: {name}')
             await self.sio.emit('room_close', room=name)
             await self.sio.close_room(name)
+            if self.rooms[name].hibernation_file:
+                os.remove(self.rooms[name].hibernation_file)
+            if self.snapshotter:
+                self.snapshotter.delete(name)
             del self.rooms[name]
             await self.send_room_list()
         except KeyError:
@@ -247,9 +420,15 @@ class RoomManager:
                 h=0,
                 hue=round(random() * 360),
                 type=session['type'],
-                lastHeartbeat=datetime.now().timestamp(),  # 'lastHeartbeat': new Date().getTime(),
+                lastHeartbeat=monotonic(),  # 'lastHeartbeat': new Date().getTime(),
                 target=Vector(0, 0)
             )
+            self.players[sid] = session['currentPlayer']
+
+        # The lookup tables for the sprite and sound codes in the per-tick updates never change, so they are sent once,
+        # before the client can join a room and get any update that it would have to decode with them.
+        await self.sio.emit('gameSetup', {'gameWidth': 1024, 'gameHeight': 1024, 'sprites': sprite_dictionary,
+                                          'sounds': sound_dictionary}, room=sid)
 
         # Add the player to the default room.
         await self.rooms['default'].connect_player(sid, player={})
@@ -258,11 +437,18 @@ class RoomManager:
 
     def disconnect_player(self, sid: Sid) -> None:
         """
-        Disconnects the player from their room.
+        Disconnects the player from their room. Disconnecting a player that is already disconnected does nothing, since
+        timed out players are disconnected here and then again by the socket's disconnect event.
         :param sid: socket-id of the player to disconnect
         """
+        if not self.connected_players.get(sid):
+            return
         self.get_room_from_sid(sid).disconnect_player(sid)
         self.sio.leave_room(sid, self.connected_players[sid])  # Leave the sio room
+        self.network_monitor.forget(sid)
+        self.heartbeats.forget(sid)
+        self.players.pop(sid, None)
+        self.pending_targets.pop(sid, None)
         # Go ahead and remove them from the connected players list to reduce memory usage
         # del self.connected_players[sid]
         self.connected_players[sid] = ''
@@ -286,7 +472,13 @@ class RoomManager:
 
         # Connect player to new room
         self.connected_players[sid] = new_room
-        await self.rooms[new_room].connect_player(sid=sid, player=player_info_dict)
+        self.pending_targets.pop(sid, None)  # Aimed in the old room
+        player = await self.rooms[new_room].connect_player(sid=sid, player=player_info_dict)
+        if player is not None:
+            self.players[sid] = player
+        else:  # e.g. back in the lobby, where the client stops sending heartbeats
+            self.players.pop(sid, None)
+            self.heartbeats.forget(sid)
 
     async def send_chat(self, sender_sid: Sid, msg: Dict):
         """
@@ -424,15 +616,21 @@ class RoomManager:
         that specify a socketio.emit command.
         :return:
         """
-        return await asyncio.gather(*[room.send_updates(*args, **kwargs) for room in self.rooms.values()])
+        self.update_ticks += 1
+        return await asyncio.gather(*[room.send_updates(*args, **kwargs) for room in self.rooms.values()
+                                      if room.is_due(self.update_ticks)])
 
     async def move_loop(self) -> Future:
         """
         Performs the movement step in each room.
         :return: A Future containing each coroutine of each move step in each room
         """
+        self.move_ticks += 1
+        ai_scheduler.begin_tick()
+        await self.apply_pending_targets()
         return asyncio.gather(
-            *[room.object_manager.move(self.sio) for room in self.rooms.values() if room.object_manager])
+            *[room.move() for room in self.rooms.values()
+              if room.object_manager and room.is_due(self.move_ticks)])
 
     async def respawn(self, sid: Sid) -> None:
         """
@@ -457,21 +655,115 @@ class RoomManager:
 
     async def game_loop(self):
         """
-        Update the rooms (i.e. delete rooms as necessary).
+        Update the rooms (i.e. delete rooms as necessary and move them along their lifecycle).
         """
+        now = monotonic()
+        # A room that hibernated to disk has no ObjectManager, so it is only deleted once it expires
         rooms_to_delete = [name for name, room in self.rooms.items()
-                           if room.object_manager and room.object_manager.is_game_over
+                           if room.object_manager and room.object_manager.is_game_over or room.is_expired(now)
                            ]
 
         for name in rooms_to_delete:
             await self.delete_room(name)
 
+        for room in self.rooms.values():
+            room.update_state(now)
+
+        if self.snapshotter:
+            self.snapshotter.save({name: room.object_manager for name, room in self.rooms.items()
+                                   if room.object_manager})
+
+        await self.reap_timed_out_players()
+
+        # Measure the connection of every client in a game, to adapt how often they get updates
+        await self.network_monitor.probe_all([sid for sid, room in self.connected_players.items()
+                                              if room and room != 'default'])
+
         # for player, room in self.connected_players.items():
         #     print(player, room, self.sio.rooms(player))
 
+    def heartbeat(self, sid: Sid, target: Optional[Vector] = None) -> None:
+        """
+        Record that a player is still there, along with where they are aiming. The target is only queued here, and
+        applied on the next tick of the move loop.
+        :param sid: socket-id of the player
+        :param target: Vector the player is aiming at, relative to their tank
+        :return: None
+        """
+        player = self.players.get(sid)
+        if player is None or not self.is_rendering(sid):  # e.g. it already left, so it must not be tracked again
+            return
+        now = monotonic()
+        self.heartbeats.beat(sid, now)
+        player.lastHeartbeat = now
+        if target is not None and target != player.target:
+            player.target = target
+            if sid in self.pending_targets:
+                self.targets_coalesced += 1
+            self.pending_targets[sid] = target
+
+    async def apply_pending_targets(self) -> None:
+        """
+        Apply the latest target of every player that aimed since the last tick.
+        :return: None
+        """
+        pending_targets, self.pending_targets = self.pending_targets, {}
+        for sid, target in pending_targets.items():
+            room = self.rooms.get(self.connected_players.get(sid))
+            if room and room.object_manager:
+                await room.object_manager.update_target(sid, target)
+
+    def is_rendering(self, sid: Sid) -> bool:
+        """
+        Check whether a player's client is rendering a game, which is when it sends heartbeats (see gameLoop in
+        app.js): it is in a game room and its tank is alive. After RIP or room_close, it stops.
+        :param sid: socket-id of the player
+        :return: True if the player's heartbeats are expected
+        """
+        room = self.rooms.get(self.connected_players.get(sid))
+        return room is not None and room.object_manager is not None and sid in room.object_manager.tanks
+
+    async def reap_timed_out_players(self) -> None:
+        """
+        Kick and disconnect every player whose heartbeats stopped for longer than maxHeartbeatInterval while their
+        client was rendering a game.
+        :return: None
+        """
+        for sid in self.heartbeats.sweep(monotonic()):
+            if not self.is_rendering(sid):
+                continue  # e.g. its tank died, and it watches the rest of the game without sending heartbeats
+            print(f'[INFO] Player {sid} timed out.')
+            await self.sio.emit('kick', f'Last heartbeat received over {ConfigData.maxHeartbeatInterval} ms ago.',
+                                room=sid)
+            self.disconnect_player(sid)
+            await self.sio.disconnect(sid)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Dictionary of server statistics, for monitoring
+        """
+        return {'rooms': len(self.rooms),
+                'players_connected': sum(bool(room) for room in self.connected_players.values()),
+                'heartbeats_tracked': self.heartbeats.tracked,
+                'targets_coalesced': self.targets_coalesced,
+                'players_timed_out': self.heartbeats.reaped,
+                'shot_cache': shot_cache.stats(),
+                'ai_scheduler': ai_scheduler.stats(),
+                'network': self.network_monitor.stats(),
+                # Ticks of each room's game that were simulated, and that were skipped because its world was at rest
+                'room_ticks': {name: {'simulated': room.object_manager.ticks_simulated,
+                                      'skipped': room.object_manager.ticks_skipped}
+                               for name, room in self.rooms.items() if room.object_manager}}
+
     async def send_room_list(self, room=None):
         await self.sio.emit('room_list', self.get_list_of_room_names(), room=room)
 
     @pass_if_no_object_manager_error
-    async def update_target(self, player_sid: Sid, target: Vector):
-        await self.get_object_manager_from_sid(player_sid).update_target(player_sid, target)
+    async def resize_viewport(self, sid: Sid, data: Dict) -> None:
+        """
+        Record a client's new screen size, which determines which objects are sent to it.
+        :param sid: socket-id of the user
+        :param data: Dictionary with screenWidth and screenHeight from the client
+        :return: None
+        """
+        self.get_object_manager_from_sid(sid).resize_viewport(sid, data['screenWidth'], data['screenHeight'])
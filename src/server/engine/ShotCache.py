@@ -0,0 +1,89 @@
+"""
+Cache of AI shot solutions, shared by all of the rooms in the process.
+
+AI tanks keep aiming from and at roughly the same places turn after turn, and rooms that are created from the same level
+file have the same planets. So the best aim that a search found is kept, keyed on the level file, where the shooter and
+its enemies stood (rounded to buckets) and the type of bullet, and the next search with the same key starts from it
+instead of from scratch. The terrain is not part of the key: it is different in every room and changes with every shot
+that lands, and a cached aim is only a warm start that the search fires and scores again. The least recently used
+solutions are evicted once the cache is full.
+
+A cache hit changes which aims an AI search tries, so rooms that are recorded for a replay keep out of the cache: the
+replay could not reproduce its contents.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .AimOptimizer import Aim
+from .Config import ai_shot_cache_size
+
+# Level file path, shooter bucket, sorted enemy buckets and bullet type name
+ShotKey = Tuple[str, Tuple[int, int], Tuple[Tuple[int, int], ...], str]
+
+
+class ShotCache:
+    def __init__(self, capacity: int):
+        """
+        :param capacity: int maximum number of shot solutions to keep. 0 disables the cache.
+        """
+        self.capacity = capacity
+        self._solutions: 'OrderedDict[ShotKey, Aim]' = OrderedDict()  # Least recently used first
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, key: ShotKey) -> Optional[Aim]:
+        """
+        :param key: ShotKey of the shot
+        :return: the cached Aim for the shot, or None if there is none
+        """
+        aim = self._solutions.get(key)
+        if aim is None:
+            self.misses += 1
+            return None
+        self._solutions.move_to_end(key)
+        self.hits += 1
+        return aim
+
+    def put(self, key: ShotKey, aim: Aim) -> None:
+        """
+        Keep a shot solution, replacing the cached one for the same shot if the new one scores better.
+        :param key: ShotKey of the shot
+        :param aim: Aim that a search found
+        :return: None
+        """
+        if not self.capacity:
+            return
+        cached = self._solutions.get(key)
+        if cached is not None and cached.distance <= aim.distance:
+            self._solutions.move_to_end(key)
+            return
+        self._solutions[key] = aim
+        self._solutions.move_to_end(key)
+        while len(self._solutions) > self.capacity:
+            self._solutions.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._solutions.clear()
+
+    def __len__(self) -> int:
+        return len(self._solutions)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        :return: float fraction of the lookups that found a solution, 0 before the first lookup
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        :return: Dictionary of the cache's metrics, for monitoring
+        """
+        return {'size': len(self), 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate, 'evictions': self.evictions}
+
+
+shot_cache = ShotCache(ai_shot_cache_size)  # Shared by every room in the process
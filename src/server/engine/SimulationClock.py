@@ -0,0 +1,30 @@
+class SimulationClock:
+    """
+    Simulated time of a room. It counts ticks of the move loop instead of reading the wall clock, so a game plays out
+    the same no matter how fast it is simulated, i.e. when fast forwarding or replaying it.
+    """
+    __slots__ = ('tick', 'seconds_per_tick')
+
+    def __init__(self, seconds_per_tick: float = 1 / 60):
+        """
+        :param seconds_per_tick: float simulated seconds that pass each tick. The move loop runs at 60 Hz.
+        """
+        self.tick: int = 0
+        self.seconds_per_tick: float = seconds_per_tick
+
+    def advance(self) -> None:
+        self.tick += 1
+
+    def to_ticks(self, seconds: float) -> int:
+        """
+        :param seconds: float simulated duration
+        :return: int number of ticks that last that long
+        """
+        return round(seconds / self.seconds_per_tick)
+
+    @property
+    def seconds(self) -> float:
+        """
+        :return: float simulated seconds since the clock started
+        """
+        return self.tick * self.seconds_per_tick
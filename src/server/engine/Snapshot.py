@@ -0,0 +1,213 @@
+"""
+Crash recovery for rooms. Each room is written to its own directory under snapshot_path:
+
+- full.pickle: the whole ObjectManager, rewritten every snapshot_full_every saves.
+- terrain.journal: the terrain edits made since full.pickle was written, appended on every other save. Terrain is by
+  far the largest part of a room, and explosions only change a handful of altitudes, so the journal stays small.
+
+Each journal record is a fixed size struct of (planet id, altitude index, altitude). A record that was cut off by a
+crash is ignored when the journal is read back.
+
+Only the terrain is journaled. Everything else (tanks, bullets, whose turn it is, ...) comes back as it was in
+full.pickle, so after a crash it can be up to snapshot_full_every saves older than the terrain. Whatever is in flight
+then is lost, and tanks may stand where the terrain has since been blown away; wake_tanks_on lets them fall.
+"""
+import os
+import pickle
+import struct
+import weakref
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+from .ObjectManager import ObjectManager
+
+TERRAIN_RECORD = struct.Struct('<qHi')  # planet id, altitude index, altitude
+
+
+class SnapshotError(ValueError):
+    """A snapshot could not be read back."""
+    pass
+
+
+class RoomSnapshotter:
+    def __init__(self, directory: str, full_every: int = 30):
+        """
+        :param directory: str directory to write the snapshots to
+        :param full_every: int number of saves after which a full snapshot is written instead of terrain deltas
+        """
+        self.directory = directory
+        self.full_every = full_every
+        self.saves: int = 0
+        # Key is the room name, value is the terrain (keyed by planet id) as last written to disk.
+        self._written_altitudes: Dict[str, Dict[int, np.ndarray]] = {}
+        # Key is the room name, value is a weak reference to each altitude array that was written (keyed by planet id).
+        # A room that moved on to another level has new arrays, even if its new planets happen to reuse the old ids.
+        self._written_arrays: Dict[str, Dict[int, weakref.ref]] = {}
+
+    def room_directory(self, name: str) -> str:
+        # Room names come from players, so they are hex encoded into a safe path component.
+        return os.path.join(self.directory, name.encode().hex())
+
+    def save(self, object_managers: Dict[str, ObjectManager]) -> None:
+        """
+        Save several rooms, either fully or as terrain deltas.
+        :param object_managers: Dictionary where the key is the room name and the value is its ObjectManager
+        :return: None
+        """
+        full = self.saves % self.full_every == 0
+        self.saves += 1
+        for name, object_manager in object_managers.items():
+            if full or not self.has_same_planets(name, object_manager):
+                self.write_full(name, object_manager)
+            else:
+                self.append_terrain(name, object_manager)
+
+    def has_same_planets(self, name: str, object_manager: ObjectManager) -> bool:
+        """
+        Check whether a room still has the planets that were last written for it, so that its terrain edits can be
+        journaled on top of its full snapshot.
+        :param name: str name of the room
+        :param object_manager: ObjectManager of the room
+        :return: True if the room has the same planets
+        """
+        arrays = self._written_arrays.get(name)
+        return arrays is not None and arrays.keys() == object_manager.planets.keys() and all(
+            arrays[planet_id]() is planet.altitudes for planet_id, planet in object_manager.planets.items())
+
+    def remember_terrain(self, name: str, object_manager: ObjectManager) -> None:
+        """
+        Remember the terrain of a room as it is on disk, to journal the edits to it from then on.
+        :param name: str name of the room
+        :param object_manager: ObjectManager of the room
+        :return: None
+        """
+        self._written_altitudes[name] = {planet_id: planet.altitudes.copy()
+                                         for planet_id, planet in object_manager.planets.items()}
+        self._written_arrays[name] = {planet_id: weakref.ref(planet.altitudes)
+                                      for planet_id, planet in object_manager.planets.items()}
+
+    def write_full(self, name: str, object_manager: ObjectManager) -> None:
+        """
+        Write a full snapshot of a room and start a new, empty terrain journal for it.
+        :param name: str name of the room
+        :param object_manager: ObjectManager of the room
+        :return: None
+        """
+        directory = self.room_directory(name)
+        os.makedirs(directory, exist_ok=True)
+        temporary_path = os.path.join(directory, 'full.pickle.tmp')
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(object_manager, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Empty the journal before replacing the snapshot. If the server crashes in between, the room comes back as the
+        # older snapshot, which is at least consistent, whereas old deltas on top of the newer one could undo edits.
+        open(os.path.join(directory, 'terrain.journal'), 'wb').close()
+        os.replace(temporary_path, os.path.join(directory, 'full.pickle'))
+        self.remember_terrain(name, object_manager)
+
+    def append_terrain(self, name: str, object_manager: ObjectManager) -> None:
+        """
+        Append the terrain edits since the last save of a room to its journal. The room must still have the same
+        planets as when it was last written, see has_same_planets.
+        :param name: str name of the room
+        :param object_manager: ObjectManager of the room
+        :return: None
+        """
+        written = self._written_altitudes[name]
+        records = bytearray()
+        for planet_id, planet in object_manager.planets.items():
+            previous = written[planet_id]
+            for i in np.flatnonzero(planet.altitudes != previous):
+                records += TERRAIN_RECORD.pack(planet_id, i, int(planet.altitudes[i]))
+            np.copyto(previous, planet.altitudes)
+        if records:
+            with open(os.path.join(self.room_directory(name), 'terrain.journal'), 'ab') as f:
+                f.write(records)
+
+    def delete(self, name: str) -> None:
+        """
+        Forget a room, i.e. after it was deleted.
+        :param name: str name of the room
+        :return: None
+        """
+        self._written_altitudes.pop(name, None)
+        self._written_arrays.pop(name, None)
+        directory = self.room_directory(name)
+        for file_name in ('full.pickle', 'full.pickle.tmp', 'terrain.journal'):
+            try:
+                os.remove(os.path.join(directory, file_name))
+            except FileNotFoundError:
+                pass
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+    def load_all(self) -> Dict[str, ObjectManager]:
+        """
+        Read back every room that was saved, with the terrain journal replayed on top of its full snapshot. The
+        ObjectManagers have no socket server yet.
+        :return: Dictionary where the key is the room name and the value is its ObjectManager
+        """
+        object_managers = {}
+        if not os.path.isdir(self.directory):
+            return object_managers
+        for entry in os.listdir(self.directory):
+            directory = os.path.join(self.directory, entry)
+            try:
+                name, object_manager = self.load(directory)
+            except (OSError, SnapshotError) as e:
+                print(f'[WARNING] Could not restore room from {directory}: {e}')
+                continue
+            object_managers[name] = object_manager
+            self.remember_terrain(name, object_manager)
+        return object_managers
+
+    @staticmethod
+    def load(directory: str) -> Tuple[str, ObjectManager]:
+        """
+        Read back a single room.
+        :param directory: str directory the room was saved to
+        :raise SnapshotError: if the snapshot is not a valid ObjectManager, or its journal edits missing terrain
+        :return: the room name and its ObjectManager
+        """
+        try:
+            name = bytes.fromhex(os.path.basename(directory)).decode()
+        except ValueError:
+            raise SnapshotError(f'{directory} is not a room snapshot directory.')
+        with open(os.path.join(directory, 'full.pickle'), 'rb') as f:
+            try:
+                object_manager = pickle.load(f)
+            except (pickle.UnpicklingError, EOFError, AttributeError) as e:
+                raise SnapshotError(str(e))
+        if not isinstance(object_manager, ObjectManager):
+            raise SnapshotError(f'Snapshot contains a {type(object_manager).__name__}, not an ObjectManager.')
+
+        edited_planets = set()
+        for planet_id, i, altitude in RoomSnapshotter.read_journal(os.path.join(directory, 'terrain.journal')):
+            try:
+                object_manager.planets[planet_id].altitudes[i] = altitude
+            except (KeyError, IndexError):
+                raise SnapshotError(f'Terrain journal edits altitude {i} of planet {planet_id}, which the snapshot '
+                                    f'does not have.')
+            edited_planets.add(planet_id)
+        for planet_id in edited_planets:
+            planet = object_manager.planets[planet_id]
+            planet.restore_terrain(planet.altitudes)  # Recalculates the cached altitude bounds
+            object_manager.wake_tanks_on(planet)
+        return name, object_manager
+
+    @staticmethod
+    def read_journal(path: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Read the records of a terrain journal, skipping a trailing record that was only partially written.
+        :param path: str path of the journal
+        :return: Iterator of (planet id, altitude index, altitude) tuples
+        """
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        complete = len(data) - len(data) % TERRAIN_RECORD.size
+        yield from TERRAIN_RECORD.iter_unpack(data[:complete])
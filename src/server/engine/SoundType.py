@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import Dict, Union
 
 
 class SoundType(Enum):
@@ -13,3 +14,13 @@ class SoundType(Enum):
     SHOOT2_SOUND = auto()
     SCIFI_MUSIC = auto()
     NEWDAWN_MUSIC = auto()
+
+
+# Wire name of each sound type, formatted once instead of calling str() on the enum for every object every tick.
+sound_names: Dict[Union[SoundType, str], str] = {sound_type: str(sound_type) for sound_type in SoundType}
+sound_names[''] = ''  # No sound to play
+# Small integer code of each sound type, sent in the per-tick payloads instead of the name. 0 means no sound.
+sound_codes: Dict[Union[SoundType, str], int] = {sound_type: sound_type.value for sound_type in SoundType}
+sound_codes[''] = 0
+# Lookup table from code to wire name, sent to each client once in gameSetup so that it can decode the codes.
+sound_dictionary: Dict[int, str] = {code: sound_names[sound_type] for sound_type, code in sound_codes.items()}
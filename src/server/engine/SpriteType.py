@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import Dict
 
 
 class SpriteType(Enum):
@@ -90,3 +91,11 @@ class SpriteType(Enum):
     DKEY_SPRITE = auto()
     TABKEY_SPRITE = auto()
     NUM_SPRITES = auto()
+
+
+# Wire name of each sprite type, formatted once instead of calling str() on the enum for every object every tick.
+sprite_names: Dict[SpriteType, str] = {sprite_type: str(sprite_type) for sprite_type in SpriteType}
+# Small integer code of each sprite type, sent in the per-tick payloads instead of the name.
+sprite_codes: Dict[SpriteType, int] = {sprite_type: sprite_type.value for sprite_type in SpriteType}
+# Lookup table from code to wire name, sent to each client once in gameSetup so that it can decode the codes.
+sprite_dictionary: Dict[int, str] = {sprite_type.value: sprite_names[sprite_type] for sprite_type in SpriteType}
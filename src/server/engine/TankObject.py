@@ -1,16 +1,16 @@
-import datetime
 from enum import Enum, auto
 from math import sqrt, pi
-from random import randint, choice
-from typing import List
+from random import Random, choice
+from typing import List, Optional
 
 from socketio import AsyncServer
 
-from .Config import turns_enabled, gravity_constant
+from .Config import turns_enabled, gravity_constant, ai_accuracy_multiplier
 from .Object import Object
 from .PlanetObject import PlanetObject
-from .SoundType import SoundType
-from .SpriteType import SpriteType
+from .SimulationClock import SimulationClock
+from .SoundType import SoundType, sound_codes
+from .SpriteType import SpriteType, sprite_names, sprite_codes
 from .vector import Vector, UnitVector
 from .util import colors
 
@@ -43,8 +43,20 @@ class TankAnimationState(Enum):
 
 class TankObject(Object):
     """All of the data and functionality representing a tank, whether is be a player or an AI."""
-    def __init__(self, longitude: float, planet: PlanetObject, color: str = None, angle: float = 0):
+    __slots__ = ('home_planet', 'longitude', 'angle', 'health_points', 'damage_sound', 'animation_state',
+                 'is_player_character', 'accuracy_multiplier', 'current_state', 'desired_angle',
+                 'desired_angle_direction', 'desired_power', 'desired_angle_relative_to_planet',
+                 'desired_angle_relative_to_planet_direction', 'previous_distance', 'paused_after_hit', 'time_hit',
+                 'transStarted', 'playerNumber', 'selected_bullet', 'bullet_types', 'bullet_counts',
+                 'bullet_type_count', 'maxFuel', 'currentFuel', 'basePower', 'lastFiredShot', 'power',
+                 'desired_longitude', 'power_speed', 'in_control', 'bullet_sprite_codes', 'clock', 'rng',
+                 'asleep')
+
+    def __init__(self, longitude: float, planet: PlanetObject, color: str = None, angle: float = 0,
+                 clock: SimulationClock = None, rng: Optional[Random] = None):
         super().__init__(Vector(0, 0), sprite_type=SpriteType.GREY1_SPRITE)
+        self.clock: SimulationClock = clock or SimulationClock()  # Clock of the room, which times the gun
+        self.rng: Random = rng or Random()  # Random number generator of the room, which drives the AI
         self.home_planet = planet
         self.longitude = longitude
         self.angle: float = angle  # Angle at which the turret gun is pointing
@@ -62,7 +74,7 @@ class TankObject(Object):
 
         # AI private variables
         self.is_player_character: bool = False
-        self.accuracy_multiplier: float = .001
+        self.accuracy_multiplier: float = ai_accuracy_multiplier
         self.current_state: TankState = TankState.Wait
         self.desired_angle: float = 45
         # +1 to keep adjusting angle in the pos direction, -1 to adjust in the neg direction, 0 to not change at all.
@@ -93,6 +105,8 @@ class TankObject(Object):
                                                SpriteType.BULLET11_SPRITE, SpriteType.BULLET12_SPRITE,
                                                SpriteType.MINE_SPRITE]
         # Amount of bullets of each type left to fire
+        # Sprite codes of bullet_types, looked up once since they are sent to the clients every tick
+        self.bullet_sprite_codes: List[int] = [sprite_codes[bullet_type] for bullet_type in self.bullet_types]
         self.bullet_counts: List[int] = [9999, 9999, 5, 5, 5, 5, 5, 5, 5, 5, 1, 2, 2]
         # Total number of types of bullets this tank has access to
         self.bullet_type_count: int = 13
@@ -115,6 +129,10 @@ class TankObject(Object):
 
         self.hue = color or choice(colors)
 
+        # A tank that is at rest on unchanged terrain would end up in the same place every tick, so it is not moved
+        # until something wakes it up, i.e. input, damage, a teleport or a terrain edit underneath it.
+        self.asleep: bool = False
+
     def take_damage(self, damage: int):
         """
         Decrease the health points by damage. Returns the current health point after damage is taken. Kills the tank
@@ -130,13 +148,29 @@ class TankObject(Object):
             self.current_state = TankState.Dead
             self.kill()
         self.play_sound(self.damage_sound)
+        self.wake()
         return self.health_points
 
     def teleport(self, pos: Vector, new_planet: PlanetObject):
         self.home_planet = new_planet
         self.position = pos
+        self.wake()
+
+    def wake(self) -> None:
+        """Make the tank move again on the next tick."""
+        self.asleep = False
+
+    def position_at_longitude(self, longitude: float) -> Vector:
+        """
+        :param longitude: float longitude in degrees on the home planet
+        :return: Vector of where the tank stands when it is at that longitude
+        """
+        longitude = longitude % 360
+        altitude = self.home_planet.get_altitude_at_angle(longitude)
+        return self.home_planet.position + (altitude + self.collision_radius) * UnitVector(longitude * pi / 180)
 
     def move(self, currently_my_turn=True):
+        previous_position = self.position
         # Check if I'm dead
         if self.health_points <= 0:
             self.kill()
@@ -180,8 +214,11 @@ class TankObject(Object):
 
         # Get ready for next tick
         self.strafe_right = self.strafe_left = False
-        self.collision_sphere.center = self.position
+        self._collision_sphere.center = self.position
         self.rotation_speed = 0
+        # Moving again would change nothing. The tank whose turn it is still gets its turn move every tick, which is
+        # where its controls are applied.
+        self.asleep = self.animation_state == TankAnimationState.Normal and self.position == previous_position
 
     def next_bullet_type(self) -> SpriteType:
         """
@@ -204,7 +241,7 @@ class TankObject(Object):
         """
         await server.emit('initial',
                           {'id': self.id,
-                           'sprite': str(self.sprite_type),
+                           'sprite': sprite_names[self.sprite_type],
                            'hue': self.hue,
                            'x': self.position.x,
                            'y': self.position.y,
@@ -225,7 +262,7 @@ class TankObject(Object):
             item = self.changes_queue.get()
             await server.emit('update',
                               {'id': self.id,
-                               'sprite': str(self.sprite_type),
+                               'sprite': sprite_codes[self.sprite_type],
                                'x': self.position.x,
                                'y': self.position.y,
                                'planet_x': self.home_planet.position.x,
@@ -237,9 +274,9 @@ class TankObject(Object):
             self.changes_queue.task_done()
 
     def get_changes(self):
-        return {'sprite': str(self.sprite_type),
-                'x': self.position.x,
-                'y': self.position.y,
+        return {'sprite': sprite_codes[self.sprite_type],
+                'x': float(self.position.x),
+                'y': float(self.position.y),
                 'planet_x': self.home_planet.position.x,
                 'planet_y': self.home_planet.position.y,
                 'tread_x': 1,
@@ -249,9 +286,9 @@ class TankObject(Object):
                 'health': self.health_points,
                 'selected_bullet': self.selected_bullet,
                 'bullet_counts': self.bullet_counts,
-                'bullet_sprites': [str(bullet_type) for bullet_type in self.bullet_types],
+                'bullet_sprites': self.bullet_sprite_codes,
                 'hue': self.hue,
-                'sound': str(self.sound_type_to_play)}
+                'sound': sound_codes[self.sound_type_to_play]}
 
     def think(self):
         """
@@ -321,9 +358,9 @@ class TankObject(Object):
         pass
 
     def _tank_state_fire(self):
-        if datetime.datetime.now().timestamp() > self.gun_timer + 3:
+        if self.clock.tick > self.gun_timer + self.clock.to_ticks(3):
             # Choose a random bullet that we have access to.
-            self.selected_bullet = randint(0, self.bullet_type_count)
+            self.selected_bullet = self.rng.randint(0, self.bullet_type_count)
 
             self.current_state = TankState.FireWait
             # self.current_state = TankState.PostFire
@@ -3,6 +3,8 @@ from .vector import Vector
 
 
 class WormholeObject(Object):
+    __slots__ = ('turns_before_death', 'next_wormhole', 'angle', 'radius', 'disabled')
+
     def __init__(self, position: Vector, turns_to_live: int, next_wormhole=None):
         super().__init__(position)
         self.turns_before_death: int = turns_to_live
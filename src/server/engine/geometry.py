@@ -0,0 +1,57 @@
+"""
+Allocation-free geometry kernel for the collision tests in vector.Sphere and ObjectManager.
+
+Every test compares squared distances, so none of them need a square root, and all of them take raw coordinates
+instead of Vectors. The *_batch variants evaluate the same tests over NumPy arrays, broadcasting any mix of arrays and
+scalars.
+"""
+import numpy as np
+
+
+def circles_intersect(x1: float, y1: float, r1: float, x2: float, y2: float, r2: float) -> bool:
+    """
+    Determine whether the boundaries of two circles intersect, without getting the intersection points.
+    :return: True if the boundaries intersect, otherwise False. Concentric circles never intersect.
+    """
+    distance_squared = (x2 - x1) ** 2 + (y2 - y1) ** 2
+    return distance_squared != 0 and (r1 + r2) ** 2 >= distance_squared >= (r1 - r2) ** 2
+
+
+def circles_overlap_solid(x1: float, y1: float, r1: float, x2: float, y2: float, r2: float) -> bool:
+    """
+    Determine whether the centers of two circles are closer together than the larger of the two radii, i.e. whether
+    the center of one of the circles lies inside the other.
+    """
+    return (x2 - x1) ** 2 + (y2 - y1) ** 2 < max(r1, r2) ** 2
+
+
+def circle_intersects_segment(cx: float, cy: float, r: float, x0: float, y0: float, x1: float, y1: float) -> bool:
+    """
+    Determine whether a solid circle touches the line segment from (x0, y0) to (x1, y1), by measuring the distance
+    from the center to the closest point on the segment.
+    :return: True if the circle touches the segment, otherwise False.
+    """
+    abx = x1 - x0
+    aby = y1 - y0
+    acx = cx - x0
+    acy = cy - y0
+    ab_squared = abx * abx + aby * aby
+    # Fraction of the way along the segment of the point closest to the center. A degenerate segment is just a point.
+    t = (acx * abx + acy * aby) / ab_squared if ab_squared else 0
+    t = min(max(t, 0), 1)
+    dx = acx - t * abx
+    dy = acy - t * aby
+    return dx * dx + dy * dy <= r * r
+
+
+def circles_intersect_batch(x1, y1, r1, x2, y2, r2) -> np.ndarray:
+    """Vectorized circles_intersect."""
+    distance_squared = (np.asarray(x2) - x1) ** 2 + (np.asarray(y2) - y1) ** 2
+    return ((distance_squared != 0)
+            & ((np.asarray(r1) + r2) ** 2 >= distance_squared)
+            & (distance_squared >= (np.asarray(r1) - r2) ** 2))
+
+
+def circles_overlap_solid_batch(x1, y1, r1, x2, y2, r2) -> np.ndarray:
+    """Vectorized circles_overlap_solid."""
+    return (np.asarray(x2) - x1) ** 2 + (np.asarray(y2) - y1) ** 2 < np.maximum(r1, r2) ** 2
@@ -0,0 +1,494 @@
+"""
+Batched physics kernels for the hot loops of the simulation: gravity, collisions with the planet heightfields, and
+flying bullets until they hit something (AI aiming and trajectory previews).
+
+The kernels take raw NumPy arrays instead of game objects, and come in interchangeable backends:
+
+- numba: the loop kernels below, compiled with Numba. Only available when numba is installed.
+- python: the same loop kernels, interpreted. Still faster than stepping BulletObjects, since nothing is allocated.
+- numpy: vectorized over the batch of bullets, stepping every bullet that is still flying at once. Each step has a
+  fixed overhead, so it only beats the python backend for batches of about two dozen bullets or more. The engine's
+  batches are smaller: one bullet per trajectory preview, 16 phantom shots per step of AimSearch, and the few bullets
+  in flight per tick for gravity. That is why 'auto' falls back to python rather than numpy.
+
+The backend is picked with physics_backend in Config when the server starts (see use_backend). All of them follow the
+same arithmetic as the per-object code (e.g. Object.move and Vector), but since NumPy and Numba may use different
+math library routines, results are only guaranteed to agree up to floating point rounding.
+
+Usage, from src/server, to compare the backends on the shipped levels:
+    python -m engine.kernels
+"""
+import argparse
+import glob
+from dataclasses import dataclass
+from math import asin, atan2, ceil, cos, floor, pi, sin, sqrt
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .Config import gravity_constant
+
+try:
+    import numba
+except ImportError:  # numba is an optional speedup
+    numba = None
+
+
+class PhysicsBackendNotAvailableError(ValueError):
+    """The requested physics backend is unknown or its package is not installed."""
+    pass
+
+
+@dataclass
+class PlanetField:
+    """The planets of a room, packed into arrays for the kernels. Row p of altitudes belongs to planet p."""
+    x: np.ndarray
+    y: np.ndarray
+    mass: np.ndarray
+    core_radius: np.ndarray
+    maximum_altitude: np.ndarray
+    altitudes: np.ndarray
+
+    @staticmethod
+    def from_planets(planets: Iterable, terrain: bool = True) -> 'PlanetField':
+        """
+        :param planets: Iterable of PlanetObjects
+        :param terrain: bool whether to copy their current terrain. Gravity does not need it.
+        :return: PlanetField of the planets
+        """
+        planets = list(planets)
+        if not terrain:
+            return PlanetField(x=np.array([planet.position.x for planet in planets], dtype=float),
+                               y=np.array([planet.position.y for planet in planets], dtype=float),
+                               mass=np.array([planet.mass for planet in planets], dtype=float),
+                               core_radius=np.zeros(len(planets)), maximum_altitude=np.zeros(len(planets)),
+                               altitudes=np.zeros((len(planets), 0), dtype=np.int64))
+        return PlanetField(x=np.array([planet.position.x for planet in planets], dtype=float),
+                           y=np.array([planet.position.y for planet in planets], dtype=float),
+                           mass=np.array([planet.mass for planet in planets], dtype=float),
+                           core_radius=np.array([planet.core_radius for planet in planets], dtype=float),
+                           maximum_altitude=np.array([planet.maximum_altitude_sphere.radius for planet in planets],
+                                                     dtype=float),
+                           altitudes=np.array([planet.altitudes for planet in planets], dtype=np.int64).reshape(
+                               len(planets), -1))
+
+
+@dataclass
+class Flight:
+    """Where a batch of bullets flew. Column i of the paths belongs to bullet i."""
+    path_x: np.ndarray  # Position after each move, shape (steps, bullets). Only the first moves[i] rows are valid.
+    path_y: np.ndarray
+    moves: np.ndarray  # Number of moves each bullet made
+    hit: np.ndarray  # Whether each bullet's last move ended on a planet or past the world edge
+
+    def final_position(self, i: int, x: float, y: float) -> Tuple[float, float]:
+        """
+        :param i: int index of the bullet
+        :param x: float x-coordinate the bullet started at
+        :param y: float y-coordinate the bullet started at
+        :return: the position of the bullet after its last move
+        """
+        moves = self.moves[i]
+        if not moves:
+            return x, y
+        return float(self.path_x[moves - 1, i]), float(self.path_y[moves - 1, i])
+
+    def final_positions(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Same as final_position, for every bullet at once.
+        :param x: ndarray of the x-coordinates the bullets started at
+        :param y: ndarray of the y-coordinates the bullets started at
+        :return: ndarrays of the x and y coordinates of the bullets after their last moves
+        """
+        last = np.maximum(self.moves - 1, 0)
+        bullets = np.arange(self.moves.shape[0])
+        moved = self.moves > 0
+        return np.where(moved, self.path_x[last, bullets], x), np.where(moved, self.path_y[last, bullets], y)
+
+
+# Loop kernels. They are written in the subset of Python that Numba compiles, one bullet at a time.
+
+def heightfield_hit(dx, dy, radius, core_radius, maximum_altitude, altitudes):
+    """
+    Determine whether a circle intersects the terrain of a planet. The terrain is a polar heightfield, so the circle
+    is converted to polar coordinates around the planet center, and its near edge is compared against the altitudes
+    underneath it: the altitude interpolated at the center's angle, and every altitude sample within the angular span
+    of the circle. Takes raw numbers so that it can be compiled, and called from hot loops without allocating.
+    :param dx: float x-coordinate of the circle center, relative to the planet center
+    :param dy: float y-coordinate of the circle center, relative to the planet center
+    :param radius: float radius of the circle
+    :param core_radius: float radius of the planet's core, which is always solid
+    :param maximum_altitude: float radius of the planet's maximum altitude sphere
+    :param altitudes: ndarray of the planet's altitudes
+    :return: True if the circle intersects the planet, otherwise false.
+    """
+    distance_squared = dx * dx + dy * dy
+    if distance_squared < (core_radius + radius) ** 2:
+        return True
+    # Nothing that is clear of the maximum altitude sphere can reach the surface
+    if distance_squared >= (maximum_altitude + radius) ** 2:
+        return False
+    distance = sqrt(distance_squared)
+    number_of_altitudes = altitudes.shape[0]
+    radians_per_index = 2 * pi / number_of_altitudes
+    angle = atan2(dy, dx)
+    center_index = angle / radians_per_index  # Fractional altitude index under the circle center
+    below = floor(center_index)
+    fraction = center_index - below
+    altitude = ((1 - fraction) * altitudes[int(below) % number_of_altitudes]
+                + fraction * altitudes[int(below + 1) % number_of_altitudes])
+    if distance - radius <= altitude:
+        return True
+    # Along the ray of each sample under the circle, the near edge of the circle is where the ray enters it
+    half_span = asin(radius / distance) / radians_per_index
+    for index in range(int(ceil(center_index - half_span)), int(floor(center_index + half_span)) + 1):
+        offset = index * radians_per_index - angle
+        sideways = distance * sin(offset)
+        near_edge = distance * cos(offset) - sqrt(max(radius * radius - sideways * sideways, 0.0))
+        if altitudes[index % number_of_altitudes] >= near_edge:
+            return True
+    return False
+
+
+def _collides_one(x, y, radius, planet_x, planet_y, core_radius, maximum_altitude, altitudes):
+    """Whether the circle intersects any of the planets."""
+    for p in range(planet_x.shape[0]):
+        if heightfield_hit(x - planet_x[p], y - planet_y[p], radius, core_radius[p], maximum_altitude[p],
+                           altitudes[p]):
+            return True
+    return False
+
+
+def _gravity_one(x, y, planet_x, planet_y, planet_mass, gravity):
+    """Same sum as stepping Vectors through the planets, in the same order."""
+    acceleration_x = 0.0
+    acceleration_y = 0.0
+    for p in range(planet_x.shape[0]):
+        difference_x = planet_x[p] - x
+        difference_y = planet_y[p] - y
+        magnitude = sqrt(difference_x ** 2 + difference_y ** 2)
+        scale = gravity * planet_mass[p] / magnitude ** 2
+        acceleration_x = acceleration_x + scale * (1 / magnitude * difference_x)
+        acceleration_y = acceleration_y + scale * (1 / magnitude * difference_y)
+    return acceleration_x, acceleration_y
+
+
+def _gravity_loop(x, y, planet_x, planet_y, planet_mass, gravity, acceleration_x, acceleration_y):
+    for i in range(x.shape[0]):
+        acceleration_x[i], acceleration_y[i] = _gravity_one(x[i], y[i], planet_x, planet_y, planet_mass, gravity)
+
+
+def _collides_loop(x, y, radius, planet_x, planet_y, core_radius, maximum_altitude, altitudes, collides):
+    for p in range(planet_x.shape[0]):
+        for i in range(x.shape[0]):
+            collides[p, i] = heightfield_hit(x[i] - planet_x[p], y[i] - planet_y[p], radius[i], core_radius[p],
+                                             maximum_altitude[p], altitudes[p])
+
+
+def _fly_loop(x, y, velocity_x, velocity_y, radius, planet_x, planet_y, planet_mass, core_radius, maximum_altitude,
+              altitudes, gravity, dt, max_moves, world_width, world_height, path_x, path_y, moves, hit):
+    check_world_edge = world_width > 0
+    for i in range(x.shape[0]):
+        position_x = x[i]
+        position_y = y[i]
+        bullet_velocity_x = velocity_x[i]
+        bullet_velocity_y = velocity_y[i]
+        for step in range(max_moves):
+            acceleration_x, acceleration_y = _gravity_one(position_x, position_y, planet_x, planet_y, planet_mass,
+                                                          gravity)
+            # Semi-implicit Euler, like Object.move
+            bullet_velocity_x = bullet_velocity_x + dt * acceleration_x
+            bullet_velocity_y = bullet_velocity_y + dt * acceleration_y
+            position_x = position_x + dt * bullet_velocity_x
+            position_y = position_y + dt * bullet_velocity_y
+            path_x[step, i] = position_x
+            path_y[step, i] = position_y
+            moves[i] = step + 1
+            if (_collides_one(position_x, position_y, radius, planet_x, planet_y, core_radius, maximum_altitude,
+                              altitudes)
+                    or check_world_edge and (position_x < 0 or position_x > world_width
+                                             or position_y < 0 or position_y > world_height)):
+                hit[i] = True
+                break
+
+
+# NumPy kernels, vectorized over the bullets.
+
+def _gravity_numpy(x, y, planet_x, planet_y, planet_mass, gravity, acceleration_x, acceleration_y):
+    acceleration_x[:] = 0
+    acceleration_y[:] = 0
+    for p in range(planet_x.shape[0]):  # Planets are summed in order, so the rounding matches the loop kernel
+        difference_x = planet_x[p] - x
+        difference_y = planet_y[p] - y
+        magnitude = np.sqrt(difference_x ** 2 + difference_y ** 2)
+        scale = gravity * planet_mass[p] / magnitude ** 2
+        acceleration_x += scale * (1 / magnitude * difference_x)
+        acceleration_y += scale * (1 / magnitude * difference_y)
+
+
+def _heightfield_hit_numpy(dx, dy, radius, core_radius, maximum_altitude, altitudes):
+    """Vectorized heightfield_hit, over a batch of circles against one planet."""
+    distance_squared = dx * dx + dy * dy
+    hits = distance_squared < (core_radius + radius) ** 2
+    # Nothing that is clear of the maximum altitude sphere can reach the surface
+    candidates = np.flatnonzero(~hits & (distance_squared < (maximum_altitude + radius) ** 2))
+    if not candidates.size:
+        return hits
+    dx, dy, radius = dx[candidates], dy[candidates], radius[candidates]
+    distance = np.sqrt(distance_squared[candidates])
+    number_of_altitudes = altitudes.shape[0]
+    radians_per_index = 2 * pi / number_of_altitudes
+    angle = np.arctan2(dy, dx)
+    center_index = angle / radians_per_index
+    below = np.floor(center_index)
+    fraction = center_index - below
+    below = below.astype(np.int64)
+    altitude = ((1 - fraction) * altitudes[below % number_of_altitudes]
+                + fraction * altitudes[(below + 1) % number_of_altitudes])
+    candidate_hits = distance - radius <= altitude
+    # Every sample under the circles, as a window of indices around each center that is masked to the span
+    half_span = np.arcsin(np.minimum(radius / distance, 1)) / radians_per_index
+    reach = int(np.ceil(half_span.max())) + 1
+    index = below[:, None] + np.arange(-reach, reach + 1)
+    offset = index * radians_per_index - angle[:, None]
+    sideways = distance[:, None] * np.sin(offset)
+    near_edge = (distance[:, None] * np.cos(offset)
+                 - np.sqrt(np.maximum(radius[:, None] ** 2 - sideways ** 2, 0)))
+    under = np.abs(index - center_index[:, None]) <= half_span[:, None]
+    candidate_hits |= (under & (altitudes[index % number_of_altitudes] >= near_edge)).any(axis=1)
+    hits[candidates] = candidate_hits
+    return hits
+
+
+def _collides_numpy(x, y, radius, planet_x, planet_y, core_radius, maximum_altitude, altitudes, collides):
+    for p in range(planet_x.shape[0]):
+        collides[p] = _heightfield_hit_numpy(x - planet_x[p], y - planet_y[p], radius, core_radius[p],
+                                             maximum_altitude[p], altitudes[p])
+
+
+def _fly_numpy(x, y, velocity_x, velocity_y, radius, planet_x, planet_y, planet_mass, core_radius, maximum_altitude,
+               altitudes, gravity, dt, max_moves, world_width, world_height, path_x, path_y, moves, hit):
+    flying = np.arange(x.shape[0])  # Indices of the bullets that are still flying
+    position_x, position_y = x.copy(), y.copy()
+    bullet_velocity_x, bullet_velocity_y = velocity_x.copy(), velocity_y.copy()
+    acceleration_x, acceleration_y = np.empty_like(position_x), np.empty_like(position_y)
+    radii = np.full(flying.size, radius)
+    collides = np.empty((planet_x.shape[0], flying.size), dtype=bool)
+    for step in range(max_moves):
+        if not flying.size:
+            break
+        _gravity_numpy(position_x, position_y, planet_x, planet_y, planet_mass, gravity, acceleration_x,
+                       acceleration_y)
+        bullet_velocity_x += dt * acceleration_x
+        bullet_velocity_y += dt * acceleration_y
+        position_x += dt * bullet_velocity_x
+        position_y += dt * bullet_velocity_y
+        path_x[step, flying] = position_x
+        path_y[step, flying] = position_y
+        moves[flying] = step + 1
+        _collides_numpy(position_x, position_y, radii, planet_x, planet_y, core_radius, maximum_altitude, altitudes,
+                        collides)
+        stopped = collides.any(axis=0)
+        if world_width > 0:
+            stopped |= ((position_x < 0) | (position_x > world_width)
+                        | (position_y < 0) | (position_y > world_height))
+        if stopped.any():
+            hit[flying[stopped]] = True
+            still_flying = ~stopped
+            flying = flying[still_flying]
+            position_x, position_y = position_x[still_flying], position_y[still_flying]
+            bullet_velocity_x, bullet_velocity_y = bullet_velocity_x[still_flying], bullet_velocity_y[still_flying]
+            acceleration_x, acceleration_y = acceleration_x[still_flying], acceleration_y[still_flying]
+            radii = radii[still_flying]
+            collides = collides[:, still_flying]
+
+
+@dataclass
+class PhysicsBackend:
+    name: str
+    gravity: Callable
+    collides: Callable
+    fly: Callable
+
+
+def _compile(function: Callable) -> Callable:
+    return numba.njit(cache=True)(function)
+
+
+def _numba_backend() -> PhysicsBackend:
+    # Every loop kernel calls the helpers through the module globals, so those have to be compiled first.
+    global heightfield_hit, _collides_one, _gravity_one
+    if not hasattr(_gravity_one, 'py_func'):
+        heightfield_hit = _compile(heightfield_hit)
+        _collides_one = _compile(_collides_one)
+        _gravity_one = _compile(_gravity_one)
+    return PhysicsBackend('numba', _compile(_gravity_loop), _compile(_collides_loop), _compile(_fly_loop))
+
+
+BACKENDS: Dict[str, Callable[[], PhysicsBackend]] = {
+    'numba': _numba_backend,
+    'numpy': lambda: PhysicsBackend('numpy', _gravity_numpy, _collides_numpy, _fly_numpy),
+    'python': lambda: PhysicsBackend('python', _gravity_loop, _collides_loop, _fly_loop),
+}
+
+backend: PhysicsBackend  # The backend all of the kernels run on
+
+
+def use_backend(name: str = 'auto') -> PhysicsBackend:
+    """
+    Select the backend for all of the kernels.
+    :param name: 'auto' (numba if installed, else python), 'numba', 'numpy' or 'python'
+    :raise PhysicsBackendNotAvailableError: if the backend is unknown or not installed
+    :return: the selected PhysicsBackend
+    """
+    global backend
+    if name == 'auto':
+        name = 'numba' if numba is not None else 'python'
+    if name not in BACKENDS:
+        raise PhysicsBackendNotAvailableError(f'{name=} is not a valid physics backend.')
+    if name == 'numba' and numba is None:
+        raise PhysicsBackendNotAvailableError('The numba physics backend was requested, but numba is not installed.')
+    backend = BACKENDS[name]()
+    return backend
+
+
+use_backend()
+
+
+def gravity(x: np.ndarray, y: np.ndarray, field: PlanetField) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gravitational acceleration of the planets at a batch of points.
+    :param x: ndarray of the x-coordinates
+    :param y: ndarray of the y-coordinates
+    :param field: PlanetField of the planets
+    :return: ndarrays of the x and y components of the acceleration at each point
+    """
+    acceleration_x, acceleration_y = np.empty(x.shape[0]), np.empty(x.shape[0])
+    backend.gravity(np.asarray(x, dtype=float), np.asarray(y, dtype=float), field.x, field.y, field.mass,
+                    float(gravity_constant), acceleration_x, acceleration_y)
+    return acceleration_x, acceleration_y
+
+
+def collides(x: np.ndarray, y: np.ndarray, radius: np.ndarray, field: PlanetField) -> np.ndarray:
+    """
+    Test a batch of circles against the terrain of each planet.
+    :param x: ndarray of the x-coordinates of the circle centers
+    :param y: ndarray of the y-coordinates of the circle centers
+    :param radius: ndarray of the radii of the circles
+    :param field: PlanetField of the planets
+    :return: ndarray of shape (planets, circles) of whether each circle intersects each planet
+    """
+    result = np.empty((field.x.shape[0], x.shape[0]), dtype=bool)
+    backend.collides(np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(radius, dtype=float),
+                     field.x, field.y, field.core_radius, field.maximum_altitude, field.altitudes, result)
+    return result
+
+
+def fly(x: np.ndarray, y: np.ndarray, velocity_x: np.ndarray, velocity_y: np.ndarray, radius: float,
+        field: PlanetField, dt: float, max_moves: int, world_size: Optional[Tuple[float, float]] = None) -> Flight:
+    """
+    Fly a batch of bullets under the gravity of the planets until they hit a planet, leave the world or run out of
+    moves.
+    :param x: ndarray of the x-coordinates the bullets start at
+    :param y: ndarray of the y-coordinates the bullets start at
+    :param velocity_x: ndarray of the x-components of the starting velocities
+    :param velocity_y: ndarray of the y-components of the starting velocities
+    :param radius: float collision radius of the bullets
+    :param field: PlanetField of the planets
+    :param dt: float time step of each move
+    :param max_moves: int maximum number of moves of each bullet
+    :param world_size: (width, height) of the world, past whose edges the bullets stop. None lets them fly on.
+    :return: Flight of the bullets
+    """
+    count = x.shape[0]
+    flight = Flight(path_x=np.zeros((max_moves, count)), path_y=np.zeros((max_moves, count)),
+                    moves=np.zeros(count, dtype=np.int64), hit=np.zeros(count, dtype=bool))
+    world_width, world_height = world_size if world_size is not None else (0, 0)
+    backend.fly(np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(velocity_x, dtype=float),
+                np.asarray(velocity_y, dtype=float), float(radius), field.x, field.y, field.mass, field.core_radius,
+                field.maximum_altitude, field.altitudes, float(gravity_constant), float(dt), int(max_moves),
+                float(world_width), float(world_height), flight.path_x, flight.path_y, flight.moves, flight.hit)
+    return flight
+
+
+def benchmark(level_paths: Iterable[str], bullets: int, repeats: int) -> Dict[str, Dict[str, float]]:
+    """
+    Time the kernels of every available backend on levels, with the shots an AI tank of each level would try: from
+    where it stands, away from its planet, with the time step and number of moves of the engine.
+    :param level_paths: Iterable of level file paths
+    :param bullets: int size of the batches
+    :param repeats: int number of times each kernel is run per level
+    :return: Dictionary where the key is the backend name and the value maps each kernel to its total seconds, plus
+    'moves per shot' to the mean number of moves the aiming shots flew
+    """
+    # The ObjectManager uses the kernels, so only import it when needed
+    from .AimOptimizer import ANGLE_RANGE, POWER_RANGE
+    from .Config import ai_phantom_moves
+    from .ObjectManager import ObjectManager
+
+    dt = .1  # Time step of Object.move
+    rng = np.random.default_rng(0)
+    shots = []
+    for object_manager in (ObjectManager(file_path=path, seed=0) for path in level_paths):
+        if not object_manager.tanks:
+            continue
+        tank = next(iter(object_manager.tanks.values()))
+        # Aimed like ObjectManager.score_phantom_shots
+        position = tank.position_at_longitude(tank.longitude)
+        angles, powers = rng.uniform(*ANGLE_RANGE, bullets), rng.uniform(*POWER_RANGE, bullets)
+        roll = pi + (angles + tank.longitude) * pi / 180
+        shots.append(((object_manager.world_size.x, object_manager.world_size.y), object_manager.planet_field(),
+                      np.full(bullets, position.x), np.full(bullets, position.y), powers * np.sin(roll),
+                      -powers * np.cos(roll)))
+
+    results = {}
+    for name in BACKENDS:
+        if name == 'numba' and numba is None:
+            continue
+        use_backend(name)
+        timings = {'trajectory (1 bullet)': 0.0, f'aim (batch of {bullets})': 0.0, 'gravity (1 bullet)': 0.0,
+                   f'gravity (batch of {bullets})': 0.0, 'moves per shot': 0.0}
+        for world_size, field, start_x, start_y, velocity_x, velocity_y in shots:
+            fly(start_x[:1], start_y[:1], velocity_x[:1], velocity_y[:1], 10, field, dt, 2)  # Compile, if needed
+            flight = fly(start_x, start_y, velocity_x, velocity_y, 10, field, dt, ai_phantom_moves, world_size)
+            timings['moves per shot'] += flight.moves.mean() / len(shots)
+            # Where the bullets are halfway through their flights, for gravity
+            middle = np.maximum(flight.moves // 2 - 1, 0)
+            bullet_x = flight.path_x[middle, np.arange(bullets)]
+            bullet_y = flight.path_y[middle, np.arange(bullets)]
+            for timing, run in (('trajectory (1 bullet)',
+                                 lambda: fly(start_x[:1], start_y[:1], velocity_x[:1], velocity_y[:1], 10, field, dt,
+                                             200, world_size)),
+                                (f'aim (batch of {bullets})',
+                                 lambda: fly(start_x, start_y, velocity_x, velocity_y, 10, field, dt, ai_phantom_moves,
+                                             world_size)),
+                                ('gravity (1 bullet)', lambda: gravity(bullet_x[:1], bullet_y[:1], field)),
+                                (f'gravity (batch of {bullets})', lambda: gravity(bullet_x, bullet_y, field))):
+                start = perf_counter()
+                for _ in range(repeats):
+                    run()
+                timings[timing] += perf_counter() - start
+        results[name] = timings
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the physics backends on the shipped levels.')
+    parser.add_argument('--bullets', type=int, default=16, help='size of the batches, by default a step of AimSearch')
+    parser.add_argument('--repeats', type=int, default=5, help='runs of each kernel per level')
+    arguments = parser.parse_args()
+    level_paths = sorted(glob.glob('./levels/*/*.txt'))
+    results = benchmark(level_paths, arguments.bullets, arguments.repeats)
+
+    print(f'{len(level_paths)} levels, {arguments.repeats} runs each. Total seconds:')
+    timings = [timing for timing in next(iter(results.values())) if timing != 'moves per shot']
+    print(f'{"backend":<8}' + ''.join(f'{timing:>26}' for timing in timings))
+    for name, result in results.items():
+        print(f'{name:<8}' + ''.join(f'{result[timing]:>26.4f}' for timing in timings))
+    print(f'The aiming shots flew {next(iter(results.values()))["moves per shot"]:.0f} moves on average.')
+    use_backend()
+
+
+if __name__ == '__main__':
+    main()
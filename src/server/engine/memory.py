@@ -0,0 +1,123 @@
+"""
+Memory footprint of rooms, since many of them are packed onto each host.
+
+The benchmark loads a level into several rooms, fills each room with bullets, and measures with tracemalloc how much
+memory a room holds, along with the size of single game objects. To compare with another version of the engine, e.g.
+from before the game objects used __slots__, pass a git revision as --baseline: it is exported to a temporary
+directory, this module is copied into its engine, and the same measurement runs there in a subprocess. So this module
+only uses engine APIs that have been around since the first version of the server, and imports them when it measures.
+
+Usage, from src/server:
+    python -m engine.memory --baseline <revision>
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import tracemalloc
+from io import BytesIO
+from typing import Dict, Optional
+
+
+def object_size(instance) -> int:
+    """
+    :param instance: any object
+    :return: int bytes of the object itself plus its attribute dictionary, if it has one. What the attributes refer
+    to is not included.
+    """
+    size = sys.getsizeof(instance)
+    if hasattr(instance, '__dict__'):
+        size += sys.getsizeof(instance.__dict__)
+    return size
+
+
+def measure(level_path: str, rooms: int, bullets: int) -> Dict[str, float]:
+    """
+    Measure the memory of the engine in the current working directory, which has to be src/server of some version.
+    :param level_path: str path of the level file to load into every room
+    :param rooms: int number of rooms to hold at once
+    :param bullets: int number of bullets to put into every room
+    :return: Dictionary of the measurements, in bytes
+    """
+    from engine.BulletObject import BulletObject
+    from engine.ObjectManager import ObjectManager
+    from engine.SpriteType import SpriteType
+    from engine.vector import Vector
+
+    # One room first, so that whatever the engine sets up once per process is not counted towards the rooms
+    ObjectManager(file_path=level_path)
+    gc.collect()
+    tracemalloc.start()
+    held = []
+    for _ in range(rooms):
+        object_manager = ObjectManager(file_path=level_path)
+        for i in range(bullets):
+            object_manager.bullets.append(BulletObject(Vector(i, i), SpriteType.BULLET_SPRITE))
+        held.append(object_manager)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    object_manager = held[0]
+    return {'room': current / rooms,
+            'tank': sum(map(object_size, object_manager.tanks.values())) / max(len(object_manager.tanks), 1),
+            'planet': sum(map(object_size, object_manager.planets.values())) / max(len(object_manager.planets), 1),
+            'bullet': object_size(object_manager.bullets[0]) if object_manager.bullets else 0,
+            'vector': object_size(Vector(0, 0))}
+
+
+def measure_revision(revision: str, level_path: str, rooms: int, bullets: int) -> Dict[str, float]:
+    """
+    Run measure on another version of the engine, in a subprocess.
+    :param revision: str git revision of the version
+    :param level_path: str path of the level file, relative to src/server
+    :param rooms: int number of rooms to hold at once
+    :param bullets: int number of bullets to put into every room
+    :return: Dictionary of the measurements, in bytes
+    """
+    top_level, prefix = subprocess.run(['git', 'rev-parse', '--show-toplevel', '--show-prefix'], capture_output=True,
+                                       text=True, check=True).stdout.splitlines()
+    # The whole repository, since the engine reads config.json from the top level
+    archive = subprocess.run(['git', 'archive', '--format=tar', revision], cwd=top_level, capture_output=True,
+                             check=True).stdout
+    with tempfile.TemporaryDirectory() as directory:
+        with tarfile.open(fileobj=BytesIO(archive)) as tar:
+            tar.extractall(directory)
+        server_directory = os.path.join(directory, prefix)
+        shutil.copy(__file__, os.path.join(server_directory, 'engine', 'memory.py'))
+        output = subprocess.run([sys.executable, '-m', 'engine.memory', '--json', '--level', level_path,
+                                 '--rooms', str(rooms), '--bullets', str(bullets)],
+                                cwd=server_directory, capture_output=True, text=True, check=True).stdout
+    # The engine may print while it loads, so the measurements are the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the memory footprint of rooms.')
+    parser.add_argument('--level', default='./levels/Stage 2/Solar System.txt', help='level file to load')
+    parser.add_argument('--rooms', type=int, default=20, help='number of rooms to hold at once')
+    parser.add_argument('--bullets', type=int, default=50, help='number of bullets in every room')
+    parser.add_argument('--baseline', help='git revision to compare with, e.g. one from before __slots__')
+    parser.add_argument('--json', action='store_true', help='only print the measurements, as JSON')
+    args = parser.parse_args()
+
+    current = measure(args.level, args.rooms, args.bullets)
+    if args.json:
+        print(json.dumps(current))
+        return
+    baseline: Optional[Dict[str, float]] = None
+    if args.baseline:
+        baseline = measure_revision(args.baseline, args.level, args.rooms, args.bullets)
+
+    print(f'{args.rooms} rooms of {args.level} with {args.bullets} bullets each. Bytes:')
+    print(f'{"":<8}' + (f'{args.baseline:>16}' if baseline else '') + f'{"current":>16}')
+    for name, size in current.items():
+        print(f'{name:<8}' + (f'{baseline[name]:>16.0f}' if baseline else '') + f'{size:>16.0f}')
+
+
+if __name__ == '__main__':
+    main()
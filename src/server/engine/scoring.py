@@ -0,0 +1,70 @@
+"""
+Scoring of AI phantom shots, vectorized over a batch of shots and all of the enemy tanks at once.
+
+The score of a shot is how far it misses the nearest enemy, so lower is better. Phantom shots fly through tanks, so the
+miss distance is the closest that any sampled point of the trajectory comes to an enemy, not only where the shot lands.
+Shots whose explosion would reach the shooter get a penalty on top of that.
+"""
+import numpy as np
+
+from .kernels import Flight
+
+
+def nearest_distances(x: np.ndarray, y: np.ndarray, enemy_x: np.ndarray, enemy_y: np.ndarray) -> np.ndarray:
+    """
+    :param x: ndarray of the x-coordinates of the points
+    :param y: ndarray of the y-coordinates of the points
+    :param enemy_x: ndarray of the x-coordinates of the enemies
+    :param enemy_y: ndarray of the y-coordinates of the enemies
+    :return: ndarray of the distance from each point to the nearest enemy. Infinite if there are no enemies.
+    """
+    if not enemy_x.size:
+        return np.full(np.shape(x), np.inf)
+    return np.hypot(np.subtract.outer(x, enemy_x), np.subtract.outer(y, enemy_y)).min(axis=-1)
+
+
+def closest_approaches(flight: Flight, enemy_x: np.ndarray, enemy_y: np.ndarray) -> np.ndarray:
+    """
+    :param flight: Flight of the phantom shots
+    :param enemy_x: ndarray of the x-coordinates of the enemies
+    :param enemy_y: ndarray of the y-coordinates of the enemies
+    :return: ndarray of how close each shot came to any enemy over all of its moves. Infinite for shots that did not
+    move.
+    """
+    distances = nearest_distances(flight.path_x, flight.path_y, enemy_x, enemy_y)
+    # Rows past a shot's last move were never flown
+    flown = np.arange(distances.shape[0])[:, None] < flight.moves
+    return np.where(flown, distances, np.inf).min(axis=0, initial=np.inf)
+
+
+def self_damage_penalties(x: np.ndarray, y: np.ndarray, owner_x, owner_y, reach: float, penalty: float) -> np.ndarray:
+    """
+    :param x: ndarray of the x-coordinates where the shots explode
+    :param y: ndarray of the y-coordinates where the shots explode
+    :param owner_x: x-coordinate of the shooter, either a float or an ndarray with one per shot
+    :param owner_y: y-coordinate of the shooter, either a float or an ndarray with one per shot
+    :param reach: float distance within which an explosion damages the shooter, i.e. the explosion radius plus the
+    shooter's collision radius
+    :param penalty: float penalty per unit that an explosion reaches into the shooter
+    :return: ndarray of the penalty of each shot
+    """
+    return penalty * np.maximum(reach - np.hypot(x - owner_x, y - owner_y), 0)
+
+
+def score_shots(flight: Flight, start_x: np.ndarray, start_y: np.ndarray, enemy_x: np.ndarray, enemy_y: np.ndarray,
+                reach: float, penalty: float) -> np.ndarray:
+    """
+    Score a batch of phantom shots, fired from (start_x, start_y), by their closest approach to an enemy plus their
+    self-damage penalty.
+    :param flight: Flight of the phantom shots
+    :param start_x: ndarray of the x-coordinates the shots were fired from, where the shooter stands
+    :param start_y: ndarray of the y-coordinates the shots were fired from, where the shooter stands
+    :param enemy_x: ndarray of the x-coordinates of the enemies
+    :param enemy_y: ndarray of the y-coordinates of the enemies
+    :param reach: float distance within which an explosion damages the shooter
+    :param penalty: float penalty per unit that an explosion reaches into the shooter
+    :return: ndarray of the score of each shot. Lower is better.
+    """
+    final_x, final_y = flight.final_positions(start_x, start_y)
+    return (closest_approaches(flight, enemy_x, enemy_y)
+            + self_damage_penalties(final_x, final_y, start_x, start_y, reach, penalty))
@@ -0,0 +1,195 @@
+"""
+Pluggable encoders for socket.io payloads. Every room emits float-heavy lists at networkUpdateFactor Hz, so the
+encoder python-socketio uses is on the hot path.
+
+python-socketio accepts any module-like object with json compatible dumps/loads functions, which is how orjson is
+plugged in. orjson is optional: when it is not installed, the standard library json module is used, like before.
+
+Usage, from src/server, to compare the encode time of the serializers on a frame of each shipped level:
+    python -m engine.serializer
+"""
+import argparse
+import glob
+import json
+from enum import Enum
+from random import Random
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from socketio.packet import EVENT, Packet
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
+
+class SerializerNotAvailableError(ValueError):
+    """The requested serializer is unknown or its package is not installed."""
+    pass
+
+
+def _default(value: Any) -> Any:
+    """
+    Convert values that the encoders do not understand natively into primitives.
+    :param value: value that could not be serialized
+    :return: a serializable equivalent of value
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Enum):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class OrjsonModule:
+    """json module look-alike backed by orjson, to be handed to socketio.AsyncServer(json=...)."""
+
+    @staticmethod
+    def dumps(obj: Any, *args, **kwargs) -> str:
+        # orjson always produces compact output, so separators and other json.dumps options are ignored.
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(s: Any, *args, **kwargs) -> Any:
+        return orjson.loads(s)
+
+
+class StandardJsonModule:
+    """The standard library json module, taught to encode NumPy scalars and enums."""
+
+    @staticmethod
+    def dumps(obj: Any, *args, **kwargs) -> str:
+        kwargs.setdefault('default', _default)
+        return json.dumps(obj, *args, **kwargs)
+
+    @staticmethod
+    def loads(s: Any, *args, **kwargs) -> Any:
+        return json.loads(s, *args, **kwargs)
+
+
+def server_options(serializer: str = 'auto') -> Dict[str, Any]:
+    """
+    Keyword arguments for socketio.AsyncServer that select a payload serializer.
+    :param serializer: 'auto' (orjson if installed, else json), 'orjson', 'json', or 'msgpack'. msgpack switches
+    socket.io to binary msgpack packets, which requires clients to use the socket.io msgpack parser.
+    :raise SerializerNotAvailableError: if the serializer is unknown or not installed
+    :return: Dict of keyword arguments
+    """
+    if serializer == 'auto':
+        serializer = 'orjson' if orjson is not None else 'json'
+
+    if serializer == 'orjson':
+        if orjson is None:
+            raise SerializerNotAvailableError('The orjson serializer was requested, but orjson is not installed.')
+        return {'json': OrjsonModule}
+    elif serializer == 'json':
+        return {'json': StandardJsonModule}
+    elif serializer == 'msgpack':
+        try:
+            import msgpack  # noqa: F401 python-socketio imports it lazily, so check that it is installed up front
+        except ImportError:
+            raise SerializerNotAvailableError('The msgpack serializer was requested, but msgpack is not installed.')
+        return {'serializer': 'msgpack'}
+    raise SerializerNotAvailableError(f'{serializer=} is not a valid socket.io serializer.')
+
+
+def room_frame(level_path: str, bullets: int, explosions: int) -> List[Tuple[str, Any]]:
+    """
+    Build the payloads that a room sends to its clients in one update, in the middle of a busy game.
+    :param level_path: str path of the level file
+    :param bullets: int number of bullets in flight
+    :param explosions: int number of bullets that explode on the planets in this update, cratering the terrain
+    :return: List of (event, payload) tuples, like ObjectManager.send_updates emits them
+    """
+    # The ObjectManager sends the payloads through the serializer, so only import it when needed
+    from .ObjectManager import ObjectManager
+    from .SpriteType import SpriteType
+    from .vector import AngleVector, Vector
+
+    object_manager = ObjectManager(file_path=level_path, seed=0)
+    rng = Random(0)
+    planets = list(object_manager.planets.values())
+    for i in range(bullets + explosions):
+        if i < bullets:
+            position = Vector(rng.uniform(0, object_manager.world_size.x), rng.uniform(0, object_manager.world_size.y))
+        else:  # On the surface, so that it craters the terrain
+            planet = rng.choice(planets)
+            position = planet.get_surface_vector_at_index(rng.randrange(planet.number_of_altitudes))
+        bullet = object_manager.create_bullet(SpriteType.BULLET_SPRITE, position, '#ffffff')
+        bullet.velocity = AngleVector(rng.uniform(0, 2 * np.pi), 300)
+    object_manager.spawn_pending_bullets()
+    for bullet, planet in zip(object_manager.bullets[bullets:], planets * explosions):
+        object_manager._explode_bullet(bullet, planet)
+        bullet.kill()
+    object_manager.resolve_explosions()
+
+    frame = [('update', {'id': planet.id, 'sprite': 0, 'update': planet.changes_queue}) for planet in planets
+             if planet.changes_queue]
+    frame.append(('update-tanks', [user.get_changes(object_manager.tanks) for user in object_manager.users]))
+    frame.append(('update-bullets', [bullet.get_json() for bullet in object_manager.bullets if not bullet.dead]))
+    frame.append(('update-explosions', object_manager.explosions))
+    return frame
+
+
+def packet_classes() -> Dict[str, type]:
+    """
+    :return: Dictionary where the key names each serializer that is installed and the value is the socket.io packet
+    class that python-socketio encodes with when the serializer is picked
+    """
+    classes = {'json': type('JsonPacket', (Packet,), {'json': StandardJsonModule})}
+    if orjson is not None:
+        classes['orjson'] = type('OrjsonPacket', (Packet,), {'json': OrjsonModule})
+    try:
+        from socketio.msgpack_packet import MsgPackPacket
+        classes['msgpack'] = MsgPackPacket
+    except ImportError:  # msgpack is not installed
+        pass
+    return classes
+
+
+def benchmark(level_paths: List[str], bullets: int, explosions: int, repeats: int) -> Dict[str, Tuple[float, float]]:
+    """
+    Encode a frame of each level into socket.io packets with every installed serializer.
+    :param level_paths: List of level file paths
+    :param bullets: int number of bullets in flight in each frame
+    :param explosions: int number of explosions in each frame
+    :param repeats: int number of times each frame is encoded
+    :return: Dictionary where the key names the serializer and the value is (mean microseconds, mean bytes) per frame
+    """
+    frames = [room_frame(path, bullets, explosions) for path in level_paths]
+    results = {}
+    for name, packet_class in packet_classes().items():
+        seconds, size = 0.0, 0
+        for frame in frames:
+            packets = [packet_class(EVENT, data=[event, payload]) for event, payload in frame]
+            start = perf_counter()
+            for _ in range(repeats):
+                encoded = [packet.encode() for packet in packets]
+            seconds += perf_counter() - start
+            size += sum(len(data) for data in encoded)
+        results[name] = (seconds / repeats / len(frames) * 1e6, size / len(frames))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the socket.io serializers on a frame of each shipped level.')
+    parser.add_argument('--bullets', type=int, default=30, help='bullets in flight in each frame')
+    parser.add_argument('--explosions', type=int, default=3, help='explosions in each frame')
+    parser.add_argument('--repeats', type=int, default=200, help='encodes of each frame')
+    arguments = parser.parse_args()
+    level_paths = sorted(glob.glob('./levels/*/*.txt'))
+    results = benchmark(level_paths, arguments.bullets, arguments.explosions, arguments.repeats)
+
+    print(f'{len(level_paths)} levels, {arguments.bullets} bullets and {arguments.explosions} explosions per frame:')
+    print(f'{"serializer":<12}{"us per frame":>16}{"bytes per frame":>18}')
+    for name, (microseconds, size) in results.items():
+        print(f'{name:<12}{microseconds:>16.1f}{size:>18.0f}')
+
+
+if __name__ == '__main__':
+    main()
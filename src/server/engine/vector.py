@@ -1,8 +1,10 @@
-from itertools import combinations
 from math import cos, sin, sqrt
 
+from .geometry import circles_intersect, circles_overlap_solid, circle_intersects_segment
+
 
 class Vector:
+    __slots__ = ('x', 'y')
     x: float
     y: float
 
@@ -48,6 +50,15 @@ class Vector:
     def __repr__(self):
         return f'Vector({self.x}, {self.y})'
 
+    def add_scaled(self, other, scalar: float):
+        """
+        Obtain self + scalar * other as a new vector, without allocating the intermediate scaled vector.
+        :param other: Vector to scale and add
+        :param scalar: float to scale other by
+        :return: a new Vector
+        """
+        return Vector(self.x + scalar * other.x, self.y + scalar * other.y)
+
     def rotate(self, radians: float):
         """
         Obtain a new vector by rotating self by radians.
@@ -67,6 +78,7 @@ def AngleVector(angle: float, magnitude: float):
 
 
 class Sphere:
+    __slots__ = ('center', 'radius')
     center: Vector
     radius: float
 
@@ -154,20 +166,33 @@ class Sphere:
         :param other_sphere:
         :return:
         """
-        # Determine some constants, for easy access
-        center1 = self.center
-        r1 = self.radius
-        center2 = other_sphere.center
-        r2 = other_sphere.radius
-        distance_between_centers = abs(center2 - center1)
-        return distance_between_centers != 0 and r1 + r2 >= distance_between_centers >= abs(r1 - r2)
+        other_center = other_sphere.center
+        return self.intersects_circle_fast_xyr(other_center.x, other_center.y, other_sphere.radius)
+
+    def intersects_circle_fast_xyr(self, x: float, y: float, radius: float) -> bool:
+        """
+        Determine intersection with the circle centered at (x, y) without getting the points. Takes raw coordinates so
+        that hot loops do not need to allocate a Sphere.
+        :param x: float x-coordinate of the other circle's center
+        :param y: float y-coordinate of the other circle's center
+        :param radius: float radius of the other circle
+        :return: True if the circle boundaries intersect, otherwise False.
+        """
+        return circles_intersect(self.center.x, self.center.y, self.radius, x, y, radius)
 
     def intersects_circle_solid_fast(self, other_sphere) -> bool:
-        center1 = self.center
-        r1 = self.radius
-        center2 = other_sphere.center
-        r2 = other_sphere.radius
-        return abs(center2 - center1) < max(r1, r2)
+        other_center = other_sphere.center
+        return self.intersects_circle_solid_fast_xyr(other_center.x, other_center.y, other_sphere.radius)
+
+    def intersects_circle_solid_fast_xyr(self, x: float, y: float, radius: float) -> bool:
+        """
+        Determine whether the center of either circle lies inside the other, for the circle centered at (x, y).
+        :param x: float x-coordinate of the other circle's center
+        :param y: float y-coordinate of the other circle's center
+        :param radius: float radius of the other circle
+        :return: True if the solid circles overlap that far, otherwise False.
+        """
+        return circles_overlap_solid(self.center.x, self.center.y, self.radius, x, y, radius)
 
     def intersects_circle(self, other_sphere) -> (bool, Vector, Vector):
         """
@@ -236,24 +261,4 @@ class Sphere:
         :param v1:
         :return:
         """
-        # project the vector v0-center onto the line segment.
-        # let d = a + the projection
-        # if |DC| is less than the radius, then the circle must intersect the infinite line
-        # Additionally, if D is between a and b, then the circle intersects the line in the segment at least once
-        ac = self.center - v0
-        ab = v1 - v0
-        proj: Vector = ((ac * ab) / (ab * ab)) * ab
-        d = v0 + proj
-
-        return abs(self.center - d) <= self.radius and abs(proj) <= abs(v1 - v0)
-
-    def intersects_triangle(self, v0, v1, v2):
-        # Slow algorithm just checks if any of the line segments intersect.
-        # Not terribly slow, but faster algorithms exist, I'm sure.
-        return any(self.intersects_line_segment(vert1, vert2) for vert1, vert2 in combinations((v0, v1, v2), 2))
-
-        # This faster algorithm is inspired by the Separating Axis Theorem
-        # We will choose 3 projection axes: parallel to the center of the circle to each of the 3 vertices
-        # Then if for any of these three tests, the radius (projection of circle) does not intersect with projection of
-        # the triangle, then there exists a separating axis.
-        # The specifics are bit more complicated to hash out and then prove.
+        return circle_intersects_segment(self.center.x, self.center.y, self.radius, v0.x, v0.y, v1.x, v1.y)
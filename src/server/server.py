@@ -1,21 +1,25 @@
-from datetime import datetime
 from multiprocessing import freeze_support
 
 import socketio
 from aiohttp import web
 
-from engine.Config import ConfigData
+from engine.Config import ConfigData, physics_backend
 from engine.RoomManager import RoomManager, RoomAlreadyExistsError
+from engine.kernels import use_backend
+from engine.serializer import server_options
 from engine.vector import Vector
 
 # Set up Web Server
 app = web.Application()
-sio = socketio.AsyncServer(async_mode='aiohttp')
+sio = socketio.AsyncServer(async_mode='aiohttp', **server_options(ConfigData.socketSerializer))
 sio.attach(app)
+print(f'[INFO] Physics backend: {use_backend(physics_backend).name}')
 
 # Create the Room Manager
 room_manager = RoomManager(sio)
-room_manager.create_room(name='test_room1', level_path='./levels/Stage 1/I Was Here First!.txt')
+room_manager.restore_rooms()
+if 'test_room1' not in room_manager.rooms:
+    room_manager.create_room(name='test_room1', level_path='./levels/Stage 1/I Was Here First!.txt')
 
 
 @sio.event
@@ -86,11 +90,7 @@ async def kick(sid, data):
 
 @sio.on('0')
 async def heartbeat(sid, target):
-    async with sio.session(sid) as session:
-        session["currentPlayer"].lastHeartbeat = datetime.now().timestamp()
-        if target['x'] != session["currentPlayer"].x or target['y'] != session["currentPlayer"].y:
-            session["currentPlayer"].target = Vector(**target)
-            await room_manager.update_target(sid, session['currentPlayer'].target)
+    room_manager.heartbeat(sid, Vector(**target))
 
 
 @sio.event
@@ -133,6 +133,11 @@ async def next_bullet(sid):
     await room_manager.next_bullet(sid)
 
 
+@sio.event
+async def windowResized(sid, data):
+    await room_manager.resize_viewport(sid, data)
+
+
 @sio.event
 async def request_rooms(sid):
     await room_manager.send_room_list(sid)
@@ -157,14 +162,6 @@ async def send_updates(*args, **kwargs):
     return await room_manager.send_updates(*args, **kwargs)
 
 
-async def tickPlayer(currentPlayer):
-    if currentPlayer.lastHeartbeat < datetime.now().timestamp() - ConfigData.maxHeartbeatInterval:
-        # sid = sockets[currentPlayer.id]  # old
-        sid = currentPlayer.id
-        await sio.emit('kick', f'Last heartbeat received over {ConfigData.maxHeartbeatInterval} ago.', room=sid)
-        await sio.disconnect(sid)
-
-
 async def moveloop():
     return await room_manager.move_loop()
 
@@ -183,6 +180,10 @@ async def favicon(request):
     return web.FileResponse('../client/favicon.ico')
 
 
+async def stats(request):
+    return web.json_response(room_manager.stats())
+
+
 def setInterval(func, timeout):
     async def wrapper(func, timeout):
         while True:
@@ -200,6 +201,7 @@ if __name__ == '__main__':
     # Add the static files
     app.router.add_get('/', index)
     app.router.add_get('/favicon.ico', favicon)
+    app.router.add_get('/stats', stats)
     app.router.add_static('/css', '../client/css')
     app.router.add_static('/img', '../client/img')
     app.router.add_static('/audio', '../client/audio')
@@ -0,0 +1,85 @@
+"""
+Property-based tests of engine.geometry against the sqrt-based Sphere tests it replaced, which are copied below as
+they were.
+
+Coordinates are drawn as whole numbers. Then every squared distance is exact, and so is the square root of a perfect
+square, so the circle tests have to agree everywhere, even on the boundaries. The old segment test divides, so it is
+only compared where the circle is not within rounding of touching the line.
+"""
+from math import sqrt
+
+import numpy as np
+from hypothesis import given, strategies as st
+
+from engine.geometry import (circles_intersect, circles_overlap_solid, circle_intersects_segment,
+                             circles_intersect_batch, circles_overlap_solid_batch)
+from engine.vector import Sphere, Vector
+
+coordinates = st.integers(-10_000, 10_000).map(float)
+radii = st.integers(0, 2_000).map(float)
+
+
+def old_intersects_circle_fast_xyr(sphere: Sphere, x: float, y: float, radius: float) -> bool:
+    r1 = sphere.radius
+    distance_between_centers = sqrt((x - sphere.center.x) ** 2 + (y - sphere.center.y) ** 2)
+    return distance_between_centers != 0 and r1 + radius >= distance_between_centers >= abs(r1 - radius)
+
+
+def old_intersects_circle_solid_fast_xyr(sphere: Sphere, x: float, y: float, radius: float) -> bool:
+    return sqrt((x - sphere.center.x) ** 2 + (y - sphere.center.y) ** 2) < max(sphere.radius, radius)
+
+
+def old_intersects_line_segment(sphere: Sphere, v0: Vector, v1: Vector) -> bool:
+    ac = sphere.center - v0
+    ab = v1 - v0
+    proj: Vector = ((ac * ab) / (ab * ab)) * ab
+    d = v0 + proj
+    return abs(sphere.center - d) <= sphere.radius and abs(proj) <= abs(v1 - v0)
+
+
+@given(coordinates, coordinates, radii, coordinates, coordinates, radii)
+def test_circles_intersect_matches_sphere(x1, y1, r1, x2, y2, r2):
+    expected = old_intersects_circle_fast_xyr(Sphere(Vector(x1, y1), r1), x2, y2, r2)
+    assert circles_intersect(x1, y1, r1, x2, y2, r2) == expected
+    assert Sphere(Vector(x1, y1), r1).intersects_circle_fast(Sphere(Vector(x2, y2), r2)) == expected
+
+
+@given(coordinates, coordinates, radii, coordinates, coordinates, radii)
+def test_circles_overlap_solid_matches_sphere(x1, y1, r1, x2, y2, r2):
+    expected = old_intersects_circle_solid_fast_xyr(Sphere(Vector(x1, y1), r1), x2, y2, r2)
+    assert circles_overlap_solid(x1, y1, r1, x2, y2, r2) == expected
+    assert Sphere(Vector(x1, y1), r1).intersects_circle_solid_fast(Sphere(Vector(x2, y2), r2)) == expected
+
+
+@given(coordinates, coordinates, radii, coordinates, coordinates, coordinates, coordinates)
+def test_circle_intersects_segment_matches_sphere_beside_the_segment(cx, cy, r, x0, y0, x1, y1):
+    ab_squared = (x1 - x0) ** 2 + (y1 - y0) ** 2
+    projection = (cx - x0) * (x1 - x0) + (cy - y0) * (y1 - y0)
+    if not ab_squared or not 0 <= projection <= ab_squared:
+        return  # The old test only measured the distance to the segment where the center projects onto it
+    cross = (cx - x0) * (y1 - y0) - (cy - y0) * (x1 - x0)
+    if abs(cross ** 2 - r ** 2 * ab_squared) <= 1e-9 * r ** 2 * ab_squared:
+        return  # Tangent, up to the rounding of the old test
+    expected = old_intersects_line_segment(Sphere(Vector(cx, cy), r), Vector(x0, y0), Vector(x1, y1))
+    assert circle_intersects_segment(cx, cy, r, x0, y0, x1, y1) == expected
+
+
+@given(coordinates, coordinates, radii, coordinates, coordinates, coordinates, coordinates)
+def test_circle_intersects_segment_past_its_ends_touches_an_end(cx, cy, r, x0, y0, x1, y1):
+    ab_squared = (x1 - x0) ** 2 + (y1 - y0) ** 2
+    projection = (cx - x0) * (x1 - x0) + (cy - y0) * (y1 - y0)
+    if ab_squared and 0 <= projection <= ab_squared:
+        return
+    # The closest point of the segment is one of its ends (the old test got this wrong, see the git history)
+    end = (x0, y0) if projection < 0 or not ab_squared else (x1, y1)
+    expected = (cx - end[0]) ** 2 + (cy - end[1]) ** 2 <= r * r
+    assert circle_intersects_segment(cx, cy, r, x0, y0, x1, y1) == expected
+
+
+@given(st.lists(st.tuples(coordinates, coordinates, radii, coordinates, coordinates, radii), min_size=1, max_size=20))
+def test_batch_variants_match_the_scalar_tests(rows):
+    x1, y1, r1, x2, y2, r2 = (np.array(column) for column in zip(*rows))
+    assert circles_intersect_batch(x1, y1, r1, x2, y2, r2).tolist() == [
+        circles_intersect(*row) for row in rows]
+    assert circles_overlap_solid_batch(x1, y1, r1, x2, y2, r2).tolist() == [
+        circles_overlap_solid(*row) for row in rows]
@@ -0,0 +1,51 @@
+"""
+Tests of how an ObjectManager carries its room's settings over when the room moves on to another level, and of the
+physics it runs through the kernels.
+"""
+from engine import kernels
+from engine.Config import ai_accuracy_multiplier, ai_aim_simulations, gravity_constant
+from engine.ObjectManager import ObjectManager
+from engine.vector import Vector
+
+
+def test_reset_onto_a_new_level_keeps_the_room_settings():
+    object_manager = ObjectManager(file_path='./levels/Stage 1/Twins.txt', seed=7, ai_scheduled=True)
+    object_manager.reset('./levels/Stage 2/Solar System.txt')
+    assert object_manager.file_path == './levels/Stage 2/Solar System.txt'
+    assert object_manager.seed == 7
+    assert object_manager.ai_scheduled
+
+
+def test_reset_onto_the_same_level_keeps_the_room_settings():
+    object_manager = ObjectManager(file_path='./levels/Stage 1/Twins.txt', seed=7, ai_scheduled=True)
+    object_manager.reset()
+    assert object_manager.seed == 7
+    assert object_manager.ai_scheduled
+
+
+def test_gravity_through_the_python_kernel_is_the_vector_sum():
+    object_manager = ObjectManager(file_path='./levels/Stage 2/Solar System.txt', seed=0)
+    positions = [Vector(10.5, 20.25), Vector(500, 12), Vector(1000.125, 900)]
+    expected = []
+    for position in positions:
+        acceleration = Vector(0, 0)
+        for planet in object_manager.planets.values():
+            difference = planet.position - position
+            acceleration = acceleration.add_scaled(difference / abs(difference),
+                                                   gravity_constant * planet.mass / abs(difference) ** 2)
+        expected.append(acceleration)
+    kernels.use_backend('python')
+    try:
+        assert object_manager.calculate_gravity(positions) == expected
+    finally:
+        kernels.use_backend()
+
+
+def test_the_aim_budget_follows_the_difficulty_of_the_tank():
+    object_manager = ObjectManager(file_path='./levels/Stage 1/Twins.txt', seed=0)
+    tank = object_manager.tanks['ai-0']
+    assert object_manager.start_aim_search(tank).search.budget == ai_aim_simulations
+    tank.accuracy_multiplier = ai_accuracy_multiplier / 4
+    assert object_manager.start_aim_search(tank).search.budget == ai_aim_simulations // 4
+    tank.accuracy_multiplier = 0
+    assert object_manager.start_aim_search(tank).search.budget == 1  # Still aims, however badly
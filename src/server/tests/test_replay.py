@@ -0,0 +1,63 @@
+"""
+Tests of recording a room's inputs and replaying them, which has to reproduce the room exactly.
+"""
+import asyncio
+from random import Random
+
+import pytest
+
+from engine import ObjectManager as object_manager_module
+from engine.ObjectManager import ObjectManager
+from engine.Replay import NullServer, replay
+from engine.vector import Vector
+
+
+@pytest.fixture
+def recording_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(object_manager_module, 'replay_recording_path', str(tmp_path))
+    monkeypatch.setattr(object_manager_module, 'replay_digest_every', 10)
+    return tmp_path
+
+
+def test_rooms_with_the_same_seed_record_to_their_own_files(recording_path):
+    first = ObjectManager(sio=NullServer(), seed=7)
+    second = ObjectManager(sio=NullServer(), seed=7)  # Most likely in the same second, so the same file name
+    first.recorder.close()
+    second.recorder.close()
+    assert first.recorder.path != second.recorder.path
+    assert len(list(recording_path.iterdir())) == 2
+
+
+async def play(object_manager: ObjectManager, ticks: int) -> None:
+    """A player who aims, strafes and fires at random on their turns, then leaves the game to the AI."""
+    object_manager.spawn_player_tank('player')
+    await object_manager.start_game()
+    rng = Random(5)
+    for tick in range(ticks):
+        if object_manager.current_player_sid == 'player' and rng.random() < .05:
+            action = rng.choice(['strafe_left', 'angle_right', 'power_up', 'fire', 'target'])
+            if action == 'fire':
+                object_manager.fire_gun_sid('player')
+            elif action == 'target':
+                await object_manager.update_target('player', Vector(rng.uniform(-300, 300), rng.uniform(-300, 300)))
+            else:
+                await getattr(object_manager, action)('player')
+        if tick == ticks // 2:
+            object_manager.disconnect_player('player')
+        await object_manager.move(object_manager.sio)
+        if object_manager.is_game_over:
+            break
+    object_manager.recorder.close()
+
+
+def test_a_recorded_game_replays_exactly(recording_path):
+    object_manager = ObjectManager(sio=NullServer(), seed=3)
+    asyncio.run(play(object_manager, 1200))
+
+    with open(object_manager.recorder.path) as f:
+        assert sum('"input"' in line for line in f) > 10
+
+    result = asyncio.run(replay(object_manager.recorder.path))
+    assert result.digests_checked > 10
+    assert result.first_mismatch is None
+    assert result.ticks == object_manager.clock.tick
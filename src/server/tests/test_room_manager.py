@@ -0,0 +1,131 @@
+"""
+Tests of the bookkeeping that RoomManager keeps for the connected players and the lifecycle of its rooms.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from time import monotonic
+
+from socketio import AsyncServer
+
+from engine import RoomManager as room_manager_module
+from engine.Config import room_delete_after
+from engine.PlayerInfo import PlayerInfo
+from engine.RoomManager import RoomManager, RoomState
+from engine.SoundType import sound_dictionary
+from engine.SpriteType import sprite_dictionary
+from engine.vector import Vector
+
+
+def test_heartbeat_of_an_unknown_player_is_not_tracked():
+    room_manager = RoomManager(AsyncServer())
+    room_manager.heartbeat('gone')  # e.g. one last heartbeat that was in flight when the player left
+    assert room_manager.heartbeats.tracked == 0
+    assert 'gone' not in room_manager.heartbeats.last_heartbeats
+
+
+def test_rooms_that_hibernate_to_disk_are_deleted_with_their_file_when_they_expire(tmp_path, monkeypatch):
+    monkeypatch.setattr(room_manager_module, 'room_hibernation_path', str(tmp_path))
+    room_manager = RoomManager(AsyncServer())
+    room_manager.create_room('abandoned', './levels/Stage 1/Twins.txt')
+    room = room_manager.rooms['abandoned']
+    room.hibernate()
+    assert room.object_manager is None and os.path.exists(room.hibernation_file)
+
+    asyncio.run(room_manager.game_loop())
+    assert 'abandoned' in room_manager.rooms  # Not expired yet
+
+    room.hibernating_since -= room_delete_after
+    asyncio.run(room_manager.game_loop())
+    assert 'abandoned' not in room_manager.rooms
+    assert not os.listdir(tmp_path)
+    assert 'default' in room_manager.rooms  # The lobby hibernates too, but is never deleted
+
+
+def test_fast_forwarding_rooms_send_no_updates():
+    server = AsyncServer()
+    room_manager = RoomManager(server)
+    room_manager.create_room('bots', './levels/Stage 1/Twins.txt')
+    room = room_manager.rooms['bots']
+    room.state = RoomState.FastForward
+    room.object_manager.explosions.append({'x': 0, 'y': 0})
+    emitted = []
+
+    async def emit(*args, **kwargs):
+        emitted.append(args)
+    server.emit = emit
+    asyncio.run(room.send_updates())
+    assert not emitted
+    assert not room.object_manager.explosions  # Dropped rather than piled up for a viewer that never comes
+
+
+def join_game(room_manager: RoomManager, sid: str, name: str = 'game') -> None:
+    """Put a player into a game room, like connect_player and move_player do, without a socket."""
+    room_manager.create_room(name, './levels/Stage 1/Twins.txt')
+    room = room_manager.rooms[name]
+    room.connected_sids[sid] = True
+    room.object_manager.spawn_player_tank(sid)
+    room_manager.connected_players[sid] = name
+    room_manager.players[sid] = PlayerInfo(sid, 0, 0, 0, 'player', 0, Vector(0, 0), name='player')
+
+
+def test_players_back_in_the_lobby_after_their_room_closed_are_not_reaped():
+    room_manager = RoomManager(AsyncServer())
+    join_game(room_manager, 'player')
+    room_manager.heartbeat('player', Vector(1, 0))
+    assert room_manager.heartbeats.tracked == 1
+
+    asyncio.run(room_manager.delete_room('game'))
+    assert room_manager.connected_players['player'] == 'default'
+    assert room_manager.heartbeats.sweep(monotonic() + room_manager.heartbeats.timeout + 1) == []
+    room_manager.heartbeat('player')  # Not sent by the lobby, but a late one must not start tracking it again
+    assert room_manager.heartbeats.tracked == 0
+
+
+def test_players_whose_tank_died_are_not_kicked_while_they_watch():
+    server = AsyncServer()
+    room_manager = RoomManager(server)
+    join_game(room_manager, 'player')
+    room_manager.heartbeat('player')
+    room_manager.rooms['game'].object_manager.tanks.pop('player')  # Like cull_dead_objects, which sends RIP
+    kicked = []
+
+    async def emit(event, *args, **kwargs):
+        kicked.append(event)
+    server.emit = emit
+    room_manager.heartbeats.last_heartbeats['player'] -= room_manager.heartbeats.timeout + 1
+    room_manager.heartbeats._deadlines = [(0, 'player')]
+    asyncio.run(room_manager.reap_timed_out_players())
+    assert 'kick' not in kicked
+    assert room_manager.connected_players['player'] == 'game'
+
+
+def test_clients_get_the_sprite_and_sound_tables_as_soon_as_they_connect():
+    server = AsyncServer()
+    room_manager = RoomManager(server)
+    emitted = []
+
+    async def emit(event, data=None, **kwargs):
+        emitted.append((event, data, kwargs.get('room')))
+
+    @asynccontextmanager
+    async def session(sid):
+        yield {}
+    server.emit, server.session, server.enter_room = emit, session, lambda *args: None
+    asyncio.run(room_manager.connect_player('player', {'QUERY_STRING': 'type=player'}))
+    event, data, room = emitted[0]
+    assert (event, room) == ('gameSetup', 'player')
+    assert data['sprites'] == sprite_dictionary and data['sounds'] == sound_dictionary
+
+
+def test_stats_report_the_connection_of_each_client():
+    room_manager = RoomManager(AsyncServer())
+    link = room_manager.network_monitor.get_link('player')
+    link.record_rtt(.35)
+    assert not room_manager.network_monitor.should_send('player', 1)
+    room_manager.network_monitor.forget('player')
+    room_manager.network_monitor.get_link('other').record_rtt(.05)
+
+    network = room_manager.stats()['network']
+    assert network['frames_skipped'] == 1  # Still counted once the client is gone
+    assert network['clients'] == {'other': {'rtt': .05, 'update_interval': 1, 'frames_skipped': 0}}
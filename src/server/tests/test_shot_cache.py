@@ -0,0 +1,48 @@
+"""
+Tests of how the AI tanks of a room, and of other rooms on the same level, reuse the shot solutions in the ShotCache.
+"""
+import pytest
+
+from engine import ObjectManager as object_manager_module
+from engine.ObjectManager import ObjectManager
+from engine.ShotCache import ShotCache
+
+LEVEL = './levels/Stage 1/Twins.txt'
+
+
+@pytest.fixture
+def shot_cache(monkeypatch) -> ShotCache:
+    cache = ShotCache(16)
+    monkeypatch.setattr(object_manager_module, 'shot_cache', cache)
+    return cache
+
+
+def room(seed: int) -> ObjectManager:
+    object_manager = ObjectManager(file_path=LEVEL, seed=seed)
+    object_manager.create_tank(180, list(object_manager.planets.values())[1], sid='player', is_player=True)
+    return object_manager
+
+
+def aim(object_manager: ObjectManager) -> None:
+    tank = object_manager.tanks['ai-0']
+    plan = object_manager.start_aim_search(tank)
+    plan.search.run()
+    object_manager.finish_aim_search(tank, plan)
+
+
+def test_a_second_turn_after_the_terrain_was_cratered_hits(shot_cache):
+    object_manager = room(seed=1)
+    aim(object_manager)
+    for planet in object_manager.planets.values():
+        planet.altitudes[::7] -= 30
+    aim(object_manager)
+    assert (shot_cache.hits, shot_cache.misses) == (1, 1)
+
+
+def test_a_second_room_on_the_same_level_hits(shot_cache):
+    first, second = room(seed=1), room(seed=2)  # Same spawn planets, different terrain
+    assert [planet.altitudes.tolist() for planet in first.planets.values()] != [
+        planet.altitudes.tolist() for planet in second.planets.values()]
+    aim(first)
+    aim(second)
+    assert (shot_cache.hits, shot_cache.misses) == (1, 1)
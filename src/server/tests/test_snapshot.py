@@ -0,0 +1,45 @@
+"""
+Tests of saving rooms as full snapshots plus terrain journals, and reading them back.
+"""
+from engine.ObjectManager import ObjectManager
+from engine.Snapshot import RoomSnapshotter, TERRAIN_RECORD
+
+
+def crater(object_manager: ObjectManager) -> None:
+    planet = next(iter(object_manager.planets.values()))
+    planet.altitudes[:10] -= 5
+
+
+def test_terrain_edits_are_journaled_and_read_back(tmp_path):
+    snapshotter = RoomSnapshotter(str(tmp_path), full_every=30)
+    object_manager = ObjectManager(file_path='./levels/Stage 1/Twins.txt', seed=0)
+    snapshotter.save({'room': object_manager})
+    crater(object_manager)
+    snapshotter.save({'room': object_manager})
+
+    restored = RoomSnapshotter(str(tmp_path)).load_all()['room']
+    assert {planet_id: planet.altitudes.tolist() for planet_id, planet in restored.planets.items()} == {
+        planet_id: planet.altitudes.tolist() for planet_id, planet in object_manager.planets.items()}
+
+
+def test_a_room_on_a_new_level_is_written_fully(tmp_path):
+    snapshotter = RoomSnapshotter(str(tmp_path), full_every=30)
+    object_manager = ObjectManager(file_path='./levels/Stage 1/Twins.txt', seed=0)
+    snapshotter.save({'room': object_manager})
+    object_manager.reset('./levels/Stage 2/Solar System.txt')
+    crater(object_manager)
+    snapshotter.save({'room': object_manager})
+
+    restored = RoomSnapshotter(str(tmp_path)).load_all()['room']
+    assert restored.file_path == './levels/Stage 2/Solar System.txt'
+    assert restored.planets.keys() == object_manager.planets.keys()
+
+
+def test_a_journal_for_planets_the_snapshot_does_not_have_is_not_restored(tmp_path, capsys):
+    snapshotter = RoomSnapshotter(str(tmp_path), full_every=30)
+    snapshotter.save({'room': ObjectManager(file_path='./levels/Stage 1/Twins.txt', seed=0)})
+    with open(tmp_path / 'room'.encode().hex() / 'terrain.journal', 'ab') as f:
+        f.write(TERRAIN_RECORD.pack(1, 0, 100))
+
+    assert RoomSnapshotter(str(tmp_path)).load_all() == {}
+    assert 'Could not restore room' in capsys.readouterr().out